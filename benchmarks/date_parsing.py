@@ -0,0 +1,70 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Measures the time it takes to parse dates using dateutil and using the DateParser, which parses ISO 8601 dates using
+datetime.fromisoformat, tries the given formats using datetime.strptime and remembers the other dates.
+
+    python3 benchmarks/date_parsing.py --dates 100000 --distinct 1000
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dateutil.parser import parse as parse_date
+
+from pydfql.evaluators.common import DateParser
+
+RFC_2822_FORMAT = '%a, %d %b %Y %H:%M:%S %z'
+
+
+def create_dates(count: int, distinct: int, date_format: str) -> list:
+    """ Returns dates formatted using the format, where only the given number of dates are distinct. """
+    start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    return [(start + datetime.timedelta(seconds=17 * (index % distinct))).strftime(date_format)
+            for index in range(count)]
+
+
+def measure(parse, dates: list) -> float:
+    """ Returns the time in seconds it takes to parse all dates. """
+    start = time.perf_counter()
+    for date in dates:
+        parse(date)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares parsing dates using dateutil and using the DateParser.')
+    parser.add_argument('--dates', type=int, default=100000, help='number of dates to parse')
+    parser.add_argument('--distinct', type=int, default=1000, help='number of distinct dates')
+    arguments = parser.parse_args()
+
+    print('{:>24} {:>12} {:>12} {:>8}'.format('dates', 'dateutil', 'DateParser', 'speedup'))
+    for name, date_format, formats in [
+        ('iso 8601', '%Y-%m-%dT%H:%M:%S+00:00', []),
+        ('rfc 2822 (formats)', RFC_2822_FORMAT, [RFC_2822_FORMAT]),
+        ('rfc 2822 (remembered)', RFC_2822_FORMAT, []),
+    ]:
+        dates = create_dates(arguments.dates, arguments.distinct, date_format)
+        dateutil_time = measure(parse_date, dates)
+        date_parser_time = measure(DateParser(formats=formats).parse, dates)
+        print('{:>24} {:>11.4f}s {:>11.4f}s {:>8.1f}'.format(
+            name, dateutil_time, date_parser_time, dateutil_time / date_parser_time
+        ))
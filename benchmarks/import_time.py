@@ -0,0 +1,64 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Measures the time it takes to import pydfql using the import time profiler of python and lists the slowest modules.
+
+    python3 benchmarks/import_time.py --module pydfql --repeat 5 --top 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+PROJECT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def measure(module: str) -> Dict[str, Tuple[int, int]]:
+    """ Imports the module in a new process and returns the self and cumulative import time (in µs) of each module. """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)],
+        capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONPATH=PROJECT_DIRECTORY)
+    )
+    result = {}
+    for line in process.stderr.splitlines():
+        # e.g. 'import time:       346 |      13086 |     pydfql.parallel'
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative_time, name = line[len('import time:'):].split('|')
+        result[name.strip()] = int(self_time), int(cumulative_time)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measures the import time of a module.')
+    parser.add_argument('--module', default='pydfql', help='the module to import')
+    parser.add_argument('--repeat', type=int, default=5, help='number of times the module is imported')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest modules which are listed')
+    arguments = parser.parse_args()
+
+    measurements = [measure(arguments.module) for _ in range(arguments.repeat)]
+    print('{}: {:.1f}ms (median of {} imports)'.format(arguments.module, statistics.median(
+        measurement[arguments.module][1] for measurement in measurements
+    ) / 1000, arguments.repeat))
+    self_times = {
+        name: statistics.median(measurement[name][0] for measurement in measurements if name in measurement)
+        for name in measurements[0]
+    }
+    for name, self_time in sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:arguments.top]:
+        print('{:>10.1f}ms {}'.format(self_time / 1000, name))
@@ -0,0 +1,71 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Measures the time it takes to parse display filters of increasing size using both parser backends.
+
+    python3 benchmarks/parse_time.py --terms 10 100 1000 --depths 2 6 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pydfql.parsers import DisplayFilterParser, PYPARSING, RECURSIVE_DESCENT
+
+FIELD_NAMES = ['host', 'port', 'service']
+
+
+def create_or_chain(terms: int) -> str:
+    """ Returns a machine-generated display filter consisting of or-ed terms. """
+    return ' or '.join(
+        '(host == 10.0.{}.{} and port in {{22, 80}})'.format(term // 256, term % 256) for term in range(terms)
+    )
+
+
+def create_nested(depth: int) -> str:
+    """ Returns a display filter with the given number of nested parentheses. """
+    return '(' * depth + 'len(service) > 3' + ')' * depth
+
+
+def measure(backend: str, display_filter: str, repeat: int) -> float:
+    """ Returns the average time in seconds it takes to parse the display filter. """
+    parser = DisplayFilterParser(FIELD_NAMES, {'len': len}, backend=backend)
+    parser.parse('port == 22')  # Builds the grammar.
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parser.parse(display_filter)
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measures the parse time of both parser backends.')
+    parser.add_argument('--terms', type=int, nargs='+', default=[10, 100, 1000], help='numbers of or-ed terms')
+    parser.add_argument('--depths', type=int, nargs='+', default=[2, 6, 10], help='depths of nested parentheses')
+    parser.add_argument('--repeat', type=int, default=3, help='number of times each display filter is parsed')
+    arguments = parser.parse_args()
+
+    print('{:>8} {:>8} {:>14} {:>20} {:>8}'.format('terms', 'depth', PYPARSING, RECURSIVE_DESCENT, 'speedup'))
+    sizes = [(terms, 0) for terms in arguments.terms] + [(1, depth) for depth in arguments.depths]
+    for terms, depth in sizes:
+        display_filter = create_nested(depth) if depth else create_or_chain(terms)
+        pyparsing_time = measure(PYPARSING, display_filter, arguments.repeat)
+        recursive_descent_time = measure(RECURSIVE_DESCENT, display_filter, arguments.repeat)
+        print('{:>8} {:>8} {:>13.4f}s {:>19.4f}s {:>8.1f}'.format(
+            terms, depth, pyparsing_time, recursive_descent_time, pyparsing_time / recursive_descent_time
+        ))
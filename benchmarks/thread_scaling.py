@@ -0,0 +1,88 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Measures the throughput of a single display filter which is shared by multiple threads.
+
+    python3 benchmarks/thread_scaling.py --rows 10000 --queries 200 --threads 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pydfql import DictDisplayFilter
+from pydfql.caches import PredicateCache, ResultCache
+
+DISPLAY_FILTERS = [
+    'port == 80',
+    'port == 80 and status == open',
+    'port == 80 and status == open and not service ~= nginx',
+    'ip in { 10.0.0.0/16 } and port in { 22, 80, 443 }',
+    'len(service) > 5 or upper(status) == CLOSED',
+]
+
+
+def create_data(rows: int):
+    return [{
+        'ip': '10.{}.{}.{}'.format(i % 3, i % 256, i % 254 + 1),
+        'port': [22, 80, 443, 8080][i % 4],
+        'status': ['open', 'closed', 'filtered'][i % 3],
+        'service': ['ssh', 'http', 'nginx', 'apache', 'https-alt'][i % 5],
+    } for i in range(rows)]
+
+
+def run(display_filter: DictDisplayFilter, threads: int, queries: int) -> float:
+    """ Runs the queries using the given number of threads and returns the number of queries per second. """
+    barrier = threading.Barrier(threads + 1)
+
+    def _worker(thread: int):
+        barrier.wait()
+        for query in range(thread, queries, threads):
+            for _ in display_filter.filter(DISPLAY_FILTERS[query % len(DISPLAY_FILTERS)]):
+                pass
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(_worker, thread) for thread in range(threads)]
+        barrier.wait()
+        start = time.perf_counter()
+        for future in futures:
+            future.result()
+        return queries / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measures the throughput of a display filter shared by threads.')
+    parser.add_argument('--rows', type=int, default=10000, help='number of rows to filter')
+    parser.add_argument('--queries', type=int, default=100, help='number of queries per run')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8], help='numbers of threads')
+    parser.add_argument('--cache', action='store_true', help='enable the result and predicate cache')
+    arguments = parser.parse_args()
+
+    display_filter = DictDisplayFilter(create_data(arguments.rows))
+    if arguments.cache:
+        display_filter.result_cache = ResultCache()
+        display_filter.predicate_cache = PredicateCache()
+    baseline = None
+    print('{:>8} {:>14} {:>8}'.format('threads', 'queries/s', 'scaling'))
+    for threads in arguments.threads:
+        throughput = run(display_filter, threads, arguments.queries)
+        baseline = baseline or throughput
+        print('{:>8} {:>14.1f} {:>8.2f}'.format(threads, throughput, throughput / baseline))
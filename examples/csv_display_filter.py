@@ -15,24 +15,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import argparse
-import csv
 import logging
 import os.path
 import sys
 import traceback
 
-from pydfql.helpers import DictDisplayFilterShell
-
-
-def read_csv_file(csv_file):
-    try:
-        with open(csv_file, mode='r') as infile:
-            reader = list(csv.reader(infile))
-            field_names = reader.pop(0)
-            return [dict(zip(field_names, item)) for item in reader]
-    except Exception as err:
-        logger.debug(err)
-        raise Exception("{}: Error reading file".format(csv_file))
+from pydfql.display_filters import CSVDisplayFilter
+from pydfql.helpers import DisplayFilterShell, Table
 
 
 if __name__ == '__main__':
@@ -50,13 +39,9 @@ if __name__ == '__main__':
         sys.exit(1)
 
     try:
-        data_store = read_csv_file(csv_file)
-        if not data_store or len(data_store) == 0:
-            field_names = list()
-        else:
-            # Extract field names from header.
-            field_names = list(data_store[0].keys())
-        DictDisplayFilterShell(data_store, field_names=field_names).cmdloop()
+        # The csv file is memory-mapped, hence only the rows matching the display filter are loaded.
+        with CSVDisplayFilter(csv_file) as display_filter:
+            DisplayFilterShell(Table(display_filter)).cmdloop()
     except Exception as err:
         logger.error(str(err))
         traceback.print_exc()
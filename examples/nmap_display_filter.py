@@ -19,58 +19,10 @@ import logging
 import os.path
 import sys
 import traceback
-from collections import defaultdict
-from typing import List
 
-from pydfql.helpers import DictDisplayFilterShell
-
-try:
-    from libnmap.objects import NmapHost
-    from libnmap.parser import NmapParser
-except:
-    sys.stderr.write("Missing python3 package python-libnmap! ")
-    sys.stderr.write("Please install python-libnmap using 'pip3 install python-libnmap==0.7.0" + os.linesep)
-    sys.exit(1)
-
-
-class NmapXMLParser:
-
-    def _parse_host(self, host) -> List[List[dict]]:
-        """ Parses the host and returns a list of lists of dictionaries. """
-        data = []
-        status_ports_map = self._parse_host_ports(host)
-        for status, ports in status_ports_map.items():
-            for port_spec in ports:
-                port = str(port_spec[0])
-                protocol = port_spec[1]
-                if port and protocol:
-                    service = host.get_service(int(port), protocol=protocol)
-                    service_name = service.banner or service.service or ""
-                    data.append([{
-                        "host": host.address,
-                        "port": port,
-                        "protocol": protocol,
-                        "status": status,
-                        "service": service_name
-                    }])
-
-        return data
-
-    def _parse_host_ports(self, host):
-        """ Parses the host ports. """
-        status_ports_map = defaultdict(list)
-        for p in host.services:
-            status_ports_map[p.state].append((p.port, p.protocol))
-        return status_ports_map
-
-    def parse(self, nmap_xml_file) -> List[dict]:
-        """ Parses the nmap xml file and returns a list of dictionaries containing the data. """
-        data = []
-        nmap_data = NmapParser.parse_fromfile(nmap_xml_file)
-        for host in nmap_data.hosts:
-            for item in self._parse_host(host):
-                data += item
-        return data
+from pydfql.display_filters import IterableDisplayFilter
+from pydfql.helpers import DisplayFilterShell, Table
+from pydfql.sources import iter_nmap_xml
 
 
 if __name__ == '__main__':
@@ -88,8 +40,11 @@ if __name__ == '__main__':
         sys.exit(1)
 
     try:
-        data_store = NmapXMLParser().parse(nmap_xml_file)
-        DictDisplayFilterShell(data_store, field_names=["host", "port", "protocol", "status", "service"]).cmdloop()
+        # The nmap xml file is parsed incrementally on every filter, hence memory stays bounded even for huge scans.
+        display_filter = IterableDisplayFilter(
+            lambda: iter_nmap_xml(nmap_xml_file), field_names=["host", "port", "protocol", "status", "service"]
+        )
+        DisplayFilterShell(Table(display_filter)).cmdloop()
     except Exception as err:
         logger.error(str(err))
         traceback.print_exc()
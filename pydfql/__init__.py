@@ -15,4 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from pydfql.display_filters import \
-    DictDisplayFilter, ListDisplayFilter, ObjectDisplayFilter, SQLDisplayFilter
+    AsyncDisplayFilter, CSVDisplayFilter, DictDisplayFilter, IterableDisplayFilter, ListDisplayFilter, \
+    ObjectDisplayFilter, SQLDisplayFilter
+from pydfql.filter_sets import FilterSet
+from pydfql.plans import DisplayFilterPlan
+from pydfql.prepared import PreparedDisplayFilter
@@ -0,0 +1,347 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional, Sequence
+
+from pydfql import parallel
+from pydfql.exceptions import EvaluationError
+
+
+@dataclass
+class CacheStatistics:
+    """ Statistics about the usage of a cache. """
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    memory: int
+
+    @property
+    def hit_rate(self) -> float:
+        """ Returns the ratio of lookups which were answered by the cache. """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache:
+    """
+    A cache which is bounded by the number of entries and the approximate memory used by the entries. When one of the
+    bounds is exceeded the least recently used entries are evicted. The cache can be used by multiple threads.
+    """
+
+    def __init__(self,
+                 max_entries: int = 128,
+                 max_memory: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = sys.getsizeof):
+        """
+        Initializes the LRUCache.
+        :param max_entries: The maximum number of entries.
+        :param max_memory: The maximum number of bytes used by the entries. If None is given the memory is not bounded.
+        :param sizeof: A function which returns the approximate size of a value in bytes.
+        """
+        if max_entries < 1:
+            raise ValueError("The maximum number of entries needs to be greater than zero.")
+        self._max_entries = max_entries
+        self._max_memory = max_memory
+        self._sizeof = sizeof
+        self._entries = OrderedDict()
+        self._memory = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+        parallel.reinit_after_fork(self, '_lock', threading.RLock)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None, is_valid: Callable[[Any], bool] = None) -> Any:
+        """
+        Returns the value stored for the key and marks it as recently used, or the default if there is none.
+        :param is_valid: optional function which checks whether the stored value is still valid. Invalid values are
+                         removed and the lookup is counted as miss.
+        """
+        with self._lock:
+            try:
+                value, _ = self._entries[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            if is_valid is not None and not is_valid(value):
+                self.discard(key)
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """ Returns the value stored for the key, or the default if there is none, without counting a lookup. """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else default
+
+    def put(self, key: Hashable, value: Any):
+        """ Stores the value for the key and evicts the least recently used entries if necessary. """
+        size = self._sizeof(value)
+        with self._lock:
+            self.discard(key)
+            if self._max_memory is not None and size > self._max_memory:
+                # The value alone exceeds the memory bound. Storing it would just evict all other entries.
+                return
+            self._entries[key] = (value, size)
+            self._memory += size
+            while len(self._entries) > self._max_entries or \
+                    (self._max_memory is not None and self._memory > self._max_memory):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._memory -= evicted_size
+                self._evictions += 1
+
+    def discard(self, key: Hashable):
+        """ Removes the entry for the key if there is one. """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._memory -= entry[1]
+
+    def clear(self):
+        """ Removes all entries. Statistics are kept. """
+        with self._lock:
+            self._entries.clear()
+            self._memory = 0
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        with self._lock:
+            return CacheStatistics(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                memory=self._memory
+            )
+
+
+class _Failure:
+    """ Marks a conversion which failed. """
+
+    __slots__ = ('message',)
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+class ConversionCache:
+    """
+    Remembers the results of converting raw item values (e.g. the string '443' to the number 443.0, or '10.0.0.1' to
+    an IPv4 address), including the conversions which failed. Entries are keyed by the target of the conversion (e.g.
+    the class of an evaluator) and the raw value. Only strings are remembered, since other values which compare equal
+    may be converted differently (e.g. 0.0 and -0.0 to a string). The conversions need to depend on the target and the
+    raw value only.
+
+    Converting a value is often only a few times more expensive than looking it up, hence looking up a value does not
+    acquire a lock. Instead of moving the entry to the end of the LRU list, the entry is marked as referenced. When the
+    number of entries or the approximate memory used by the raw and the converted values exceeds the bounds, the
+    oldest entries which were not referenced since they were checked last are evicted (second chance), which
+    approximates evicting the least recently used entries. The cache can be shared by multiple evaluators and threads,
+    though the hits are counted without a lock and may be slightly too low when the cache is used by multiple threads.
+    """
+
+    def __init__(self, max_entries: int = 65536, max_memory: Optional[int] = None):
+        """
+        Initializes the ConversionCache.
+        :param max_entries: The maximum number of remembered conversions.
+        :param max_memory: The maximum number of bytes used by the raw and the converted values. If None is given the
+                           memory is not bounded.
+        """
+        if max_entries < 1:
+            raise ValueError("The maximum number of entries needs to be greater than zero.")
+        self._max_entries = max_entries
+        self._max_memory = max_memory
+        # Maps the keys to lists of the converted value, the referenced flag and the size of the entry.
+        self._entries = OrderedDict()
+        self._memory = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        parallel.reinit_after_fork(self, '_lock', threading.Lock)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def convert(self, target: Hashable, value: Any, convert: Callable[[Any], Any]) -> Any:
+        """
+        Returns the converted value, which is remembered for the target and the raw value.
+        :param target: The target of the conversion (e.g. the class of an evaluator).
+        :param value: The raw value.
+        :param convert: A function which converts the raw value, and which is only invoked if the conversion is not
+                        remembered.
+        :raises Exception when the value can not be converted. Strings which can not be converted raise an
+                EvaluationError.
+        """
+        if type(value) is not str:
+            return convert(value)
+        key = (target, value)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1] = True
+            self._hits += 1
+            result = entry[0]
+        else:
+            try:
+                result = convert(value)
+            except Exception as e:
+                # Only the message is kept, since the traceback refers to the frames of the failed conversion.
+                result = _Failure("Can not convert '{}': {}".format(value, e))
+            self._put(key, result, sys.getsizeof(value) + sys.getsizeof(
+                result.message if type(result) is _Failure else result
+            ))
+        if type(result) is _Failure:
+            raise EvaluationError(result.message)
+        return result
+
+    def _put(self, key: Hashable, result: Any, size: int):
+        with self._lock:
+            self._misses += 1
+            if key in self._entries or (self._max_memory is not None and size > self._max_memory):
+                # The value was converted by another thread, or it alone exceeds the memory bound.
+                return
+            self._entries[key] = [result, False, size]
+            self._memory += size
+            while len(self._entries) > self._max_entries or \
+                    (self._max_memory is not None and self._memory > self._max_memory):
+                oldest_key, oldest_entry = self._entries.popitem(last=False)
+                if oldest_entry[1] or oldest_key == key:
+                    # The entry was referenced since it was checked last (or was just stored), hence it gets a second
+                    # chance.
+                    oldest_entry[1] = False
+                    self._entries[oldest_key] = oldest_entry
+                    continue
+                self._memory -= oldest_entry[2]
+                self._evictions += 1
+
+    def clear(self):
+        """ Removes all remembered conversions. Statistics are kept. """
+        with self._lock:
+            self._entries.clear()
+            self._memory = 0
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        with self._lock:
+            return CacheStatistics(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                memory=self._memory
+            )
+
+
+class ResultCache:
+    """
+    Caches the positions of the items matching a display filter. Each entry is tagged with the data version it was
+    computed for. Entries for an outdated data version are treated as misses and dropped on lookup.
+
+    Note that a result cache must not be shared between display filters, since the positions refer to the data of
+    the display filter the result cache is attached to.
+    """
+
+    def __init__(self, max_entries: int = 128, max_memory: Optional[int] = None):
+        """
+        Initializes the ResultCache.
+        :param max_entries: The maximum number of cached results.
+        :param max_memory: The maximum number of bytes used by the cached results. If None is given the memory is not
+                           bounded.
+        """
+        self._cache = LRUCache(
+            max_entries=max_entries,
+            max_memory=max_memory,
+            sizeof=lambda entry: sys.getsizeof(entry[1])
+        )
+
+    def get(self, key: Hashable, data_version: Hashable) -> Optional[Sequence[int]]:
+        """ Returns the positions of the matching items or None, if there is no result for the data version. """
+        # Results which were computed for another data version are outdated and dropped.
+        entry = self._cache.get(key, is_valid=lambda entry: entry[0] == data_version)
+        return entry[1] if entry is not None else None
+
+    def put(self, key: Hashable, data_version: Hashable, positions: Sequence[int]):
+        """ Stores the positions of the matching items for the given data version. """
+        self._cache.put(key, (data_version, array('q', positions)))
+
+    def clear(self):
+        """ Removes all cached results. """
+        self._cache.clear()
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        return self._cache.statistics
+
+
+class PredicateCache:
+    """
+    Caches the bitsets of the items matching single expressions (e.g. 'port == 80'). Bit i of a bitset is set when the
+    item at position i matches the expression. Display filters which share expressions with previously evaluated
+    display filters only need to evaluate the new expressions and combine the bitsets.
+
+    Each entry is tagged with the data version it was computed for. Entries for an outdated data version are treated as
+    misses and dropped on lookup. Note that a predicate cache must not be shared between display filters.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_memory: Optional[int] = None):
+        """
+        Initializes the PredicateCache.
+        :param max_entries: The maximum number of cached bitsets.
+        :param max_memory: The maximum number of bytes used by the cached bitsets. If None is given the memory is not
+                           bounded.
+        """
+        self._cache = LRUCache(
+            max_entries=max_entries,
+            max_memory=max_memory,
+            sizeof=lambda entry: sys.getsizeof(entry[1])
+        )
+
+    def get(self, key: Hashable, data_version: Hashable) -> Optional[int]:
+        """ Returns the bitset of the matching items or None, if there is no bitset for the data version. """
+        entry = self._cache.get(key, is_valid=lambda entry: entry[0] == data_version)
+        return entry[1] if entry is not None else None
+
+    def contains(self, key: Hashable, data_version: Hashable) -> bool:
+        """ Checks whether there is a bitset for the data version without counting a lookup. """
+        entry = self._cache.peek(key)
+        return entry is not None and entry[0] == data_version
+
+    def put(self, key: Hashable, data_version: Hashable, bitset: int):
+        """ Stores the bitset of the matching items for the given data version. """
+        self._cache.put(key, (data_version, bitset))
+
+    def clear(self):
+        """ Removes all cached bitsets. """
+        self._cache.clear()
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        return self._cache.statistics
@@ -0,0 +1,217 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import argparse
+import collections
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+from typing import BinaryIO, Iterable, Iterator, List, Optional, TextIO
+
+from pydfql import sources
+from pydfql.display_filters import IterableDisplayFilter
+from pydfql.exceptions import EvaluationError, ParserError, UnknownFieldError
+
+# The number of records which are evaluated at once (by a worker process).
+BATCH_SIZE = 4096
+
+
+class _BatchFilter:
+    """ Filters batches of records using a display filter which is parsed only once. """
+
+    def __init__(self, display_filter: str):
+        """
+        Initializes the _BatchFilter.
+        :raises ParserError, when the given display filter could not be parsed correctly.
+        """
+        self._records = []
+        self._display_filter = IterableDisplayFilter(lambda: self._records)
+        self._plan = self._display_filter.parse(display_filter)
+
+    def __call__(self, records: List[dict]) -> List[dict]:
+        self._records = records
+        try:
+            return list(self._display_filter.filter(self._plan))
+        finally:
+            self._records = []
+
+
+# The batch filter of a worker process.
+_worker_filter = None
+
+
+def _init_worker(display_filter: str):
+    global _worker_filter
+    _worker_filter = _BatchFilter(display_filter)
+
+
+def _filter_batch(records: List[dict]) -> List[dict]:
+    """ Filters a batch of records (runs in a worker process). """
+    return _worker_filter(records)
+
+
+def _iter_batches(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(records)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _iter_matches(display_filter: str, records: Iterable[dict], jobs: int) -> Iterator[dict]:
+    """
+    Filters the records in batches. When more than one job is requested, the batches are evaluated by worker
+    processes, whereby only a few batches are evaluated at once, so that memory stays bounded.
+    """
+    batch_filter = _BatchFilter(display_filter)
+    if jobs <= 1:
+        for batch in _iter_batches(records, BATCH_SIZE):
+            yield from batch_filter(batch)
+        return
+    # Importing multiprocessing takes a while, hence it is imported when worker processes are used.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                             initializer=_init_worker, initargs=(display_filter,)) as executor:
+        pending = collections.deque()
+        for batch in _iter_batches(records, BATCH_SIZE):
+            pending.append(executor.submit(_filter_batch, batch))
+            if len(pending) >= jobs * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _detect_format(file_name: str) -> str:
+    """ Detects the format of a file or stdin ('-') without consuming any input. """
+    if file_name == '-':
+        return sources.detect_format(None, sys.stdin.buffer.peek(64)[:64])
+    with open(file_name, 'rb') as stream:
+        return sources.detect_format(file_name, stream.read(64))
+
+
+def _read_records(stream: BinaryIO, file_name: Optional[str], format: Optional[str], encoding: str) -> Iterator[dict]:
+    """ Returns the records of a file or stdin while the file is read. """
+    if format is None:
+        format = sources.detect_format(file_name, stream.peek(64)[:64])
+    if format == sources.NMAP_XML:
+        return sources.iter_nmap_xml(stream)
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    if format == sources.CSV:
+        return sources.iter_csv(text)
+    if format == sources.JSON:
+        return sources.iter_json(text)
+    return sources.iter_json_lines(text)
+
+
+def _iter_records(file_names: List[str], format: Optional[str], encoding: str) -> Iterator[dict]:
+    for file_name in file_names:
+        if file_name == '-':
+            yield from _read_records(sys.stdin.buffer, None, format, encoding)
+        else:
+            with open(file_name, 'rb') as stream:
+                yield from _read_records(stream, file_name, format, encoding)
+
+
+class _CSVWriter:
+    """ Writes records as csv. The field names are taken from the first record. """
+
+    def __init__(self, output: TextIO):
+        self._output = output
+        self._writer = None
+
+    def write(self, record: dict):
+        if self._writer is None:
+            self._writer = csv.DictWriter(
+                self._output, fieldnames=list(record), restval='', extrasaction='ignore', lineterminator='\n'
+            )
+            self._writer.writeheader()
+        self._writer.writerow({
+            key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in record.items()
+        })
+
+
+class _JSONLinesWriter:
+    """ Writes records as json lines. """
+
+    def __init__(self, output: TextIO):
+        self._output = output
+
+    def write(self, record: dict):
+        self._output.write(json.dumps(record, default=str) + '\n')
+
+
+def _create_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='pydfql',
+        description='Filters csv, json, json lines or nmap xml records using a display filter and writes the matching '
+                    'records to stdout.')
+    parser.add_argument('display_filter', metavar='FILTER', help='the display filter (e.g. "port == 22")')
+    parser.add_argument('files', metavar='FILE', nargs='*', default=['-'],
+                        help='the files to filter. Reads stdin when no file or "-" is given.')
+    parser.add_argument('-f', '--format', choices=[sources.CSV, sources.JSON, sources.JSON_LINES, sources.NMAP_XML],
+                        help='the format of the input. Detected by the file extension or content when omitted.')
+    parser.add_argument('-o', '--output-format', choices=['csv', 'jsonl'],
+                        help='the format of the output. Defaults to csv for csv input and to jsonl otherwise.')
+    parser.add_argument('-c', '--count', action='store_true', help='print only the number of matching records')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='the number of processes evaluating the records (default: 1)')
+    parser.add_argument('--encoding', default='utf-8', help='the encoding of the input (default: utf-8)')
+    return parser
+
+
+def main(args: List[str] = None) -> int:
+    """
+    Runs the command line tool.
+    :return: the exit status, which is 0 when any record matched, 1 when no record matched and 2 on errors.
+    """
+    arguments = _create_argument_parser().parse_intermixed_args(args)
+    output = sys.stdout
+    count = 0
+    try:
+        output_format = arguments.output_format
+        if output_format is None:
+            input_format = arguments.format or _detect_format(arguments.files[0])
+            output_format = 'csv' if input_format == sources.CSV else 'jsonl'
+        writer = _CSVWriter(output) if output_format == 'csv' else _JSONLinesWriter(output)
+        records = _iter_records(arguments.files, arguments.format, arguments.encoding)
+        for record in _iter_matches(arguments.display_filter, records, arguments.jobs):
+            count += 1
+            if not arguments.count:
+                writer.write(record)
+        if arguments.count:
+            output.write('{}\n'.format(count))
+        output.flush()
+    except BrokenPipeError:
+        # The reader of the output (e.g. head) exited, which is not an error.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+    except UnknownFieldError as err:
+        sys.stderr.write('pydfql: {}\n'.format(err))
+        return 2
+    except ParserError:
+        sys.stderr.write('pydfql: Error parsing display filter!\n')
+        return 2
+    except (EvaluationError, OSError, ValueError, csv.Error) as err:
+        sys.stderr.write('pydfql: {}\n'.format(err))
+        return 2
+    return 0 if count else 1
@@ -14,17 +14,37 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import functools, re
+import csv, functools, mmap, os, re, sqlite3, threading, warnings
 from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Sequence
+from operator import itemgetter
 from sqlite3 import Connection
-from typing import List, Dict, Callable, Union
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Dict, Callable, Optional, Tuple, Union, \
+    TYPE_CHECKING
 
+from pydfql import parallel
+from pydfql.caches import PredicateCache, ResultCache
 from pydfql.evaluators import Evaluator, DefaultEvaluator
 from pydfql.exceptions import EvaluationError
-from pydfql.models import Expression
+from pydfql.expressions import expression_key, fold, iter_expressions, to_tree
+from pydfql.models import EqualitySet, Expression
 from pydfql.factories import SlicerFactory
-from pydfql.parsers import DisplayFilterParser
+from pydfql.parsers import DisplayFilterParser, DisplayFilterNormalizer, PYPARSING
+from pydfql.parsers.normalizer import CONSTANT_FALSE, CONSTANT_TRUE
+from pydfql.planner import BITMAP, PUSHDOWN, CostBasedPlanner, Plan
+from pydfql.plans import DisplayFilterPlan
+from pydfql.prepared import PreparedDisplayFilter, get_parameters, to_parameters
+from pydfql.schemas import Schema
 from pydfql.slicers import BasicSlicer
+from pydfql.statistics import StatisticsCollector
+from pydfql.stores import DataStore, DataStoreListener
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+# The number of items whose values are passed to the evaluator at once.
+BATCH_SIZE = 1024
 
 
 class BaseDisplayFilter(ABC):
@@ -34,7 +54,8 @@ class BaseDisplayFilter(ABC):
                  field_names: List[str] = None,
                  functions: Dict[str, Callable] = None,
                  slicers: List[BasicSlicer] = None,
-                 evaluator: Evaluator = None):
+                 evaluator: Evaluator = None,
+                 schema: Dict[str, str] = None):
         """
         Initializes the BaseDisplayFilter.
         :param field_names: A list of field names which are allowed in the display filter. If no field names are given
@@ -44,6 +65,9 @@ class BaseDisplayFilter(ABC):
         :param slicers: A list of slicers. If no slicers are supplied the BasicSlicer is used per default.
         :param evaluator: The evaluator used to evaluate the expressions. If no evaluator is specified the
                           DefaultEvaluator is used.
+        :param schema: The types of the fields (see the schema property). If no schema is given all types are tried
+                       when evaluating the expressions.
+        :raises ValueError, when a type of the schema is not known.
         """
         self._slicer_factory = SlicerFactory(slicers)
         self._evaluator = evaluator if evaluator else DefaultEvaluator()
@@ -53,15 +77,84 @@ class BaseDisplayFilter(ABC):
             "upper": lambda value: value.upper()
         }
         self._field_names = field_names if field_names is not None else []
-        self._display_filter_parser = DisplayFilterParser(field_names=self._field_names, functions=self._functions)
+        self._parser_backend = PYPARSING
+        self._display_filter_parser = self._create_parser()
+        self._display_filter_normalizer = self._create_normalizer()
+        self._result_cache = None
+        self._predicate_cache = None
+        self._planner = None
+        self.schema = schema
+
+    def _create_parser(self) -> DisplayFilterParser:
+        return DisplayFilterParser(
+            field_names=self._field_names, functions=self._functions, backend=self._parser_backend
+        )
+
+    def _create_normalizer(self) -> DisplayFilterNormalizer:
+        # Bounds are only reduced by the normalizer when the comparison operators are known to order values naturally.
+        evaluator = self._evaluator if type(self._evaluator) is DefaultEvaluator else None
+        return DisplayFilterNormalizer(functions=self._functions, evaluator=evaluator)
+
+    def _normalize(self, display_filter: Union[str, DisplayFilterPlan]) -> List[Union[Expression, str]]:
+        """
+        Parses and normalizes the display filter. Plans are not parsed again, their functions are looked up instead.
+        :raises ParserError, when the given display filter could not be parsed correctly.
+        """
+        if isinstance(display_filter, DisplayFilterPlan):
+            return display_filter.bind(self._functions, self._field_names)
+        return self._display_filter_normalizer.normalize(self._display_filter_parser.parse(display_filter))
+
+    def _parse(self, display_filter: Union[str, DisplayFilterPlan]) -> List[Union[Expression, str]]:
+        """
+        Parses and normalizes the display filter and binds the expressions to the types declared in the schema.
+        :raises ParserError, when the given display filter could not be parsed correctly.
+        """
+        expressions = self._normalize(display_filter)
+        return self._schema.bind(expressions) if self._schema is not None else expressions
+
+    def parse(self, display_filter: str) -> DisplayFilterPlan:
+        """
+        Parses the display filter into a plan, which can be passed to filter instead of the display filter. Plans can
+        be pickled and converted to json, so that they can be evaluated by other display filters (e.g. in worker
+        processes) using the same functions without parsing the display filter again.
+        :raises ParserError, when the given display filter could not be parsed correctly.
+        """
+        expressions = self._normalize(display_filter)
+        if self._schema is not None:
+            # Plans do not contain the converted values, but display filters violating the schema are rejected anyway.
+            self._schema.bind(expressions)
+        return DisplayFilterPlan.from_expressions(expressions, self._functions)
+
+    def prepare(self, display_filter: str) -> PreparedDisplayFilter:
+        """
+        Parses a display filter containing placeholders (e.g. 'host == $host and port in $ports') once, so that it can
+        be executed many times using different values.
+        :raises ParserError, when the given display filter could not be parsed correctly.
+        """
+        expressions = to_parameters(self._display_filter_parser.parse(display_filter))
+        parameters = get_parameters(expressions)
+        expressions = self._display_filter_normalizer.normalize(expressions)
+        if self._schema is not None:
+            # The values are converted when they are bound, but the operators are checked up front.
+            self._schema.bind(expressions)
+        return PreparedDisplayFilter(
+            self, DisplayFilterPlan.from_expressions(expressions, self._functions), parameters
+        )
+
+    def _get_record(self, item) -> dict:
+        """ Returns the dictionary of field names and values of an item. """
+        return item
+
+    def _get_field_value(self, field: str, item) -> Any:
+        """ Returns the value of the (dot-notated) field in the item or None if the item does not contain the field. """
+        return functools.reduce(lambda d, key: d.get(key) if d else None, field.split('.'), self._get_record(item))
 
     def _get_item_value(self, expression, item) -> str:
         """
         Returns the value found at the specified key in the item. Key can be dot-notated for retrieving values
         inside nested dicts. Returns a transformed value if a function is specified.
         """
-        keys = expression.field.split('.')
-        value = functools.reduce(lambda d, key: d.get(key) if d else None, keys, item)
+        value = self._get_field_value(expression.field, item)
         sliced_value = self._slicer_factory.create(expression.slicer_specs, value).slice() if expression.slicer_specs else value
         return sliced_value if not expression.function else expression.function(sliced_value)
 
@@ -73,30 +166,362 @@ class BaseDisplayFilter(ABC):
         :return: True, if expression matches item, otherwise False.
         """
         try:
-            result = []
-            for expression in expressions:
-                if isinstance(expression, List):
-                    # The expression is actually a list of expressions (e.g. '(x or y)').
-                    # Evaluate list and convert boolean return value to a string.
-                    result.append(str(self._evaluate_expressions(expression, item)))
-                elif isinstance(expression, Expression):
-                    # Evaluate the expression and convert boolean return value to a string (e.g. 'True' or 'False').
-                    result.append(str(self._evaluator.evaluate(expression, self._get_item_value(expression, item))))
-                elif isinstance(expression, str):
-                    # The expression is actually an operator (e.g. 'and', 'or', etc.).
-                    result.append(expression)
-            # Join list of booleans and operators and evaluate this expression (e.g. 'True or False and True').
-            return bool(eval(' '.join(result)))
+            # The logical operators are applied by folding the expressions instead of evaluating them as python code,
+            # since plans may be received from other services.
+            return bool(fold(
+                expressions,
+                leaf=lambda expression: bool(
+                    self._evaluator.evaluate(expression, self._get_item_value(expression, item))
+                ),
+                not_=lambda operand: not operand,
+                and_=lambda left, right: left and right,
+                or_=lambda left, right: left or right,
+                xor_=lambda left, right: left ^ right
+            ))
         except Exception as err:
             raise EvaluationError(err)
 
-    def _filter_data(self, data: List, expressions: List[Union[Expression, str]]) -> List:
-        if expressions:
-            for item in data:
-                if self._evaluate_expressions(expressions, item):
-                    yield item
-        else:
+    def _compile(self, expressions: List[Union[Expression, str]]) -> Callable[[Any], bool]:
+        """
+        Compiles a set of possibly nested expressions into a function which tests an item. In contrast to
+        _evaluate_expressions the evaluation stops as soon as the result is known, hence the order of the operands
+        of 'and' and 'or' matters.
+        :raises EvaluationError, when the list of expressions and logical operators is malformed.
+        """
+
+        def _leaf(expression: Expression) -> Callable[[Any], bool]:
+            return lambda item: self._evaluator.evaluate(expression, self._get_item_value(expression, item))
+
+        try:
+            matches = fold(
+                expressions,
+                leaf=_leaf,
+                not_=lambda operand: lambda item: not operand(item),
+                and_=lambda left, right: lambda item: left(item) and right(item),
+                or_=lambda left, right: lambda item: left(item) or right(item),
+                xor_=lambda left, right: lambda item: bool(left(item)) ^ bool(right(item))
+            )
+        except ValueError as err:
+            raise EvaluationError(err)
+
+        def _matches(item) -> bool:
+            try:
+                return bool(matches(item))
+            except Exception as err:
+                raise EvaluationError(err)
+
+        return _matches
+
+    def _compile_batch(self,
+                       expressions: List[Union[Expression, str]],
+                       short_circuit: bool = True) -> Callable[[List], List[bool]]:
+        """
+        Compiles a set of possibly nested expressions into a function which tests a list of items at once. The values
+        of all items are passed to the evaluator at once for each expression (column-wise).
+        :param short_circuit: Whether the operands of 'and' and 'or' are only evaluated on items whose result is not
+                              known yet (like _compile does), or on all items (like _evaluate_expressions does).
+        :raises EvaluationError, when the list of expressions and logical operators is malformed.
+        """
+
+        # Each node is compiled into a function which returns the positions of the matching items out of a selection
+        # of positions.
+        def _leaf(expression: Expression) -> Callable[[List, List[int]], List[int]]:
+            def _select(items: List, selection: List[int]) -> List[int]:
+                values = [self._get_item_value(expression, items[position]) for position in selection]
+                results = self._evaluator.evaluate_batch(expression, values)
+                return [position for position, result in zip(selection, results) if result]
+            return _select
+
+        def _not(operand):
+            def _select(items: List, selection: List[int]) -> List[int]:
+                matching = set(operand(items, selection))
+                return [position for position in selection if position not in matching]
+            return _select
+
+        def _and(left, right):
+            def _select(items: List, selection: List[int]) -> List[int]:
+                if short_circuit:
+                    return right(items, left(items, selection))
+                matching = set(right(items, selection))
+                return [position for position in left(items, selection) if position in matching]
+            return _select
+
+        def _or(left, right):
+            def _select(items: List, selection: List[int]) -> List[int]:
+                matching = set(left(items, selection))
+                remaining = [position for position in selection if position not in matching] \
+                    if short_circuit else selection
+                matching.update(right(items, remaining))
+                return [position for position in selection if position in matching]
+            return _select
+
+        def _xor(left, right):
+            def _select(items: List, selection: List[int]) -> List[int]:
+                matching = set(left(items, selection)).symmetric_difference(right(items, selection))
+                return [position for position in selection if position in matching]
+            return _select
+
+        try:
+            select = fold(expressions, leaf=_leaf, not_=_not, and_=_and, or_=_or, xor_=_xor)
+        except ValueError as err:
+            raise EvaluationError(err)
+
+        def _matches(items: List) -> List[bool]:
+            try:
+                results = [False] * len(items)
+                for position in select(items, list(range(len(items)))):
+                    results[position] = True
+                return results
+            except Exception as err:
+                raise EvaluationError(err)
+
+        return _matches
+
+    def _evaluate_bitset(self, data: List, expression: Expression) -> int:
+        """
+        Evaluates a single expression on all items.
+        :return: a bitset whereby bit i is set, when the item at position i matches the expression.
+        """
+        try:
+            flags = bytearray(b'0') * len(data)
+            for start in range(0, len(data), BATCH_SIZE):
+                values = [self._get_item_value(expression, item) for item in data[start:start + BATCH_SIZE]]
+                for position, result in enumerate(self._evaluator.evaluate_batch(expression, values), start):
+                    if result:
+                        flags[position] = ord('1')
+        except Exception as err:
+            raise EvaluationError(err)
+        # Bit 0 is the least significant bit, hence the flags need to be reversed before they are converted.
+        flags.reverse()
+        return int(flags, 2) if flags else 0
+
+    def _evaluate_bitsets(self, data: List, expressions: List[Union[Expression, str]], data_version) -> int:
+        """
+        Evaluates a set of possibly nested expressions on all items using the predicate cache. Only expressions which
+        are not found in the predicate cache are evaluated. The bitsets of the individual expressions are combined
+        using the logical operators.
+        :return: a bitset whereby bit i is set, when the item at position i matches the expressions.
+        """
+        mask = (1 << len(data)) - 1
+
+        def _leaf(expression: Expression) -> int:
+            key = expression_key(expression)
+            bitset = self._predicate_cache.get(key, data_version)
+            if bitset is None:
+                bitset = self._evaluate_bitset(data, expression)
+                self._predicate_cache.put(key, data_version, bitset)
+            return bitset
+
+        try:
+            return fold(
+                expressions,
+                leaf=_leaf,
+                not_=lambda bitset: ~bitset & mask,
+                and_=lambda left, right: left & right,
+                or_=lambda left, right: left | right,
+                xor_=lambda left, right: left ^ right
+            )
+        except ValueError as err:
+            raise EvaluationError(err)
+
+    def _iter_matches(self,
+                      data: Iterable,
+                      expressions: List[Union[Expression, str]],
+                      plan: Optional[Plan]) -> Iterator[Tuple[int, Any]]:
+        """
+        Returns the positions and the items matching the normalized expressions in their original order. Lists are
+        evaluated in batches, while other iterables (e.g. streams) are evaluated item by item, so that no more items
+        are read than necessary.
+        """
+        if not isinstance(data, Sequence):
+            matches = self._create_matcher(expressions, plan)
+            for position, item in enumerate(data):
+                if matches(item):
+                    yield position, item
+            return
+        matches = self._create_batch_matcher(expressions, plan)
+        for start in range(0, len(data), BATCH_SIZE):
+            items = data[start:start + BATCH_SIZE]
+            for position, (item, result) in enumerate(zip(items, matches(items)), start):
+                if result:
+                    yield position, item
+
+    def _get_data_version(self):
+        """
+        Returns a value which changes whenever the data changes, or None if changes can not be detected. Results and
+        predicates are only cached when the data version is known.
+        """
+        return None
+
+    def _clear_caches(self):
+        """
+        Clears the cached results and predicates. Cached entries are only valid as long as the data did not change
+        and the configuration which affects matching (e.g. the functions, field names or schema) did not change.
+        """
+        if self._result_cache is not None:
+            self._result_cache.clear()
+        if self._predicate_cache is not None:
+            self._predicate_cache.clear()
+
+    def _get_cache_key(self, expressions: List[Union[Expression, str]]) -> str:
+        """ Returns the key under which the result of the normalized expressions is cached. """
+        return self._display_filter_normalizer.fingerprint(expressions)
+
+    def _plan(self, data: List, expressions: List[Union[Expression, str]], data_version) -> Optional[Plan]:
+        """ Plans the evaluation of the expressions using the planner, or returns None if no planner is set. """
+        if self._planner is None:
+            return None
+        is_cached = None
+        if self._predicate_cache is not None and data_version is not None:
+            def is_cached(expression: Expression) -> bool:
+                return self._predicate_cache.contains(expression_key(expression), data_version)
+        row_count = len(data) if hasattr(data, '__len__') else None
+        return self._planner.plan(expressions, row_count=row_count, is_cached=is_cached)
+
+    def _create_matcher(self, expressions: List[Union[Expression, str]], plan: Optional[Plan]) -> Callable[[Any], bool]:
+        """ Returns a function which tests whether an item matches the normalized expressions. """
+        if expressions is CONSTANT_FALSE:
+            return lambda item: False
+        if not expressions or expressions is CONSTANT_TRUE:
+            return lambda item: True
+        if plan is not None:
+            return self._compile(plan.expressions)
+        return functools.partial(self._evaluate_expressions, expressions)
+
+    def _create_batch_matcher(self,
+                              expressions: List[Union[Expression, str]],
+                              plan: Optional[Plan]) -> Callable[[List], List[bool]]:
+        """ Returns a function which tests whether the items of a list match the normalized expressions. """
+        if expressions is CONSTANT_FALSE:
+            return lambda items: [False] * len(items)
+        if not expressions or expressions is CONSTANT_TRUE:
+            return lambda items: [True] * len(items)
+        if plan is not None:
+            return self._compile_batch(plan.expressions)
+        return self._compile_batch(expressions, short_circuit=False)
+
+    def _filter_data(self, data: Iterable, expressions: List[Union[Expression, str]], context=None,
+                     data_version=None) -> List:
+        """
+        Filters the data using the normalized expressions.
+        :param context: Describes how the data was selected (e.g. the condition used to query the database), if it is
+                        not simply all data. Results are only reused for the same context.
+        :param data_version: The data version of the data. If None is given the current data version is used.
+        """
+        if expressions is CONSTANT_FALSE:
+            # The display filter does not match any item (e.g. 'a and not a').
+            return
+        if not expressions or expressions is CONSTANT_TRUE:
             yield from data
+            return
+        caching = self._result_cache is not None or self._predicate_cache is not None
+        if not caching:
+            data_version = None
+        elif data_version is None:
+            data_version = self._get_data_version()
+        if data_version is not None and context is not None:
+            data_version = (data_version, context)
+        plan = self._plan(data, expressions, data_version)
+        if data_version is None:
+            for _, item in self._iter_matches(data, expressions, plan):
+                yield item
+            return
+        key = self._get_cache_key(expressions)
+        positions = self._result_cache.get(key, data_version) if self._result_cache is not None else None
+        if positions is not None:
+            for position in positions:
+                yield data[position]
+            return
+        positions = array('q')
+        if self._predicate_cache is not None and (plan is None or plan.access_path == BITMAP):
+            # Convert the bitset to a string of '0' and '1' where the first character represents the first item.
+            flags = bin(self._evaluate_bitsets(data, expressions, data_version))[:1:-1]
+            position = flags.find('1')
+            while position != -1:
+                positions.append(position)
+                position = flags.find('1', position + 1)
+            if self._result_cache is not None:
+                self._result_cache.put(key, data_version, positions)
+            for position in positions:
+                yield data[position]
+            return
+        for position, item in self._iter_matches(data, expressions, plan):
+            positions.append(position)
+            yield item
+        if self._result_cache is not None:
+            # Only complete results are cached, hence the generator needs to be consumed entirely.
+            self._result_cache.put(key, data_version, positions)
+
+    @property
+    def result_cache(self) -> ResultCache:
+        return self._result_cache
+
+    @result_cache.setter
+    def result_cache(self, result_cache: ResultCache = None):
+        """
+        Sets the cache which stores the positions of the items matching a display filter. Cached results are used as
+        long as the data did not change. If None is given results are not cached.
+        """
+        self._result_cache = result_cache
+
+    @property
+    def predicate_cache(self) -> PredicateCache:
+        return self._predicate_cache
+
+    @predicate_cache.setter
+    def predicate_cache(self, predicate_cache: PredicateCache = None):
+        """
+        Sets the cache which stores the items matching the individual expressions of a display filter. When set,
+        each expression is evaluated on all items at once and its result is reused by subsequent display filters
+        sharing the same expression, as long as the data did not change. If None is given expressions are evaluated
+        item by item.
+        """
+        self._predicate_cache = predicate_cache
+
+    @property
+    def planner(self) -> CostBasedPlanner:
+        return self._planner
+
+    @planner.setter
+    def planner(self, planner: CostBasedPlanner = None):
+        """
+        Sets the planner which decides how display filters are evaluated. When set, the operands of 'and' and 'or' are
+        reordered and their evaluation stops as soon as the result is known. If None is given the expressions are
+        evaluated as they were specified.
+        """
+        self._planner = planner
+
+    @property
+    def schema(self) -> Optional[Dict[str, str]]:
+        return self._schema.fields if self._schema is not None else None
+
+    @schema.setter
+    def schema(self, schema: Dict[str, str] = None):
+        """
+        Sets the types of the fields (e.g. {'port': 'number', 'ip': 'ipv4'}). Supported types are 'number', 'string',
+        'date', 'ipv4', 'ipv6', 'mac' and 'version'. Expressions on declared fields are evaluated using a single type
+        and display filters containing comparisons which can not match any item value of the declared type are rejected
+        when they are parsed. If None is given all types are tried when evaluating the expressions.
+        :raises ValueError, when a type is not known.
+        """
+        self._schema = Schema(schema) if schema else None
+        self._clear_caches()
+
+    @property
+    def parser_backend(self) -> str:
+        return self._parser_backend
+
+    @parser_backend.setter
+    def parser_backend(self, parser_backend: str = PYPARSING):
+        """
+        Sets the backend which parses display filters. Either PYPARSING or RECURSIVE_DESCENT, which accepts the same
+        display filters but parses long or deeply nested display filters considerably faster.
+        :raises ValueError, when the backend is not known.
+        """
+        self._display_filter_parser = DisplayFilterParser(
+            field_names=self._field_names, functions=self._functions, backend=parser_backend
+        )
+        self._parser_backend = parser_backend
 
     @property
     def field_names(self) -> List[str]:
@@ -105,7 +530,8 @@ class BaseDisplayFilter(ABC):
     @field_names.setter
     def field_names(self, field_names: List[str] = None):
         self._field_names = field_names
-        self._display_filter_parser = DisplayFilterParser(field_names=self._field_names, functions=self._functions)
+        self._display_filter_parser = self._create_parser()
+        self._clear_caches()
 
     @property
     def functions(self) -> Dict[str, Callable]:
@@ -114,14 +540,186 @@ class BaseDisplayFilter(ABC):
     @functions.setter
     def functions(self, functions: Dict[str, Callable]):
         self._functions = functions
-        self._display_filter_parser = DisplayFilterParser(field_names=self._field_names, functions=self._functions)
+        self._display_filter_parser = self._create_parser()
+        self._display_filter_normalizer = self._create_normalizer()
+        # Functions are referred to by name in the cache keys, hence a function may have been replaced.
+        self._clear_caches()
 
     @abstractmethod
     def filter(self, display_filter: str):
         raise NotImplementedError()
 
 
-class DictDisplayFilter(BaseDisplayFilter):
+class InMemoryDisplayFilter(BaseDisplayFilter):
+    """
+    Base class of a display filter operating on a list of items which is kept in memory.
+
+    The items can be modified using append, extend, remove and update. Each modification increments the data version
+    and notifies the listeners registered on the underlying data store about the changed rows only.
+    """
+
+    def __init__(self,
+                 data: List,
+                 field_names: List[str] = None,
+                 functions: Dict[str, Callable] = None,
+                 slicers: List[BasicSlicer] = None,
+                 evaluator: Evaluator = None,
+                 schema: Dict[str, str] = None):
+        """
+        Initializes the InMemoryDisplayFilter.
+        :param data: A list of items to filter on. The list is copied, hence changes to the given list are not visible
+                     to the display filter. Use append, extend, remove and update to change the items instead.
+        """
+        super().__init__(
+            field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator, schema=schema
+        )
+        self._data = DataStore(data)
+        self._parallel = None
+        self._parallel_threshold = 100000
+        # The pool of worker processes and the state they inherited when they were forked (see _get_worker_pool).
+        self._worker_pool = None
+        self._worker_state = None
+        self._worker_pool_lock = threading.Lock()
+        parallel.reinit_after_fork(self, '_worker_pool_lock', threading.Lock)
+
+    def _iter_matches(self,
+                      data: List,
+                      expressions: List[Union[Expression, str]],
+                      plan: Optional[Plan]) -> Iterator[Tuple[int, Any]]:
+        if self._parallel and self._parallel > 1 and len(data) >= self._parallel_threshold and \
+                parallel.is_supported():
+            # Compiled display filters can not be pickled, hence the worker processes compile the plan on their own.
+            task = (
+                DisplayFilterPlan.from_expressions(plan.expressions if plan is not None else expressions,
+                                                   self._functions),
+                plan is not None
+            )
+            for position in self._get_worker_pool(data).iter_matching_positions(task, len(data)):
+                yield position, data[position]
+        else:
+            yield from super()._iter_matches(data, expressions, plan)
+
+    def _match_range(self, data: List, task: Tuple[DisplayFilterPlan, bool], start: int, stop: int) -> array:
+        """ Returns the positions of the items in the range which match the plan (runs in a worker process). """
+        display_filter_plan, short_circuit = task
+        matches = self._compile_batch(self._parse(display_filter_plan), short_circuit=short_circuit)
+        positions = array('q')
+        for batch_start in range(start, stop, BATCH_SIZE):
+            items = data[batch_start:min(batch_start + BATCH_SIZE, stop)]
+            for position, result in enumerate(matches(items), batch_start):
+                if result:
+                    positions.append(position)
+        return positions
+
+    def _get_worker_pool(self, data: List) -> parallel.WorkerPool:
+        """
+        Returns the pool of worker processes which inherited the data and the configuration of the display filter. The
+        pool is reused as long as neither the data nor the configuration changes, otherwise a new pool is forked.
+        """
+        state = (data, self._functions, self._field_names, self._schema, self._evaluator)
+        with self._worker_pool_lock:
+            pool = self._worker_pool
+            if pool is None or pool.workers != self._parallel or \
+                    any(value is not other for value, other in zip(state, self._worker_state)):
+                if pool is not None:
+                    # Queries which are still evaluated by the previous pool are completed.
+                    pool.close(wait=False)
+                pool = parallel.WorkerPool(functools.partial(self._match_range, data), self._parallel)
+                self._worker_pool, self._worker_state = pool, state
+            return pool
+
+    def _get_data_version(self) -> int:
+        return self._data.version
+
+    def _to_item(self, item: Any) -> Any:
+        """ Converts an item into the representation which is kept in the data store. """
+        return item
+
+    @property
+    def data_version(self) -> int:
+        """ Returns the data version which is incremented on every modification of the data. """
+        return self._data.version
+
+    @property
+    def parallel(self) -> int:
+        return self._parallel
+
+    @parallel.setter
+    def parallel(self, workers: int = None):
+        """
+        Sets the number of worker processes used to evaluate large amounts of data. The data is partitioned and
+        evaluated by forked worker processes which share the data with this process (copy-on-write), while the
+        matching items are still returned in their original order. The worker processes are forked by the first
+        display filter evaluated in parallel and are reused until the data changes or close is called. On platforms
+        which do not support forking processes a warning is issued and the data is evaluated by the current process.
+        If None is given no worker processes are used.
+        """
+        if workers and workers > 1 and not parallel.is_supported():
+            warnings.warn("Forking worker processes is not supported on this platform, hence the data is evaluated "
+                          "by the current process.", RuntimeWarning)
+        self._parallel = workers
+        if not workers:
+            self.close()
+
+    @property
+    def parallel_threshold(self) -> int:
+        return self._parallel_threshold
+
+    @parallel_threshold.setter
+    def parallel_threshold(self, parallel_threshold: int):
+        """ Sets the minimum number of items for which worker processes are used. """
+        self._parallel_threshold = parallel_threshold
+
+    def close(self):
+        """ Shuts down the worker processes, if any. The display filter can still be used afterwards. """
+        with self._worker_pool_lock:
+            pool, self._worker_pool, self._worker_state = self._worker_pool, None, None
+        if pool is not None:
+            pool.close()
+
+    def __enter__(self) -> 'InMemoryDisplayFilter':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add_listener(self, listener: DataStoreListener):
+        """ Registers a listener which is notified about any changes of the data. """
+        self._data.add_listener(listener)
+
+    def collect_statistics(self) -> StatisticsCollector:
+        """
+        Collects statistics about the data which are kept up to date when the data is modified. The statistics can be
+        used by the CostBasedPlanner (e.g. display_filter.planner = CostBasedPlanner(statistics)).
+        """
+        statistics = StatisticsCollector(get_record=self._get_record).collect(self._data)
+        self._data.add_listener(statistics)
+        return statistics
+
+    def append(self, item: Any):
+        """ Appends an item. """
+        self._data.append(self._to_item(item))
+
+    def extend(self, items: Iterable):
+        """ Appends a list of items. """
+        self._data.extend(self._to_item(item) for item in items)
+
+    def remove(self, item: Any):
+        """
+        Removes the first occurrence of the item.
+        :raises ValueError, when the item is not present.
+        """
+        self._data.remove(self._to_item(item))
+
+    def update(self, position: int, item: Any):
+        """
+        Replaces the item at the given position.
+        :raises IndexError, when the position is out of range.
+        """
+        self._data.update(position, self._to_item(item))
+
+
+class DictDisplayFilter(InMemoryDisplayFilter):
     """ Allows to filter a list of dictionaries using a display filter. """
 
     def __init__(self,
@@ -129,42 +727,90 @@ class DictDisplayFilter(BaseDisplayFilter):
                  field_names: List[str] = None,
                  functions: Dict[str, Callable] = None,
                  slicers: List[BasicSlicer] = None,
-                 evaluator: Evaluator = None):
+                 evaluator: Evaluator = None,
+                 schema: Dict[str, str] = None):
         """
         Initializes the DictDisplayFilter.
         :param data: A list of dictionaries to filter on.
         """
-        super().__init__(field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator)
-        self._data = data
+        super().__init__(
+            data, field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator, schema=schema
+        )
 
     def filter(self, display_filter: str):
         """ Filters the dictionaries using the display filter. """
-        expressions = self._display_filter_parser.parse(display_filter)
-        yield from self._filter_data(self._data, expressions)
+        expressions = self._parse(display_filter)
+        # Evaluate a snapshot of the data, so that concurrent modifications do not interfere.
+        data_version, data = self._data.snapshot()
+        yield from self._filter_data(data, expressions, data_version=data_version)
 
 
 class ListDisplayFilter(DictDisplayFilter):
-    """ Allows to filter a list of lists using a display filter. """
+    """
+    Allows to filter a list of lists (or tuples) using a display filter. The outer list is copied like by the other
+    in-memory display filters, but the inner lists are neither copied nor converted. The values are looked up by the
+    position of their field name instead and the matching lists are returned as they are.
+    """
 
     def __init__(self,
                  data: List[List],
                  field_names: List[str] = None,
                  functions: Dict[str, Callable] = None,
                  slicers: List[BasicSlicer] = None,
-                 evaluator: Evaluator = None):
+                 evaluator: Evaluator = None,
+                 schema: Dict[str, str] = None):
         """
         Initializes the ListDisplayFilter.
         :param data: A list of lists to filter on.
+        :param field_names: The names of the values in the order they appear in the lists.
         """
-        super().__init__(data=[
-            dict(zip(field_names, item)) for item in data
-        ], field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator)
+        self._field_getters = {}
+        super().__init__(
+            data, field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator, schema=schema
+        )
 
-    def filter(self, display_filter: str):
-        """ Filters the data using the display filter. """
-        for item in super().filter(display_filter):
-            # Return each item as a list of values instead of a dictionary of key values.
-            yield item.items()
+    @property
+    def field_names(self) -> List[str]:
+        return self._field_names
+
+    @field_names.setter
+    def field_names(self, field_names: List[str] = None):
+        BaseDisplayFilter.field_names.fset(self, field_names)
+        self._field_getters = {}
+
+    def _parse(self, display_filter: str) -> List[Union[Expression, str]]:
+        expressions = super()._parse(display_filter)
+        # Resolve the positions of the fields once, instead of looking them up for every item.
+        for expression in iter_expressions(expressions):
+            self._get_field_getter(expression.field)
+        return expressions
+
+    def _get_field_getter(self, field: str) -> Callable[[List], Any]:
+        getter = self._field_getters.get(field)
+        if getter is None:
+            getter = self._field_getters[field] = self._create_field_getter(field)
+        return getter
+
+    def _create_field_getter(self, field: str) -> Callable[[List], Any]:
+        """ Returns a function which looks up the value of the field in a list by the position of the field name. """
+        if field not in self._field_names:
+            return lambda item: None
+        get_value = itemgetter(self._field_names.index(field))
+
+        def _get_value(item: List) -> Any:
+            try:
+                return get_value(item)
+            except IndexError:
+                # The list is shorter than the list of field names.
+                return None
+
+        return _get_value
+
+    def _get_field_value(self, field: str, item: List) -> Any:
+        return self._get_field_getter(field)(item)
+
+    def _get_record(self, item: List) -> dict:
+        return dict(zip(self._field_names, item))
 
 
 class SQLDisplayFilter(BaseDisplayFilter):
@@ -181,7 +827,8 @@ class SQLDisplayFilter(BaseDisplayFilter):
                  column_names: List[str] = None,
                  functions: Dict[str, Callable] = None,
                  slicers: List[BasicSlicer] = None,
-                 evaluator: Evaluator = None
+                 evaluator: Evaluator = None,
+                 schema: Dict[str, str] = None
                  ):
         """
         Initializes the SQLDisplayFilter.
@@ -192,7 +839,9 @@ class SQLDisplayFilter(BaseDisplayFilter):
         """
         self._connection = connection
         self.table_name = table_name
-        super().__init__(field_names=column_names, functions=functions, slicers=slicers, evaluator=evaluator)
+        super().__init__(
+            field_names=column_names, functions=functions, slicers=slicers, evaluator=evaluator, schema=schema
+        )
 
     def _validate_table_name(self, table_name: str) -> bool:
         """ Checks whether the table name contains invalid characters or keywords"""
@@ -210,17 +859,126 @@ class SQLDisplayFilter(BaseDisplayFilter):
         ]
         return value.lower() in sql_keywords
 
+    def _get_data_version(self) -> tuple:
+        """
+        Returns the data version of the database. The data version reported by SQLite only changes when other
+        connections commit changes, hence the total number of changes made by this connection is taken into account
+        as well. Changes to the database which are made in any other way are not detected.
+        """
+        try:
+            data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+            total_changes = self._connection.total_changes
+        except Exception:
+            # Not a SQLite database (or not supported), so changes can not be detected.
+            return None
+        return self._table_name, data_version, total_changes
+
     def _get_column_names(self) -> List[str]:
         """ Retrieves the column names for the current table from the database. """
         cursor = self._connection.execute(f"SELECT * FROM {self._table_name} LIMIT(0)")
         return list(map(lambda x: x[0], cursor.description))
 
-    def _get_table_data(self) -> List[dict]:
-        """ Retrieves the table data from the database. """
-        cursor = self._connection.execute(f"SELECT * FROM {self._table_name}")
+    def _execute_query(self, condition: Tuple[str, tuple] = None) -> sqlite3.Cursor:
+        """
+        Queries the table data from the database.
+        :param condition: An optional where clause and its parameters which selects the candidate rows.
+        """
+        if condition is not None:
+            return self._connection.execute(f"SELECT * FROM {self._table_name} WHERE {condition[0]}", condition[1])
+        return self._connection.execute(f"SELECT * FROM {self._table_name}")
+
+    def _get_table_data(self, condition: Tuple[str, tuple] = None) -> List[dict]:
+        """
+        Retrieves the table data from the database.
+        :param condition: An optional where clause and its parameters which selects the candidate rows.
+        """
+        cursor = self._execute_query(condition)
         rows = cursor.fetchall()
         return [dict(zip(self.column_names, row)) for row in rows]
 
+    def _get_pushable_columns(self) -> List[str]:
+        """
+        Returns the columns whose values are not converted when they are retrieved from the database, so that
+        comparisons made by the database match the ones made by the display filter.
+        """
+        try:
+            columns = self._connection.execute(f"PRAGMA table_info({self._table_name})").fetchall()
+        except Exception:
+            # Not a SQLite database (or not supported).
+            return []
+        return [
+            name for _, name, column_type, *_ in columns
+            if self._validate_column_name(name) and (column_type or '').split('(')[0].strip().upper()
+            not in sqlite3.converters
+        ]
+
+    def _validate_column_name(self, column_name: str) -> bool:
+        """ Checks whether the column name can be used in a query without escaping. """
+        return bool(re.match("^[a-zA-Z_][a-zA-Z0-9_]*$", column_name))
+
+    def _is_plain_word(self, value) -> bool:
+        """
+        Checks whether a value is only compared as string by the DefaultEvaluator (e.g. 'Neo', but not '42', 'inf',
+        '10.0.0.1' or 'fe80::1').
+        """
+        if not isinstance(value, str) or not re.match("^[a-zA-Z_][a-zA-Z0-9_-]*$", value):
+            return False
+        try:
+            float(value)
+            return False
+        except ValueError:
+            return True
+
+    def _get_sql_condition(self, expressions: List[Union[Expression, str]]) -> Optional[Tuple[str, tuple]]:
+        """
+        Translates the normalized expressions into a where clause which selects a superset of the matching rows.
+        Expressions which can not be translated are left out of 'and' chains. Returns None when no rows can be left
+        out at all.
+        """
+        if type(self._evaluator) is not DefaultEvaluator:
+            return None
+        columns = set(self._get_pushable_columns())
+
+        def _translate(node) -> Optional[Tuple[str, tuple]]:
+            if isinstance(node, Expression):
+                if node.function or node.slicer_specs or node.field not in columns:
+                    return None
+                if node.operator is None:
+                    return f'"{node.field}" IS NOT NULL', ()
+                values = node.value if node.operator == 'in' and isinstance(node.value, EqualitySet) else \
+                    [node.value] if node.operator == '==' else None
+                if not values or not all(self._is_plain_word(value) for value in values):
+                    return None
+                placeholders = ', '.join('?' for _ in values)
+                return f'CAST("{node.field}" AS TEXT) IN ({placeholders})', tuple(values)
+            operator, operands = node
+            if operator not in ('and', 'or'):
+                return None
+            conditions = [_translate(operand) for operand in operands]
+            if operator == 'and':
+                # Leaving out operands of 'and' selects more rows, which is fine since all rows are evaluated anyway.
+                conditions = [condition for condition in conditions if condition is not None]
+                if not conditions:
+                    return None
+            elif None in conditions:
+                return None
+            clause = f' {operator.upper()} '.join('(' + condition[0] + ')' for condition in conditions)
+            return clause, tuple(parameter for condition in conditions for parameter in condition[1])
+
+        try:
+            return _translate(to_tree(expressions))
+        except ValueError:
+            return None
+
+    def _get_pushdown_condition(self, expressions: List[Union[Expression, str]]) -> Optional[Tuple[str, tuple]]:
+        """ Returns the condition used to select the candidate rows, if the planner decides to push it down. """
+        if self._planner is None or not expressions or expressions in (CONSTANT_FALSE, CONSTANT_TRUE):
+            return None
+        condition = self._get_sql_condition(expressions)
+        if condition is not None and self._planner.plan(expressions, can_push_down=True).access_path != PUSHDOWN:
+            return None
+        return condition
+
     @property
     def table_name(self) -> str:
         return self._table_name
@@ -243,12 +1001,61 @@ class SQLDisplayFilter(BaseDisplayFilter):
 
     def filter(self, display_filter: str):
         """ Filters the data using the display filter. """
-        expressions = self._display_filter_parser.parse(display_filter)
-        table_data = self._get_table_data()
-        yield from self._filter_data(table_data, expressions)
+        expressions = self._parse(display_filter)
+        condition = self._get_pushdown_condition(expressions)
+        table_data = self._get_table_data(condition)
+        yield from self._filter_data(table_data, expressions, context=condition)
+
+    def _prepare_query(self, display_filter: str) -> Tuple[Callable[[List], List[bool]], Optional[sqlite3.Cursor]]:
+        """ Parses the display filter and queries the candidate rows. Returns the batch matcher and the cursor. """
+        expressions = self._parse(display_filter)
+        plan = self._planner.plan(expressions) if self._planner is not None else None
+        matches = self._create_batch_matcher(expressions, plan)
+        if expressions is CONSTANT_FALSE:
+            return matches, None
+        return matches, self._execute_query(self._get_pushdown_condition(expressions))
+
+    def _fetch_matching_rows(self,
+                             cursor: sqlite3.Cursor,
+                             batch_size: int,
+                             matches: Callable[[List], List[bool]]) -> Tuple[int, List[dict]]:
+        """ Fetches the next batch of rows. Returns the number of fetched rows and the matching ones. """
+        rows = cursor.fetchmany(batch_size)
+        column_names = self.column_names
+        items = [dict(zip(column_names, row)) for row in rows]
+        return len(rows), [item for item, result in zip(items, matches(items)) if result]
+
+    async def afilter(self,
+                      display_filter: str,
+                      batch_size: int = 1000,
+                      executor: 'Executor' = None) -> AsyncIterator[dict]:
+        """
+        Filters the data using the display filter without blocking the event loop. The rows are fetched and evaluated
+        in batches by the executor, while the matching rows are returned by the event loop.
+        :param batch_size: The number of rows which are fetched at once.
+        :param executor: The executor used to query and evaluate the rows. If no executor is given the default executor
+                         of the event loop is used. Note that the connection needs to be created with
+                         check_same_thread=False, since it is used by the threads of the executor.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        matches, cursor = await loop.run_in_executor(executor, self._prepare_query, display_filter)
+        if cursor is None:
+            return
+        try:
+            while True:
+                count, items = await loop.run_in_executor(
+                    executor, self._fetch_matching_rows, cursor, batch_size, matches
+                )
+                for item in items:
+                    yield item
+                if count < batch_size:
+                    break
+        finally:
+            cursor.close()
 
 
-class ObjectDisplayFilter(BaseDisplayFilter):
+class ObjectDisplayFilter(InMemoryDisplayFilter):
     """ Allows to filter a list of objects using a display filter. """
 
     def __init__(self,
@@ -256,23 +1063,299 @@ class ObjectDisplayFilter(BaseDisplayFilter):
                  field_names: List[str] = None,
                  functions: Dict[str, Callable] = None,
                  slicers: List[BasicSlicer] = None,
-                 evaluator: Evaluator = None):
+                 evaluator: Evaluator = None,
+                 schema: Dict[str, str] = None):
         """
-        Initializes the DictDisplayFilter.
-        :param data: A list of dictionaries to filter on.
+        Initializes the ObjectDisplayFilter.
+        :param data: A list of objects to filter on.
         """
-        super().__init__(field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator)
-        self._data = data
+        super().__init__(
+            data, field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator, schema=schema
+        )
 
-    def _filter_data(self, data: List[object], expressions: List[Union[Expression, str]]) -> List:
-        if expressions:
-            for item in data:
-                if self._evaluate_expressions(expressions, item.__dict__):
-                    yield item
-        else:
-            yield from data
+    def _get_record(self, item: object) -> dict:
+        """ Returns the attributes of the object. """
+        return item.__dict__
 
     def filter(self, display_filter: str):
         """ Filters the objects using the display filter. """
-        expressions = self._display_filter_parser.parse(display_filter)
-        yield from self._filter_data(self._data, expressions)
+        expressions = self._parse(display_filter)
+        # Evaluate a snapshot of the data, so that concurrent modifications do not interfere.
+        data_version, data = self._data.snapshot()
+        yield from self._filter_data(data, expressions, data_version=data_version)
+
+
+class CSVDisplayFilter(BaseDisplayFilter):
+    """
+    Allows to filter a csv file using a display filter without loading it into memory.
+
+    The file is memory-mapped and the offsets of the rows are indexed once. When evaluating a display filter, rows are
+    only split into their columns and only the columns referenced by the display filter are decoded. Matching rows are
+    returned as dictionaries. The file must use an ASCII-compatible encoding (e.g. utf-8) and must not be modified
+    while it is opened.
+    """
+
+    def __init__(self,
+                 file_name: str,
+                 field_names: List[str] = None,
+                 functions: Dict[str, Callable] = None,
+                 slicers: List[BasicSlicer] = None,
+                 evaluator: Evaluator = None,
+                 delimiter: str = ',',
+                 encoding: str = 'utf-8',
+                 header: bool = True,
+                 schema: Dict[str, str] = None):
+        """
+        Initializes the CSVDisplayFilter.
+        :param file_name: The name of the csv file to filter on.
+        :param field_names: The names of the columns. If no field names are given the names found in the header are used.
+        :param delimiter: The character which separates the columns.
+        :param encoding: The encoding of the file.
+        :param header: Whether the first row contains the names of the columns.
+        """
+        self._delimiter = delimiter
+        self._encoding = encoding
+        self._file = open(file_name, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # Empty files can not be memory-mapped.
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._starts, self._ends = array('q'), array('q')
+        self._index_rows()
+        column_names = []
+        if header and self._starts:
+            column_names = self._split_row(0)
+            column_names = [self._decode(name) for name in column_names]
+            del self._starts[0], self._ends[0]
+        if field_names is None:
+            field_names = column_names
+        self._column_names = field_names
+        self._columns = {name: position for position, name in enumerate(self._column_names)}
+        super().__init__(
+            field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator, schema=schema
+        )
+
+    def _index_rows(self):
+        """ Scans the file once and stores the start and end offsets of each non-empty row. """
+        data, size = self._mmap, len(self._mmap)
+        # Rows can only span multiple lines when they contain quoted values.
+        quoted = data.find(b'"') != -1
+        position = 0
+        while position < size:
+            end = data.find(b'\n', position)
+            if end == -1:
+                end = size
+            if quoted:
+                quotes = data[position:end].count(b'"')
+                while quotes % 2 and end < size:
+                    # The row continues on the next line.
+                    next_end = data.find(b'\n', end + 1)
+                    if next_end == -1:
+                        next_end = size
+                    quotes += data[end:next_end].count(b'"')
+                    end = next_end
+            row_end = end - 1 if end > position and data[end - 1:end] == b'\r' else end
+            if row_end > position:
+                self._starts.append(position)
+                self._ends.append(row_end)
+            position = end + 1
+
+    def _decode(self, value: Union[bytes, str]) -> str:
+        return value.decode(self._encoding) if isinstance(value, bytes) else value
+
+    def _split_row(self, row: int) -> List[Union[bytes, str]]:
+        """
+        Splits the row into its columns. Rows without quotes are split without decoding them, so that only the
+        columns which are actually used need to be decoded.
+        """
+        line = self._mmap[self._starts[row]:self._ends[row]]
+        if b'"' not in line:
+            return line.split(self._delimiter.encode(self._encoding))
+        return next(csv.reader([line.decode(self._encoding)], delimiter=self._delimiter), [])
+
+    def _get_rows(self) -> '_CSVRows':
+        return _CSVRows(self._split_row, len(self._starts))
+
+    def _get_field_value(self, field: str, columns: List[Union[bytes, str]]) -> Any:
+        position = self._columns.get(field)
+        if position is None:
+            return None
+        return self._decode(columns[position]) if position < len(columns) else None
+
+    def _get_record(self, columns: List[Union[bytes, str]]) -> dict:
+        """ Returns the dictionary of column names and values of a row. """
+        return dict(zip(self._column_names, (self._decode(value) for value in columns)))
+
+    def _get_data_version(self):
+        # The file must not be modified while it is opened, hence the data never changes.
+        return 0
+
+    @property
+    def column_names(self) -> List[str]:
+        return self._column_names
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def collect_statistics(self) -> StatisticsCollector:
+        """
+        Collects statistics about the rows of the csv file. The statistics can be used by the CostBasedPlanner
+        (e.g. display_filter.planner = CostBasedPlanner(statistics)).
+        """
+        return StatisticsCollector(get_record=self._get_record).collect(self._get_rows())
+
+    def filter(self, display_filter: str) -> Iterator[dict]:
+        """ Filters the rows of the csv file using the display filter. """
+        expressions = self._parse(display_filter)
+        for columns in self._filter_data(self._get_rows(), expressions):
+            yield self._get_record(columns)
+
+    def close(self):
+        """ Closes the csv file. """
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> 'CSVDisplayFilter':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _CSVRows(Sequence):
+    """
+    The rows of a csv file, which are split into their columns when they are accessed. Since the items are evaluated
+    in batches and slices are lists of split rows, each row is split once per batch without keeping any state which
+    would be shared by concurrent queries.
+    """
+
+    def __init__(self, split_row: Callable[[int], List[Union[bytes, str]]], length: int):
+        self._split_row = split_row
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self._split_row(row) for row in range(*index.indices(self._length))]
+        return self._split_row(range(self._length)[index])
+
+
+class IterableDisplayFilter(BaseDisplayFilter):
+    """
+    Allows to filter dictionaries of an iterable (e.g. a file reader or a network stream) using a display filter.
+
+    The items are evaluated in a single pass and are not kept in memory. Since iterators (e.g. generators) can only be
+    consumed once, a function which creates a new iterable (e.g. opens the file again) can be supplied instead, which
+    is invoked on every call to filter.
+    """
+
+    def __init__(self,
+                 data: Union[Iterable[dict], Callable[[], Iterable[dict]]],
+                 field_names: List[str] = None,
+                 functions: Dict[str, Callable] = None,
+                 slicers: List[BasicSlicer] = None,
+                 evaluator: Evaluator = None,
+                 schema: Dict[str, str] = None):
+        """
+        Initializes the IterableDisplayFilter.
+        :param data: An iterable of dictionaries or a function which returns a new iterable of dictionaries.
+        """
+        super().__init__(
+            field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator, schema=schema
+        )
+        self._data = data
+        self._consumed = False
+
+    def _get_iterable(self) -> Iterable[dict]:
+        """
+        Returns the iterable to filter on.
+        :raises ValueError, when the iterator was already consumed by a previous call to filter.
+        """
+        if callable(self._data):
+            return self._data()
+        if iter(self._data) is self._data:
+            # Iterators can only be consumed once.
+            if self._consumed:
+                raise ValueError("The iterator was already consumed. Supply a function creating an iterable instead.")
+            self._consumed = True
+        return self._data
+
+    def filter(self, display_filter: str):
+        """ Filters the dictionaries using the display filter. """
+        expressions = self._parse(display_filter)
+        yield from self._filter_data(self._get_iterable(), expressions)
+
+
+class AsyncDisplayFilter(BaseDisplayFilter):
+    """
+    Allows to filter dictionaries received from an async iterable (e.g. a stream of scan results) using a display
+    filter. Since evaluating items is CPU-bound, control is yielded to the event loop periodically.
+
+    As for the IterableDisplayFilter, a function which creates a new (async) iterable can be supplied instead of the
+    iterable, which is invoked on every call to filter.
+    """
+
+    def __init__(self,
+                 data: Union[AsyncIterable[dict], Iterable[dict],
+                             Callable[[], Union[AsyncIterable[dict], Iterable[dict]]]],
+                 field_names: List[str] = None,
+                 functions: Dict[str, Callable] = None,
+                 slicers: List[BasicSlicer] = None,
+                 evaluator: Evaluator = None,
+                 batch_size: int = 1000,
+                 schema: Dict[str, str] = None):
+        """
+        Initializes the AsyncDisplayFilter.
+        :param data: An async iterable or an iterable of dictionaries or a function which returns a new one of those.
+        :param batch_size: The number of items which are evaluated before control is yielded to the event loop.
+        """
+        super().__init__(
+            field_names=field_names, functions=functions, slicers=slicers, evaluator=evaluator, schema=schema
+        )
+        self._data = data
+        self._consumed = False
+        self._batch_size = batch_size
+
+    def _get_iterable(self) -> Union[AsyncIterable[dict], Iterable[dict]]:
+        """
+        Returns the async iterable or the iterable to filter on.
+        :raises ValueError, when the iterator was already consumed by a previous call to filter.
+        """
+        data = self._data() if callable(self._data) else self._data
+        if data is self._data:
+            is_iterator = data.__aiter__() is data if isinstance(data, AsyncIterable) else iter(data) is data
+            if is_iterator:
+                # Iterators can only be consumed once.
+                if self._consumed:
+                    raise ValueError(
+                        "The iterator was already consumed. Supply a function creating an iterable instead."
+                    )
+                self._consumed = True
+        return data
+
+    async def filter(self, display_filter: str) -> AsyncIterator[dict]:
+        """ Filters the dictionaries using the display filter. """
+        import asyncio
+        expressions = self._parse(display_filter)
+        if expressions is CONSTANT_FALSE:
+            return
+        plan = self._planner.plan(expressions) if self._planner is not None else None
+        matches = self._create_matcher(expressions, plan)
+        data = self._get_iterable()
+        evaluated = 0
+        if isinstance(data, AsyncIterable):
+            async for item in data:
+                if matches(item):
+                    yield item
+                evaluated += 1
+                if evaluated % self._batch_size == 0:
+                    await asyncio.sleep(0)
+        else:
+            for item in data:
+                if matches(item):
+                    yield item
+                evaluated += 1
+                if evaluated % self._batch_size == 0:
+                    await asyncio.sleep(0)
@@ -15,43 +15,30 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import re
+from types import MappingProxyType
 from typing import List, Dict
+
+from pydfql.caches import ConversionCache
+from pydfql.models import EqualitySet, Expression, TypedExpression
 from pydfql.evaluators.common import FieldEvaluator, IPv4RangeEvaluator, ListEvaluator, NumberEvaluator, \
-    IntegerEvaluator, StringEvaluator, DateEvaluator, IPv4AddressEvaluator, IPv6AddressEvaluator, AbstractBasicEvaluator, \
-    VersionStringEvaluator
+    IntegerEvaluator, StringEvaluator, DateEvaluator, DateParser, IPv4AddressEvaluator, IPv6AddressEvaluator, \
+    AbstractBasicEvaluator, VersionStringEvaluator, UNSUPPORTED
 
 
 class Evaluator:
     """ Evaluates an expression and item value. """
 
     # Dictionary of evaluators. Key is the operator. There can be more than one evaluator for a given operator.
-    evaluators = {
-        # eq
-        '==': [],
-        # neq
-        '!=': [],
-        # matches
-        '~': [],
-        # contains
-        '~=': [],
-        # ge
-        '>=': [],
-        # gt
-        '>': [],
-        # le
-        '<=': [],
-        # lt
-        '<': [],
-        # (no alternative symbol)
-        '&': [],
-        # (no alternative symbol)
-        'in': []
-    }
+    # The dictionary is shared by all instances which do not specify their own evaluators, hence it is immutable.
+    evaluators = MappingProxyType({
+        operator: () for operator in ['==', '!=', '~', '~=', '>=', '>', '<=', '<', '&', 'in']
+    })
 
     def __init__(self, evaluators: Dict[str, List[AbstractBasicEvaluator]]):
         """
         Initializes the Evaluator.
-        :param evaluators: A dictionary of evaluators whereby each key stands for a operator.
+        :param evaluators: A dictionary of evaluators whereby each key stands for a operator. Evaluators are shared by
+                           all threads using the evaluator, hence they must not keep any state while evaluating.
         """
         self.evaluators = evaluators
 
@@ -84,11 +71,30 @@ class Evaluator:
             # Returns True, if the value matches the expression using the given evaluator, otherwise False.
             return evaluator.evaluate(expression.value, expression.operator, item_value)
 
+    def _evaluate_typed(self, expression: TypedExpression, item_value) -> bool:
+        """ Returns whether the value matches the expression using the evaluator the expression is bound to. """
+        evaluate = expression.evaluator.evaluate_converted
+        value, operator = expression.converted_value, expression.operator
+        if isinstance(item_value, List) and item_value != []:
+            # Lists match when any (or for the '!='-operator all) of their values match.
+            if operator != '!=':
+                return any(evaluate(value, operator, item_value) for item_value in item_value)
+            return all(evaluate(value, operator, item_value) for item_value in item_value)
+        return evaluate(value, operator, item_value)
+
     def evaluate(self, expression, item_value) -> bool:
         """ Returns whether the value matches the expression. """
+        if isinstance(expression, TypedExpression):
+            # The type of the field is known, hence there is no need to try the evaluators in turn.
+            return self._evaluate_typed(expression, item_value)
         if not expression.operator:
             # When no operator is given only the existence of the field/key in the given item is tested.
             return FieldEvaluator().evaluate(expression, expression.operator, item_value)
+        if expression.operator == 'in' and isinstance(expression.value, EqualitySet):
+            # Merged equality comparisons (e.g. 'a == 1 or a == 2') keep the semantics of the '=='-operator.
+            return any(
+                self.evaluate(Expression(expression.field, '==', value), item_value) for value in expression.value
+            )
         # Returns True, when any fitting evaluator evaluates to True, otherwise False.
         for evaluator in self._get_evaluators(expression, item_value):
             result = self._evaluate(evaluator, expression, item_value)
@@ -98,11 +104,75 @@ class Evaluator:
                 return result
         return False
 
+    def evaluate_batch(self, expression, item_values: List) -> List[bool]:
+        """
+        Returns whether the values match the expression. The result is the same as calling evaluate for each value,
+        but each evaluator evaluates all values at once.
+        """
+        if type(self).evaluate is not Evaluator.evaluate:
+            # The evaluation is customized, hence each value is evaluated on its own.
+            return [self.evaluate(expression, item_value) for item_value in item_values]
+        if not expression.operator:
+            return FieldEvaluator().evaluate_batch(expression, expression.operator, item_values)
+        if isinstance(expression, TypedExpression):
+            return self._evaluate_typed_batch(expression, item_values)
+        if expression.operator == 'in' and isinstance(expression.value, EqualitySet):
+            results = [False] * len(item_values)
+            for value in expression.value:
+                batch = self.evaluate_batch(Expression(expression.field, '==', value), item_values)
+                results = [result or other_result for result, other_result in zip(results, batch)]
+            return results
+        results = [False] * len(item_values)
+        pending = []
+        for position, item_value in enumerate(item_values):
+            if isinstance(item_value, list) and item_value != []:
+                # Lists match when any (or for the '!='-operator all) of their values match.
+                results[position] = self.evaluate(expression, item_value)
+            else:
+                pending.append(position)
+        for evaluator in self.evaluators.get(expression.operator):
+            if not pending:
+                break
+            undecided = []
+            batch = evaluator._evaluate_batch(
+                expression.value, expression.operator, [item_values[position] for position in pending]
+            )
+            for position, result in zip(pending, batch):
+                if result is UNSUPPORTED or not (result or expression.operator == '!='):
+                    # Try the next evaluator, unless the first fitting evaluator decided the '!='-operator.
+                    undecided.append(position)
+                else:
+                    results[position] = result
+            pending = undecided
+        return results
+
+    def _evaluate_typed_batch(self, expression: TypedExpression, item_values: List) -> List[bool]:
+        results = [False] * len(item_values)
+        pending = []
+        for position, item_value in enumerate(item_values):
+            if isinstance(item_value, list) and item_value != []:
+                results[position] = self._evaluate_typed(expression, item_value)
+            else:
+                pending.append(position)
+        batch = expression.evaluator.evaluate_converted_batch(
+            expression.converted_value, expression.operator, [item_values[position] for position in pending]
+        )
+        for position, result in zip(pending, batch):
+            results[position] = result
+        return results
+
 
 class DefaultEvaluator(Evaluator):
     """ The default implementation of an evaluator supporting all kind of types. """
 
-    def __init__(self):
+    def __init__(self, date_parser: DateParser = None, conversion_cache: ConversionCache = None):
+        """
+        Initializes the DefaultEvaluator.
+        :param date_parser: The parser of dates (e.g. to parse dates using other formats). If no parser is given the
+                            default_date_parser is used, which is shared by all evaluators.
+        :param conversion_cache: The cache of converted item values (e.g. to bound its memory). If no cache is given
+                                 the default_conversion_cache is used, which is shared by all evaluators.
+        """
         super().__init__({
             # eq
             '==': [
@@ -126,28 +196,28 @@ class DefaultEvaluator(Evaluator):
             '>=': [
                 IPv4AddressEvaluator(lambda expression_value, item_value: item_value >= expression_value),
                 IPv6AddressEvaluator(lambda expression_value, item_value: item_value >= expression_value),
-                DateEvaluator(lambda expression_value, item_value: item_value >= expression_value),
+                DateEvaluator(lambda expression_value, item_value: item_value >= expression_value, date_parser),
                 NumberEvaluator(lambda expression_value, item_value: item_value >= expression_value),
             ],
             # gt
             '>': [
                 IPv4AddressEvaluator(lambda expression_value, item_value: item_value > expression_value),
                 IPv6AddressEvaluator(lambda expression_value, item_value: item_value > expression_value),
-                DateEvaluator(lambda expression_value, item_value: item_value > expression_value),
+                DateEvaluator(lambda expression_value, item_value: item_value > expression_value, date_parser),
                 NumberEvaluator(lambda expression_value, item_value: item_value > expression_value),
             ],
             # le
             '<=': [
                 IPv4AddressEvaluator(lambda expression_value, item_value: item_value <= expression_value),
                 IPv6AddressEvaluator(lambda expression_value, item_value: item_value <= expression_value),
-                DateEvaluator(lambda expression_value, item_value: item_value <= expression_value),
+                DateEvaluator(lambda expression_value, item_value: item_value <= expression_value, date_parser),
                 NumberEvaluator(lambda expression_value, item_value: item_value <= expression_value),
             ],
             # lt
             '<': [
                 IPv4AddressEvaluator(lambda expression_value, item_value: item_value < expression_value),
                 IPv6AddressEvaluator(lambda expression_value, item_value: item_value < expression_value),
-                DateEvaluator(lambda expression_value, item_value: item_value < expression_value),
+                DateEvaluator(lambda expression_value, item_value: item_value < expression_value, date_parser),
                 NumberEvaluator(lambda expression_value, item_value: item_value < expression_value),
             ],
             # (no alternative symbol)
@@ -155,3 +225,8 @@ class DefaultEvaluator(Evaluator):
             # (no alternative symbol)
             'in': [IPv4RangeEvaluator(), ListEvaluator()]
         })
+        if conversion_cache is not None:
+            for evaluators in self.evaluators.values():
+                for evaluator in evaluators:
+                    if evaluator.conversion_cache is not None:
+                        evaluator.conversion_cache = conversion_cache
@@ -14,27 +14,65 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import ipaddress
+import bisect
 import logging
+import re
+import sys
 from abc import ABC, abstractmethod
-from typing import Optional, Union, Callable, Any, List
-
-import ipranger
-import pyparsing
-from dateutil.parser import parse as parse_date
-from packaging import version
+from typing import Optional, Union, Callable, Any, List, TYPE_CHECKING
 
+from pydfql.caches import ConversionCache, LRUCache
 from pydfql.exceptions import EvaluationError
 
+if TYPE_CHECKING:
+    import datetime
+    import ipaddress
+    from packaging import version
+
+# Note that the modules used to convert values (e.g. dateutil, ipaddress, packaging) are imported when first used, since
+# importing them takes a while and most display filters only need some of them.
+
+
+# Marks item values which an evaluator is not able to evaluate when evaluating many item values at once.
+UNSUPPORTED = object()
+
+# The maximum number of dates which are remembered by a DateParser.
+DATE_CACHE_SIZE = 65536
+# The maximum number of lists whose matchers are remembered by a ListEvaluator.
+LIST_MATCHERS_SIZE = 1024
+
+# ISO 8601 dates and times which are parsed the same way by datetime.fromisoformat and dateutil.
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?(?:Z|[+-]\d{2}:\d{2})?)?')
+# Marks dates which could not be parsed and dates which are not cached.
+_INVALID = object()
+_MISSING = object()
+
+# The conversion cache shared by all evaluators which remember converted item values (see ConversionCache).
+default_conversion_cache = ConversionCache()
+
 
 class AbstractEvaluator(ABC):
     """
     A basic evaluator which is ment to be used as base class for other evaluators and is quite useless on its own.
     """
 
+    # Whether the evaluator remembers converted item values in the default_conversion_cache. The conversion of item
+    # values needs to depend on the item value only.
+    _caches_conversions = False
+
     def __init__(self):
         """ Initializes the BasicEvaluator. """
         self._logger = logging.getLogger(__name__)
+        self._conversion_cache = default_conversion_cache if self._caches_conversions else None
+
+    @property
+    def conversion_cache(self) -> Optional[ConversionCache]:
+        return self._conversion_cache
+
+    @conversion_cache.setter
+    def conversion_cache(self, conversion_cache: Optional[ConversionCache]):
+        """ Sets the cache of the converted item values. If None is given, item values are converted each time. """
+        self._conversion_cache = conversion_cache
 
     @abstractmethod
     def _convert_expression_value(self, value: Optional[Union[int, str]]) -> Optional[Any]:
@@ -66,6 +104,27 @@ class AbstractEvaluator(ABC):
         """
         pass
 
+    def convert_expression_value(self, value: Optional[Union[int, str]]) -> Optional[Any]:
+        """
+        Converts a given value as defined in the expression to the representation used during evaluation.
+        :raises Exception when value can not be converted.
+        """
+        return self._convert_expression_value(value)
+
+    def convert_item_value(self, value: Optional[Any]) -> Optional[Any]:
+        """
+        Converts a given value from the datastore to the representation used during evaluation.
+        :raises Exception when value can not be converted.
+        """
+        return self._convert_cached_item_value(value)
+
+    def _convert_cached_item_value(self, value: Optional[Any]) -> Optional[Any]:
+        """ Converts a given value from the datastore using the conversion cache, if there is one. """
+        conversion_cache = self._conversion_cache
+        if conversion_cache is None:
+            return self._convert_item_value(value)
+        return conversion_cache.convert(type(self), value, self._convert_item_value)
+
     def is_type(self, expression_value: Any, item_value: Any) -> bool:
         """
         Returns whether the evaluator is able to evaluate the expression- and item-value.
@@ -73,7 +132,7 @@ class AbstractEvaluator(ABC):
         """
         try:
             self._convert_expression_value(expression_value)
-            self._convert_item_value(item_value)
+            self._convert_cached_item_value(item_value)
             return True
         except:
             return False
@@ -88,18 +147,152 @@ class AbstractEvaluator(ABC):
         try:
             evaluate = self._evaluate(
                 self._convert_expression_value(expression_value),
-                self._convert_item_value(item_value)
+                self._convert_cached_item_value(item_value)
             )
-            self._logger.debug(self.__class__.__name__ + ": '{}' {} '{}' = {}".format(
-                expression_value, operator, item_value, evaluate
-            ))
+            # Formatting large expression values (e.g. lists) is expensive, hence only done when debugging.
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug(self.__class__.__name__ + ": '{}' {} '{}' = {}".format(
+                    expression_value, operator, item_value, evaluate
+                ))
             return evaluate
         except:
-            self._logger.debug(self.__class__.__name__ + ": '{}' {} '{}' = {}".format(
-                expression_value, operator, item_value, False
-            ))
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug(self.__class__.__name__ + ": '{}' {} '{}' = {}".format(
+                    expression_value, operator, item_value, False
+                ))
             return False or operator == '!='
 
+    def evaluate_batch(self,
+                       expression_value: Optional[Union[int, str]],
+                       operator: str,
+                       item_values: List[Any]) -> List[bool]:
+        """
+        Evaluates the expression value against many item values. The result is the same as calling evaluate for each
+        item value, but the expression value is converted only once.
+        :param expression_value: a given untransformed value from the expression.
+        :param item_values: a list of untransformed values from the datastore.
+        :return: a list which contains True for each item value matching the expression, otherwise False.
+        """
+        results = self._evaluate_batch(expression_value, operator, item_values)
+        if type(self).is_type is not AbstractEvaluator.is_type:
+            # Item values which are not of the type of the evaluator may still be evaluated using evaluate.
+            return [
+                self.evaluate(expression_value, operator, item_value) if result is UNSUPPORTED else result
+                for item_value, result in zip(item_values, results)
+            ]
+        # Item values which can not be converted do not match the expression (except for the '!='-operator).
+        return [operator == '!=' if result is UNSUPPORTED else result for result in results]
+
+    def _evaluate_batch(self,
+                        expression_value: Optional[Union[int, str]],
+                        operator: str,
+                        item_values: List[Any]) -> List[Any]:
+        """
+        Evaluates the expression value against many item values.
+        :return: a list which contains the result of evaluate for each item value, or UNSUPPORTED when the evaluator is
+                 not able to evaluate the item value (see is_type).
+        """
+        if type(self).evaluate is not AbstractEvaluator.evaluate or type(self).is_type is not AbstractEvaluator.is_type:
+            # The evaluator customizes the evaluation, hence each item value is evaluated on its own.
+            return [
+                self.evaluate(expression_value, operator, item_value)
+                if self.is_type(expression_value, item_value) else UNSUPPORTED
+                for item_value in item_values
+            ]
+        try:
+            converted_expression_value = self._convert_expression_value(expression_value)
+        except Exception:
+            return [UNSUPPORTED] * len(item_values)
+        results = self._evaluate_converted_batch(converted_expression_value, operator, item_values)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            for item_value, result in zip(item_values, results):
+                self._logger.debug(self.__class__.__name__ + ": '{}' {} '{}' = {}".format(
+                    expression_value, operator, item_value, False if result is UNSUPPORTED else result
+                ))
+        return results
+
+    def _evaluate_converted_batch(self, expression_value: Any, operator: str, item_values: List[Any]) -> List[Any]:
+        """
+        Evaluates the converted expression value against many item values.
+        :return: a list which contains the result for each item value, or UNSUPPORTED when the item value could not be
+                 converted.
+        """
+        evaluate = self._evaluate
+        failed = operator == '!='
+        results = []
+        for item_value in self._convert_item_values(item_values):
+            if item_value is UNSUPPORTED:
+                results.append(UNSUPPORTED)
+                continue
+            try:
+                results.append(evaluate(expression_value, item_value))
+            except Exception:
+                results.append(failed)
+        return results
+
+    def evaluate_converted(self, expression_value: Any, operator: str, item_value: Any) -> bool:
+        """
+        Evaluates the expression- and item-value without checking whether the evaluator is able to evaluate them.
+        :param expression_value: a value from the expression which was already converted using
+                                 convert_expression_value.
+        :param item_value: a given untransformed value from the datastore.
+        :return: True, when the item-value matches the expression, otherwise False. Item values which can not be
+                 converted do not match the expression (except for the '!='-operator).
+        """
+        try:
+            return self._evaluate(expression_value, self._convert_cached_item_value(item_value))
+        except Exception:
+            return operator == '!='
+
+    def evaluate_converted_batch(self, expression_value: Any, operator: str, item_values: List[Any]) -> List[bool]:
+        """ Evaluates the converted expression value against many item values (see evaluate_converted). """
+        failed = operator == '!='
+        return [
+            failed if result is UNSUPPORTED else result
+            for result in self._evaluate_converted_batch(expression_value, operator, item_values)
+        ]
+
+    def _convert_item_values(self, values: List[Any]) -> List[Any]:
+        """
+        Converts many values from the datastore at once.
+        :return: the list of transformed values, containing UNSUPPORTED for each value which could not be converted.
+        """
+        convert = self._convert_cached_item_value
+        result = []
+        for value in values:
+            try:
+                result.append(convert(value))
+            except Exception:
+                result.append(UNSUPPORTED)
+        return result
+
+    def _overrides_conversion(self, cls: type) -> bool:
+        """ Checks whether a subclass of the given class changes how values are converted. """
+        return type(self)._convert_item_value is not cls._convert_item_value or \
+            type(self)._convert_expression_value is not cls._convert_expression_value
+
+
+def _convert_item_values_memoized(convert: Callable[[Any], Any], values: List[Any]) -> List[Any]:
+    """ Converts many values using an expensive conversion function which is invoked only once per distinct value. """
+    converted = {}
+    result = []
+    for value in values:
+        try:
+            key = (type(value), value)
+            if key not in converted:
+                try:
+                    converted[key] = convert(value)
+                except Exception:
+                    converted[key] = UNSUPPORTED
+            result.append(converted[key])
+        except TypeError:
+            # The value is not hashable.
+            try:
+                result.append(convert(value))
+            except Exception:
+                result.append(UNSUPPORTED)
+    return result
+
 
 class AbstractBasicEvaluator(AbstractEvaluator):
     """ Basic but still abstract implementation of an evaluator which does not transform expression and item value.  """
@@ -150,47 +343,156 @@ class FieldEvaluator(AbstractBasicEvaluator):
         return item_value is not None and item_value != "" and item_value != [] and item_value != {}
 
 
+class _ListMatcher:
+    """
+    Tests whether an item value is found in the list of an expression (see ListEvaluator). The list is converted once
+    into sets of numbers and other values and into sorted, merged ranges, so that testing an item value takes a hash
+    lookup and a binary search instead of comparing the item value with each value of the list.
+    """
+
+    def __init__(self, expression_value: List[Any]):
+        numbers = set()
+        # The values which can not be converted to float are compared with item values which can be converted to float.
+        others = []
+        # All values are compared with item values which can not be converted to float.
+        values = []
+        ranges = []
+        self._collect(expression_value, numbers, others, values, ranges)
+        self._numbers = frozenset(numbers)
+        self._others = self._to_set(others)
+        self._values = self._to_set(values)
+        self._lowers, self._uppers = [], []
+        for lower, upper in sorted(ranges):
+            if self._uppers and lower <= self._uppers[-1]:
+                # The range overlaps with the previous one.
+                self._uppers[-1] = max(upper, self._uppers[-1])
+            else:
+                self._lowers.append(lower)
+                self._uppers.append(upper)
+
+    def _collect(self, expression_value: List[Any], numbers: set, others: List, values: List, ranges: List):
+        for ev in expression_value:
+            if isinstance(ev, List):
+                if '..' in ev or '-' in ev:
+                    try:
+                        l, _, r = ev
+                        lower, upper = float(l), float(r)
+                    except Exception:
+                        # The range does not match any item value.
+                        continue
+                    if lower <= upper:
+                        ranges.append((lower, upper))
+                else:
+                    self._collect(ev, numbers, others, values, ranges)
+                continue
+            try:
+                number = float(ev)
+                if number == number:
+                    # Not a Number (NaN) is not equal to any number.
+                    numbers.add(number)
+            except Exception:
+                others.append(ev)
+            values.append(ev)
+
+    def _to_set(self, values: List[Any]) -> Union[frozenset, List[Any]]:
+        try:
+            return frozenset(values)
+        except TypeError:
+            # Values which are not hashable are compared one by one.
+            return values
+
+    def _contains(self, values: Union[frozenset, List[Any]], item_value: Any) -> bool:
+        if isinstance(values, frozenset):
+            try:
+                return item_value in values
+            except Exception:
+                # The item value is not hashable or can not be compared.
+                pass
+        for value in values:
+            try:
+                if item_value == value:
+                    return True
+            except Exception:
+                pass
+        return False
+
+    def matches(self, item_value: Any, number: Optional[float]) -> bool:
+        """
+        Tests whether the item value is found in the list.
+        :param number: The float representation of the item value, or None if it can not be converted to float.
+        """
+        if number is None:
+            return self._contains(self._values, item_value)
+        if number in self._numbers:
+            return True
+        position = bisect.bisect_right(self._lowers, number) - 1
+        if position >= 0 and number <= self._uppers[position]:
+            return True
+        return self._contains(self._others, item_value)
+
+
 class ListEvaluator(AbstractBasicEvaluator):
     """
     A basic evaluator which tests whether a given item can be found in the expression (e.g. "x in {'a', 'b', 'c'}").
     """
 
+    def __init__(self):
+        super().__init__()
+        # The lists and their matchers by the id of the list. Since the lists of parsed display filters are not
+        # modified, each list is converted only once, even when several lists are evaluated alternately. The list is
+        # kept together with its matcher, so that its id is not reused by another list.
+        self._matchers = {}
+
     def is_type(self, expression_value: Any, item_value: Any) -> bool:
         return isinstance(expression_value, List)
 
+    def _get_matcher(self, expression_value: List[Any]) -> _ListMatcher:
+        entry = self._matchers.get(id(expression_value))
+        if entry is not None and entry[0] is expression_value:
+            return entry[1]
+        matcher = _ListMatcher(expression_value)
+        if len(self._matchers) >= LIST_MATCHERS_SIZE:
+            # The lists of display filters which are no longer evaluated are dropped.
+            self._matchers.clear()
+        self._matchers[id(expression_value)] = (expression_value, matcher)
+        return matcher
+
     def _evaluate(self, expression_value: List[Any], item_value: Any) -> bool:
         """
-        Evaluates whether the given item value can be found in the given expression value list.
+        Evaluates whether the given item value can be found in the given expression value list. Numbers are compared
+        by value and are matched by ranges (e.g. "1..3" or "1-3"), other values are compared directly.
         :param expression_value: a list of items of any type.
         :param item_value: an item from a datastore of any type.
         :return: True, when item value is found in the given expression value list.
         """
-        def _evaluate_list_item(ev, item_value):
+        try:
+            number = float(item_value)
+        except Exception:
+            number = None
+        return self._get_matcher(expression_value).matches(item_value, number)
+
+    def _evaluate_batch(self, expression_value: Any, operator: str, item_values: List[Any]) -> List[Any]:
+        if type(self).evaluate is not AbstractEvaluator.evaluate or \
+                type(self)._evaluate is not ListEvaluator._evaluate or type(self).is_type is not ListEvaluator.is_type:
+            return super()._evaluate_batch(expression_value, operator, item_values)
+        if not self.is_type(expression_value, None):
+            return [UNSUPPORTED] * len(item_values)
+        matches = self._get_matcher(expression_value).matches
+        results = []
+        for item_value in item_values:
             try:
-                if isinstance(ev, List):
-                    if '..' in ev or '-' in ev:
-                        # In this case we expect two floats and the item value should be inbetween.
-                        # May fail when values can not be converted to float.
-                        l, _, r = ev
-                        return float(l) <= float(item_value) <= float(r)
-                    else:
-                        return any(_evaluate_list_item(v, item_value) for v in ev)
-                else:
-                    try:
-                        return float(item_value) == float(ev)
-                    except:
-                        # There was an error during converting the values to float.
-                        # Try direct comparison instead. May fail when types vary and can not be compared.
-                        return item_value == ev
-            except:
-                # There was an error during evaluating the list item.
-                return False
-        return any(_evaluate_list_item(ev, item_value) for ev in expression_value)
+                number = float(item_value)
+            except Exception:
+                number = None
+            results.append(matches(item_value, number))
+        return results
 
 
 class StringEvaluator(CallbackEvaluator):
     """ Evaluates a callback where both arguments are strings. """
 
+    _caches_conversions = True
+
     def _convert_item_value(self, value: Any) -> str:
         return self._convert_expression_value(value)
 
@@ -205,18 +507,123 @@ class StringEvaluator(CallbackEvaluator):
         # If value is None, return None instead of 'None'
         return str(value).encode('latin').decode('utf8') if value is not None else None
 
+    def _convert_item_values(self, values: List[Any]) -> List[Any]:
+        if self._overrides_conversion(StringEvaluator):
+            return super()._convert_item_values(values)
+        # ASCII strings are not changed by the conversion.
+        convert = self._convert_cached_item_value
+        result = []
+        for value in values:
+            if type(value) is str and value.isascii():
+                result.append(value)
+                continue
+            try:
+                result.append(convert(value))
+            except Exception:
+                result.append(UNSUPPORTED)
+        return result
+
+
+class DateParser:
+    """
+    Parses dates. ISO 8601 dates (e.g. '2020-01-02T10:00:00Z') are parsed using datetime.fromisoformat and dates
+    matching one of the given formats using datetime.strptime. Any other date is parsed using dateutil, which accepts
+    nearly any date but is way slower. Since dates tend to repeat (e.g. the timestamps of logs), the dates which are
+    not ISO 8601 dates are remembered, including the ones which could not be parsed.
+
+    The parser can be shared by many evaluators and threads.
+    """
+
+    def __init__(self, formats: List[str] = None, max_entries: int = DATE_CACHE_SIZE):
+        """
+        Initializes the DateParser.
+        :param formats: The formats (e.g. '%d/%b/%Y:%H:%M:%S %z') which are tried using datetime.strptime before
+                        parsing the date using dateutil.
+        :param max_entries: The maximum number of dates which are remembered.
+        """
+        self._formats = list(formats or [])
+        self._cache = LRUCache(max_entries=max_entries)
+
+    @property
+    def formats(self) -> List[str]:
+        return list(self._formats)
+
+    @formats.setter
+    def formats(self, formats: List[str]):
+        """ Sets the formats which are tried using datetime.strptime before parsing the date using dateutil. """
+        self._formats = list(formats or [])
+        # Dates may be parsed differently using other formats.
+        self._cache.clear()
+
+    @property
+    def cache(self) -> LRUCache:
+        """ Returns the cache of the parsed dates, e.g. to retrieve its statistics. """
+        return self._cache
+
+    def parse(self, value: Any) -> 'datetime.datetime':
+        """
+        Parses the date.
+        :raises Exception when value is not a date.
+        """
+        import datetime
+        if not isinstance(value, str):
+            from dateutil.parser import parse as parse_date
+            return parse_date(value)
+        if _ISO_DATE.fullmatch(value):
+            try:
+                # The pattern only matches dates which are parsed the same way by datetime.fromisoformat and dateutil.
+                return datetime.datetime.fromisoformat(value)
+            except ValueError:
+                # Not a valid date (e.g. '2020-02-30') or not supported by datetime.fromisoformat in this version.
+                pass
+        # Dateutil completes dates using the current date (e.g. '10:00'), hence dates are only remembered for a day.
+        key = (value, datetime.date.today())
+        result = self._cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = self._parse(value)
+            self._cache.put(key, result)
+        if result is _INVALID:
+            raise ValueError("Invalid date '{}'".format(value))
+        return result
+
+    def _parse(self, value: str) -> Any:
+        import datetime
+        for format in self._formats:
+            try:
+                return datetime.datetime.strptime(value, format)
+            except ValueError:
+                pass
+        from dateutil.parser import parse as parse_date
+        try:
+            return parse_date(value)
+        except Exception:
+            return _INVALID
+
+
+# The date parser shared by all date evaluators which do not use their own date parser.
+default_date_parser = DateParser()
+
 
 class DateEvaluator(CallbackEvaluator):
 
-    def _convert_item_value(self, value: Any) -> str:
+    def __init__(self, callback: Callable[[Any, Any], bool], date_parser: DateParser = None):
+        """
+        Initializes the DateEvaluator.
+        :param callback: a callback which expects two dates and returns True or False.
+        :param date_parser: The parser of the dates. If no parser is given the default_date_parser is used.
         """
-        Transforms the item from the datastore to a date string.
+        super().__init__(callback)
+        self._date_parser = date_parser if date_parser is not None else default_date_parser
+
+    def _convert_item_value(self, value: Any) -> 'datetime.datetime':
+        """
+        Transforms the item from the datastore to a date.
         :param value: A given value from the expression. Since we are not in control of the datastore the type of the
                       value is not known.
         :returns the transformed value.
         :raises Exception when value can not be converted.
         """
-        return parse_date(value)
+        return self._date_parser.parse(value)
 
     def _convert_expression_value(self, value: Optional[Union[int, str]]) -> int:
         """
@@ -233,12 +640,18 @@ class DateEvaluator(CallbackEvaluator):
                 # While we do not interfere with this parsing process for the item value we do not accept dots in the
                 # expression value.
                 return False
-        return parse_date(value)
+        return self._date_parser.parse(value)
+
+    def _convert_item_values(self, values: List[Any]) -> List[Any]:
+        # Parsing dates is expensive, hence each distinct value is parsed only once.
+        return _convert_item_values_memoized(self._convert_cached_item_value, values)
 
 
 class NumberEvaluator(CallbackEvaluator):
     """ Evaluates a callback where both arguments are numbers. """
 
+    _caches_conversions = True
+
     def _convert_item_value(self, value: Any) -> float:
         """
         Transforms the item from the datastore to an integer.
@@ -279,6 +692,21 @@ class NumberEvaluator(CallbackEvaluator):
                 return value
         return float(value)
 
+    def _convert_item_values(self, values: List[Any]) -> List[Any]:
+        if self._overrides_conversion(NumberEvaluator):
+            return super()._convert_item_values(values)
+        convert = self._convert_cached_item_value
+        result = []
+        for value in values:
+            if type(value) is int or type(value) is float:
+                result.append(float(value))
+                continue
+            try:
+                result.append(convert(value))
+            except Exception:
+                result.append(UNSUPPORTED)
+        return result
+
 
 class IntegerEvaluator(NumberEvaluator):
     """
@@ -306,34 +734,63 @@ class IntegerEvaluator(NumberEvaluator):
         """
         return int(value) if isinstance(value, bool) else int(super()._convert_expression_value(value))
 
+    def _convert_item_values(self, values: List[Any]) -> List[Any]:
+        if self._overrides_conversion(IntegerEvaluator):
+            return AbstractEvaluator._convert_item_values(self, values)
+        convert = self._convert_cached_item_value
+        result = []
+        for value in values:
+            if type(value) is int:
+                # Integers are converted to float first, which may round large integers.
+                result.append(int(float(value)))
+                continue
+            try:
+                result.append(convert(value))
+            except Exception:
+                result.append(UNSUPPORTED)
+        return result
+
 
 class IPv4AddressEvaluator(CallbackEvaluator):
     """ Evaluates IPv4 addresses. """
 
-    def _convert_item_value(self, value: Any) -> ipaddress.IPv4Address:
+    _caches_conversions = True
+
+    def _convert_item_value(self, value: Any) -> 'ipaddress.IPv4Address':
         return self._convert_expression_value(value)
 
-    def _convert_expression_value(self, value: Optional[Union[int, str]]) -> ipaddress.IPv4Address:
+    def _convert_expression_value(self, value: Optional[Union[int, str]]) -> 'ipaddress.IPv4Address':
         """ Converts the expression value to an IPv4 address. """
         if isinstance(value, bool) or (isinstance(value, str) and '.' not in value) or isinstance(value, int):
             # Do not transform boolean values, strings without dots, or integers to IPv4 addresses.
             raise EvaluationError("Invalid value '{}'".format(value))
+        import ipaddress
         return ipaddress.IPv4Address(value)
 
+    def _convert_item_values(self, values: List[Any]) -> List[Any]:
+        # Items often share addresses (e.g. the hosts of a network), hence each distinct value is converted only once.
+        return _convert_item_values_memoized(self._convert_cached_item_value, values)
+
 
 class IPv6AddressEvaluator(CallbackEvaluator):
     """ Evaluates IPv6 addresses. """
 
-    def _convert_item_value(self, value: Any) -> ipaddress.IPv6Address:
+    _caches_conversions = True
+
+    def _convert_item_value(self, value: Any) -> 'ipaddress.IPv6Address':
         return self._convert_expression_value(value)
 
-    def _convert_expression_value(self, value: Optional[Union[int, str]]) -> ipaddress.IPv6Address:
+    def _convert_expression_value(self, value: Optional[Union[int, str]]) -> 'ipaddress.IPv6Address':
         """ Converts the expression value to an IPv6 address. """
         if isinstance(value, bool) or (isinstance(value, str) and ':' not in value) or isinstance(value, int):
             # Do not transform boolean values, strings without colons, or integers to IPv6 addresses.
             raise EvaluationError("Invalid value '{}'".format(value))
+        import ipaddress
         return ipaddress.IPv6Address(value)
 
+    def _convert_item_values(self, values: List[Any]) -> List[Any]:
+        return _convert_item_values_memoized(self._convert_cached_item_value, values)
+
 
 class IPv4RangeEvaluator(AbstractBasicEvaluator):
     """ Evaluates whether a given IPv4-address is within a list of IPv4-addresses. """
@@ -355,10 +812,14 @@ class IPv4RangeEvaluator(AbstractBasicEvaluator):
 
     def _are_ipv4_addresses(self, expression_value) -> bool:
         """ Checks whether the expression value evaluated as list of ipv4 addresses. """
-        return all(isinstance(i, ipranger.ipranger.IPAddresses) for i in expression_value)
+        # Lists of ipv4 addresses are created by the parser using ipranger. As long as ipranger was not imported, the
+        # expression value can not be a list of ipv4 addresses.
+        module = sys.modules.get('ipranger.ipranger')
+        return module is not None and all(isinstance(i, module.IPAddresses) for i in expression_value)
 
     def _is_ipv4_address(self, item_value) -> bool:
         """ Checks whether the item value is a valid ipv4 address. """
+        import pyparsing
         try:
             pyparsing.common.ipv4_address.parseString(item_value, parse_all=True)
             return True
@@ -367,6 +828,7 @@ class IPv4RangeEvaluator(AbstractBasicEvaluator):
 
     def _evaluate(self, expression_value, item_value):
         """ Checks whether the item value is contained in the expression value. """
+        import ipranger
         # Split ipv4 address into parts.
         p1, p2, p3, p4 = map(int, item_value.split('.'))
         for part_1, part_2, part_3, part_4 in ipranger.IPAddressesResolver.resolve(expression_value):
@@ -379,9 +841,129 @@ class IPv4RangeEvaluator(AbstractBasicEvaluator):
 class VersionStringEvaluator(CallbackEvaluator):
     """ Evaluates a callback where both arguments are versions (e.g. '1.1.1', '1.3.4a', ...). """
 
-    def _convert_item_value(self, value: Any) -> version.Version:
+    _caches_conversions = True
+
+    def _convert_item_value(self, value: Any) -> 'version.Version':
         return self._convert_expression_value(value)
 
-    def _convert_expression_value(self, value: Optional[Union[int, str]]) -> version.Version:
+    def _convert_expression_value(self, value: Optional[Union[int, str]]) -> 'version.Version':
         """ Converts the expression value to an IPv6 address. """
+        from packaging import version
         return version.parse(value)
+
+
+class MACAddressEvaluator(CallbackEvaluator):
+    """ Evaluates MAC addresses (e.g. '00:83:00:83:00:83' or '00-83-00-83-00-83'), which may also be truncated. """
+
+    _caches_conversions = True
+
+    _PATTERN = re.compile(r'[0-9a-fA-F]{1,2}([:-][0-9a-fA-F]{1,2})*')
+
+    def _convert_item_value(self, value: Any) -> tuple:
+        return self._convert_expression_value(value)
+
+    def _convert_expression_value(self, value: Optional[Union[int, str]]) -> tuple:
+        """ Converts the expression value to the tuple of the octets of the MAC address. """
+        if not isinstance(value, str) or not self._PATTERN.fullmatch(value):
+            raise EvaluationError("Invalid value '{}'".format(value))
+        return tuple(int(octet, 16) for octet in re.split('[:-]', value))
+
+    def _convert_item_values(self, values: List[Any]) -> List[Any]:
+        return _convert_item_values_memoized(self._convert_cached_item_value, values)
+
+
+class _Members:
+    """ The converted values and the sorted, merged ranges of a list, as used by the MembershipEvaluator. """
+
+    def __init__(self, values: frozenset, ranges: List[tuple], ipv4_ranges: List[tuple]):
+        self.values = values
+        self.lowers, self.uppers = [], []
+        for lower, upper in sorted(ranges):
+            if self.uppers and lower <= self.uppers[-1]:
+                # The range overlaps with the previous one.
+                self.uppers[-1] = max(upper, self.uppers[-1])
+            else:
+                self.lowers.append(lower)
+                self.uppers.append(upper)
+        # The resolved octets of IPv4 addresses (e.g. '10.0.0.1/24' or '10.0.0.1-254').
+        self.ipv4_ranges = ipv4_ranges
+
+    def __contains__(self, item_value: Any) -> bool:
+        if item_value in self.values:
+            return True
+        if self.lowers:
+            position = bisect.bisect_right(self.lowers, item_value) - 1
+            if position >= 0 and item_value <= self.uppers[position]:
+                return True
+        if self.ipv4_ranges:
+            p1, p2, p3, p4 = item_value.packed
+            return any(
+                p1 in part_1 and p2 in part_2 and p3 in part_3 and p4 in part_4
+                for part_1, part_2, part_3, part_4 in self.ipv4_ranges
+            )
+        return False
+
+
+class MembershipEvaluator(AbstractBasicEvaluator):
+    """
+    Evaluates whether an item value is found in a list of values of a single type (e.g. "port in {80, 443..445}"). The
+    values of the list are converted by the given evaluator once, so that each item value is converted once and looked
+    up in a set instead of being compared with each value of the list.
+    """
+
+    def __init__(self, evaluator: AbstractEvaluator):
+        """
+        Initializes the MembershipEvaluator.
+        :param evaluator: The evaluator which converts the values of the list and the item values.
+        """
+        super().__init__()
+        self._evaluator = evaluator
+
+    def _convert_expression_value(self, value: List[Any]) -> _Members:
+        """
+        Converts the values and ranges of the list.
+        :raises Exception when any value of the list can not be converted.
+        """
+        values, ranges, ipv4_ranges = set(), [], []
+        self._collect(value, values, ranges, ipv4_ranges)
+        return _Members(frozenset(values), ranges, ipv4_ranges)
+
+    def _collect(self, expression_value: List[Any], values: set, ranges: List[tuple], ipv4_ranges: List[tuple]):
+        module = sys.modules.get('ipranger.ipranger')
+        for ev in expression_value:
+            if isinstance(ev, List):
+                if '..' in ev or '-' in ev:
+                    lower, _, upper = ev
+                    lower, upper = self._convert(lower), self._convert(upper)
+                    if lower <= upper:
+                        ranges.append((lower, upper))
+                else:
+                    self._collect(ev, values, ranges, ipv4_ranges)
+            elif module is not None and isinstance(ev, module.IPAddresses):
+                if not isinstance(self._evaluator, IPv4AddressEvaluator):
+                    raise EvaluationError("Invalid value '{}'".format(ev))
+                import ipranger
+                ipv4_ranges.extend(
+                    tuple(frozenset(part) for part in parts) for parts in ipranger.IPAddressesResolver.resolve([ev])
+                )
+            else:
+                values.add(self._convert(ev))
+
+    def _convert(self, value: Any) -> Any:
+        if isinstance(value, float) and value.is_integer() and isinstance(self._evaluator, StringEvaluator):
+            # Numbers of lists are parsed as floats (e.g. '{1, 2}'), but strings are compared without the fraction.
+            value = int(value)
+        converted = self._evaluator.convert_expression_value(value)
+        if isinstance(converted, bool):
+            # The evaluator accepts the value but never matches any item value (e.g. dates containing dots).
+            raise EvaluationError("Invalid value '{}'".format(value))
+        return converted
+
+    def _convert_item_value(self, value: Any) -> Any:
+        return self._evaluator.convert_item_value(value)
+
+    def _convert_item_values(self, values: List[Any]) -> List[Any]:
+        return self._evaluator._convert_item_values(values)
+
+    def _evaluate(self, expression_value: _Members, item_value: Any) -> bool:
+        return item_value in expression_value
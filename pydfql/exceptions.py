@@ -14,6 +14,7 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from typing import List
 
 
 class ParserError(Exception):
@@ -24,6 +25,21 @@ class ParserError(Exception):
     pass
 
 
+class UnknownFieldError(ParserError):
+    """
+    This error indicates that the display filter refers to a field which is not in the list of valid field names.
+    The names of similar fields are available as suggestions.
+    """
+
+    def __init__(self, field: str, suggestions: List[str] = None):
+        self.field = field
+        self.suggestions = suggestions or []
+        message = "Unknown field '{}'!".format(field)
+        if self.suggestions:
+            message += " Did you mean {}?".format(' or '.join("'{}'".format(name) for name in self.suggestions))
+        super().__init__(message)
+
+
 class EvaluationError(Exception):
     """
     This error indicates that there was an error during evaluating an expression which usually happens when some
@@ -0,0 +1,165 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from typing import Any, Callable, Hashable, Iterator, List, Union
+
+from pydfql.models import Expression, TypedExpression
+
+
+def iter_expressions(expressions: List[Union[Expression, str, List]]) -> Iterator[Expression]:
+    """ Returns all expressions found in a possibly nested list of expressions and logical operators. """
+    for expression in expressions:
+        if isinstance(expression, List):
+            yield from iter_expressions(expression)
+        elif isinstance(expression, Expression):
+            yield expression
+
+
+def map_expressions(expressions: List[Union[Expression, str, List]],
+                    function: Callable[[Expression], Expression]) -> List[Union[Expression, str, List]]:
+    """ Applies the function to all expressions found in a possibly nested list of expressions. """
+    return [
+        map_expressions(token, function) if isinstance(token, list) else
+        function(token) if isinstance(token, Expression) else token
+        for token in expressions
+    ]
+
+
+def expression_key(expression: Expression) -> Hashable:
+    """
+    Returns a key which identifies an expression by its field, operator, value, function and slicer specification.
+    Two expressions with the same key match the same items.
+    """
+    return (
+        expression.field,
+        expression.operator,
+        repr(expression.value),
+        expression.function,
+        repr(expression.slicer_specs),
+        # Expressions bound to the type of their field compare values of that type only (see Schema).
+        expression.field_type if isinstance(expression, TypedExpression) else None
+    )
+
+
+def fold(expressions: List[Union[Expression, str, List]],
+         leaf: Callable[[Expression], Any],
+         not_: Callable[[Any], Any],
+         and_: Callable[[Any, Any], Any],
+         or_: Callable[[Any, Any], Any],
+         xor_: Callable[[Any, Any], Any]) -> Any:
+    """
+    Folds a possibly nested list of expressions and logical operators as returned by the DisplayFilterParser.
+
+    The precedence of the logical operators matches the one of python which is used when evaluating the expressions
+    of a display filter (highest first): '^', 'not', 'and', 'or'.
+
+    :param expressions: List of expressions and logical operators.
+    :param leaf: Called for each expression.
+    :param not_: Called with the folded operand of a 'not' operator.
+    :param and_: Called with the folded operands of an 'and' operator.
+    :param or_: Called with the folded operands of an 'or' operator.
+    :param xor_: Called with the folded operands of a '^' operator.
+    :return: The folded value.
+    :raises ValueError, when the list of expressions and logical operators is malformed.
+    """
+    tokens = list(expressions)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def consume():
+        nonlocal position
+        if position >= len(tokens):
+            raise ValueError('Unexpected end of expressions!')
+        position += 1
+        return tokens[position - 1]
+
+    def fold_or():
+        result = fold_and()
+        while peek() == 'or':
+            consume()
+            result = or_(result, fold_and())
+        return result
+
+    def fold_and():
+        result = fold_not()
+        while peek() == 'and':
+            consume()
+            result = and_(result, fold_not())
+        return result
+
+    def fold_not():
+        if peek() == 'not':
+            consume()
+            return not_(fold_not())
+        return fold_xor()
+
+    def fold_xor():
+        result = fold_operand()
+        while peek() == '^':
+            consume()
+            result = xor_(result, fold_operand())
+        return result
+
+    def fold_operand():
+        token = consume()
+        if isinstance(token, List):
+            # The expression is actually a list of expressions (e.g. '(x or y)').
+            return fold(token, leaf, not_, and_, or_, xor_)
+        elif isinstance(token, Expression):
+            return leaf(token)
+        raise ValueError("Unexpected token '{}'!".format(token))
+
+    result = fold_or()
+    if position != len(tokens):
+        raise ValueError("Unexpected token '{}'!".format(tokens[position]))
+    return result
+
+
+def to_tree(expressions: List[Union[Expression, str, List]]):
+    """
+    Converts a possibly nested list of expressions and logical operators into a tree. Each node is either an
+    expression, a tuple ('not', node) or a tuple of a logical operator ('and', 'or', 'xor') and a tuple of operands.
+    :raises ValueError, when the list of expressions and logical operators is malformed.
+    """
+    return fold(
+        expressions,
+        leaf=lambda expression: expression,
+        not_=lambda operand: ('not', operand),
+        and_=lambda left, right: ('and', (left, right)),
+        or_=lambda left, right: ('or', (left, right)),
+        xor_=lambda left, right: ('xor', (left, right))
+    )
+
+
+def from_tree(node) -> List[Union[Expression, str, List]]:
+    """ Converts a tree back into the list of expressions and logical operators used by the DisplayFilterParser. """
+
+    def _convert(node):
+        if isinstance(node, Expression):
+            return node
+        operator, operands = node
+        if operator == 'not':
+            return ['not', _convert(operands)]
+        result = []
+        for operand in operands:
+            if result:
+                result.append('^' if operator == 'xor' else operator)
+            result.append(_convert(operand))
+        return result
+
+    return [_convert(node)]
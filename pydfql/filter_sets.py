@@ -0,0 +1,305 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pydfql import parallel
+from pydfql.display_filters import DictDisplayFilter
+from pydfql.evaluators import DefaultEvaluator, Evaluator
+from pydfql.exceptions import EvaluationError
+from pydfql.expressions import expression_key, fold, to_tree
+from pydfql.models import EqualitySet, Expression, TypedExpression
+from pydfql.parsers.normalizer import CONSTANT_FALSE, CONSTANT_TRUE
+from pydfql.planner import CostBasedPlanner
+from pydfql.slicers import BasicSlicer
+
+
+@dataclass
+class _EqualityGroup:
+    """ The equality comparisons on the same field which are looked up in a hash table instead of being evaluated. """
+    expression: Expression  # Any expression of the group, used to retrieve the item value.
+    predicates: List[int] = field(default_factory=list)
+    table: Dict[Hashable, List[int]] = field(default_factory=dict)
+
+
+@dataclass
+class _FilterSetIndex:
+    """ The compiled display filters of a FilterSet. """
+    predicates: List[Expression]
+    groups: Dict[int, _EqualityGroup]  # The equality group of a predicate, if any.
+    matchers: List[Tuple[Hashable, Callable[[Callable[[int], bool]], bool]]]
+    guarded: Dict[int, List[int]]  # The positions of the matchers which can only match when the predicate matches.
+    guard_groups: List[_EqualityGroup]  # The equality groups containing predicates in guarded.
+    unguarded: List[int]  # The positions of the matchers which need to be evaluated on every item.
+
+
+class FilterSet:
+    """
+    Matches many display filters against the same items in a single pass, e.g. a set of alerting rules.
+
+    Expressions which are shared by several display filters are evaluated only once per item. Equality comparisons
+    on the same field are looked up in a hash table using the item value, and display filters which require such a
+    comparison to match are only evaluated on items for which it matches, hence the cost of matching an item grows
+    sublinearly with the number of display filters. The items are dictionaries, which are matched the same way as by
+    the DictDisplayFilter.
+    """
+
+    def __init__(self,
+                 field_names: List[str] = None,
+                 functions: Dict[str, Callable] = None,
+                 slicers: List[BasicSlicer] = None,
+                 evaluator: Evaluator = None,
+                 schema: Dict[str, str] = None):
+        """
+        Initializes the FilterSet.
+        :param field_names: A list of field names which are allowed in the display filters.
+        :param functions: A dictionary of functions whereby the key specifies the name.
+        :param slicers: A list of slicers.
+        :param evaluator: The evaluator used to evaluate the expressions.
+        :param schema: The types of the fields (see BaseDisplayFilter.schema).
+        :raises ValueError, when a type of the schema is not known.
+        """
+        self._evaluator = evaluator if evaluator else DefaultEvaluator()
+        # Parses the display filters and retrieves the values of the items.
+        self._display_filter = DictDisplayFilter(
+            [], field_names=field_names, functions=functions, slicers=slicers, evaluator=self._evaluator, schema=schema
+        )
+        self._planner = None
+        self._display_filters = {}
+        self._index = None
+        self._lock = threading.RLock()
+        parallel.reinit_after_fork(self, '_lock', threading.RLock)
+
+    def add(self, filter_id: Hashable, display_filter: str):
+        """
+        Registers a display filter. A display filter which was registered using the same id is replaced.
+        :raises ParserError, when the given display filter could not be parsed correctly.
+        """
+        expressions = self._display_filter._parse(display_filter)
+        with self._lock:
+            self._display_filters[filter_id] = expressions
+            self._index = None
+
+    def remove(self, filter_id: Hashable):
+        """
+        Removes a display filter.
+        :raises KeyError, when no display filter was registered using the id.
+        """
+        with self._lock:
+            del self._display_filters[filter_id]
+            self._index = None
+
+    @property
+    def filter_ids(self) -> List[Hashable]:
+        """ Returns the ids of the registered display filters in the order they were registered. """
+        with self._lock:
+            return list(self._display_filters)
+
+    @property
+    def planner(self) -> CostBasedPlanner:
+        return self._planner
+
+    @planner.setter
+    def planner(self, planner: CostBasedPlanner = None):
+        """
+        Sets the planner which reorders the operands of 'and' and 'or' of the display filters. If None is given the
+        expressions are evaluated as they were specified.
+        """
+        with self._lock:
+            self._planner = planner
+            self._index = None
+
+    def __len__(self) -> int:
+        return len(self._display_filters)
+
+    def __contains__(self, filter_id: Hashable) -> bool:
+        return filter_id in self._display_filters
+
+    def _get_item_value(self, expression: Expression, item: dict) -> Any:
+        return self._display_filter._get_item_value(expression, item)
+
+    def _get_equality_keys(self, value: Any, convert: Callable[[Any, Any], Any]) -> List[Hashable]:
+        """
+        Returns the keys under which a value is found in the hash table of an equality group. The DefaultEvaluator
+        considers two values equal, when any of its evaluators converts both values to equal values, hence a key is
+        returned for each evaluator which is able to convert the value.
+        """
+        keys = []
+        for position, evaluator in enumerate(self._evaluator.evaluators['==']):
+            try:
+                key = (position, convert(evaluator, value))
+                hash(key)
+            except Exception:
+                # The evaluator is not able to evaluate the value.
+                continue
+            keys.append(key)
+        return keys
+
+    def _is_equality_comparison(self, expression: Expression) -> bool:
+        # The hash table requires the evaluators to compare values by equality, which is only known to be the case
+        # for the DefaultEvaluator. Expressions bound to the type of their field are evaluated by their own evaluator.
+        return type(self._evaluator) is DefaultEvaluator and not isinstance(expression, TypedExpression) and (
+            (expression.operator == '==' and isinstance(expression.value, str)) or
+            (expression.operator == 'in' and isinstance(expression.value, EqualitySet))
+        )
+
+    def _build_index(self) -> _FilterSetIndex:
+        predicates, predicate_ids, groups, equality_groups = [], {}, {}, {}
+
+        def _get_predicate_id(expression: Expression) -> int:
+            key = expression_key(expression)
+            predicate_id = predicate_ids.get(key)
+            if predicate_id is None:
+                predicate_id = predicate_ids[key] = len(predicates)
+                predicates.append(expression)
+                if self._is_equality_comparison(expression):
+                    group_key = (expression.field, expression.function, repr(expression.slicer_specs))
+                    group = equality_groups.get(group_key)
+                    if group is None:
+                        group = equality_groups[group_key] = _EqualityGroup(expression)
+                    group.predicates.append(predicate_id)
+                    values = expression.value if expression.operator == 'in' else [expression.value]
+                    for value in values:
+                        for key in self._get_equality_keys(
+                                value, lambda evaluator, value: evaluator.convert_expression_value(value)):
+                            group.table.setdefault(key, []).append(predicate_id)
+                    groups[predicate_id] = group
+            return predicate_id
+
+        def _leaf(expression: Expression) -> Callable[[Callable[[int], bool]], bool]:
+            predicate_id = _get_predicate_id(expression)
+            return lambda test: test(predicate_id)
+
+        matchers, guarded, unguarded = [], {}, []
+        for filter_id, expressions in self._display_filters.items():
+            if expressions is CONSTANT_FALSE:
+                # The display filter does not match any item (e.g. 'a and not a').
+                continue
+            position = len(matchers)
+            if not expressions or expressions is CONSTANT_TRUE:
+                matchers.append((filter_id, lambda test: True))
+                unguarded.append(position)
+                continue
+            if self._planner is not None:
+                expressions = self._planner.plan(expressions).expressions
+            try:
+                matches = fold(
+                    expressions,
+                    leaf=_leaf,
+                    not_=lambda operand: lambda test: not operand(test),
+                    and_=lambda left, right: lambda test: left(test) and right(test),
+                    or_=lambda left, right: lambda test: left(test) or right(test),
+                    xor_=lambda left, right: lambda test: bool(left(test)) ^ bool(right(test))
+                )
+            except ValueError as err:
+                raise EvaluationError(err)
+            matchers.append((filter_id, matches))
+            guard = self._get_guard(to_tree(expressions), groups, predicate_ids)
+            if guard is None:
+                unguarded.append(position)
+            else:
+                guarded.setdefault(guard, []).append(position)
+        guard_groups = list({id(groups[guard]): groups[guard] for guard in guarded}.values())
+        return _FilterSetIndex(predicates, groups, matchers, guarded, guard_groups, unguarded)
+
+    def _get_guard(self, node, groups: Dict[int, _EqualityGroup], predicate_ids: Dict) -> Optional[int]:
+        """ Returns an equality comparison which needs to match for the display filter to match, if any. """
+        operands = node[1] if isinstance(node, tuple) and node[0] == 'and' else [node]
+        for operand in operands:
+            if isinstance(operand, Expression):
+                predicate_id = predicate_ids[expression_key(operand)]
+                if predicate_id in groups:
+                    return predicate_id
+        return None
+
+    def _get_index(self) -> _FilterSetIndex:
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build_index()
+                index = self._index
+        return index
+
+    def _evaluate_group(self, index: _FilterSetIndex, group: _EqualityGroup, item) -> Set[int]:
+        """
+        Evaluates all equality comparisons of a group using a single lookup per evaluator.
+        :return: the ids of the matching equality comparisons.
+        """
+        value = self._get_item_value(group.expression, item)
+        if isinstance(value, List) and value != []:
+            # Lists match when any value in the list matches, which is left to the evaluator.
+            matching = {
+                predicate_id for predicate_id in group.predicates
+                if self._evaluator.evaluate(index.predicates[predicate_id], value)
+            }
+        else:
+            matching = set()
+            for key in self._get_equality_keys(value, lambda evaluator, value: evaluator.convert_item_value(value)):
+                matching.update(group.table.get(key, ()))
+        return matching
+
+    def _match(self, index: _FilterSetIndex, item) -> List[Hashable]:
+        results, group_results = {}, {}
+
+        def _evaluate_group(group: _EqualityGroup) -> Set[int]:
+            matching = group_results.get(id(group))
+            if matching is None:
+                matching = group_results[id(group)] = self._evaluate_group(index, group, item)
+            return matching
+
+        def _test(predicate_id: int) -> bool:
+            result = results.get(predicate_id)
+            if result is None:
+                group = index.groups.get(predicate_id)
+                if group is not None:
+                    result = results[predicate_id] = predicate_id in _evaluate_group(group)
+                else:
+                    expression = index.predicates[predicate_id]
+                    result = results[predicate_id] = bool(
+                        self._evaluator.evaluate(expression, self._get_item_value(expression, item))
+                    )
+            return result
+
+        try:
+            candidates = list(index.unguarded)
+            for group in index.guard_groups:
+                for predicate_id in _evaluate_group(group):
+                    candidates.extend(index.guarded.get(predicate_id, ()))
+            candidates.sort()
+            return [index.matchers[position][0] for position in candidates if index.matchers[position][1](_test)]
+        except Exception as err:
+            raise EvaluationError(err)
+
+    def match(self, item) -> List[Hashable]:
+        """
+        Returns the ids of the display filters matching the item in the order they were registered.
+        :raises EvaluationError, when an expression could not be evaluated.
+        """
+        return self._match(self._get_index(), item)
+
+    def match_all(self, data: Iterable[dict]) -> Iterator[Tuple[dict, List[Hashable]]]:
+        """
+        Matches the items against all display filters in a single pass.
+        :return: the items matching any display filter together with the ids of the matching display filters.
+        """
+        index = self._get_index()
+        for item in data:
+            filter_ids = self._match(index, item)
+            if filter_ids:
+                yield item, filter_ids
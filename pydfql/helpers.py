@@ -23,9 +23,10 @@ from collections import OrderedDict
 from itertools import chain
 from typing import List, Dict, Callable
 
+from pydfql.caches import PredicateCache
 from pydfql.display_filters import BaseDisplayFilter, DictDisplayFilter
 from pydfql.evaluators import Evaluator
-from pydfql.exceptions import ParserError, EvaluationError
+from pydfql.exceptions import ParserError, EvaluationError, UnknownFieldError
 from pydfql.slicers import BasicSlicer
 
 
@@ -144,6 +145,8 @@ class DisplayFilterShell(cmd.Cmd):
                 self._logger.error("No arguments supplied to filter function.")
                 return
             print(self._table.filter(display_filter))
+        except UnknownFieldError as err:
+            self._logger.error('Invalid display filter! {}'.format(err))
         except ParserError as err:
             self._logger.error('Invalid display filter!')
             self._logger.debug(err)
@@ -200,7 +203,11 @@ class DictTable(Table):
                  evaluator: Evaluator = None):
         """ Initializes the DictTable with a data store. """
         field_names = field_names or self._extract_field_names(data_store)
-        super().__init__(DictDisplayFilter(data_store, field_names, functions, slicers, evaluator))
+        display_filter = DictDisplayFilter(data_store, field_names, functions, slicers, evaluator)
+        # Display filters are usually refined step by step, hence the results of the individual expressions are kept
+        # so that only new expressions need to be evaluated.
+        display_filter.predicate_cache = PredicateCache()
+        super().__init__(display_filter)
 
     def _extract_field_names(self, data_store: List[dict]) -> List[str]:
         """ Extracts the field names from the given data store. """
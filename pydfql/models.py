@@ -14,13 +14,16 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-from dataclasses import dataclass
-from typing import Optional, Callable, Union, List
+from dataclasses import dataclass, field
+from typing import Any, Optional, Callable, Union, List
 
 
-@dataclass
+@dataclass(frozen=True)
 class Expression:
-    """ Object representation of an expression (e.g. 'name == Neo', 'lower(name) == neo', ...) """
+    """
+    Object representation of an expression (e.g. 'name == Neo', 'lower(name) == neo', ...). Expressions are immutable,
+    so parsed display filters can be shared between threads.
+    """
     field: str
     operator: Optional[str]
     value: Optional[Union[str, int]]
@@ -33,8 +36,35 @@ class Expression:
                  value: Optional[str] = None,
                  function: Optional[Callable] = None,
                  slicer_spec: Optional[str] = None):
-        self.field = field
-        self.operator = operator
-        self.value = value
-        self.function = function
-        self.slicer_specs = slicer_spec if slicer_spec else None
+        object.__setattr__(self, 'field', field)
+        object.__setattr__(self, 'operator', operator)
+        object.__setattr__(self, 'value', value)
+        object.__setattr__(self, 'function', function)
+        object.__setattr__(self, 'slicer_specs', slicer_spec if slicer_spec else None)
+
+
+@dataclass(frozen=True)
+class TypedExpression(Expression):
+    """
+    An expression on a field whose type is declared in a schema (see Schema). The value is converted when the display
+    filter is parsed and the expression is evaluated by a single evaluator, instead of trying each evaluator in turn.
+    """
+    field_type: str = None
+    converted_value: Any = field(default=None, compare=False, repr=False)
+    evaluator: Any = field(default=None, compare=False, repr=False)
+
+
+@dataclass(frozen=True)
+class Parameter:
+    """ A placeholder for the value of an expression of a prepared display filter (e.g. 'host == $host'). """
+    name: str
+
+
+class EqualitySet(tuple):
+    """
+    A set of values taken from equality comparisons on the same field (e.g. 'a == 1 or a == 2'). An item value is a
+    member of the set when it is equal to any of the values using the '==' operator.
+    """
+
+    def __repr__(self) -> str:
+        return 'EqualitySet({})'.format(tuple.__repr__(self))
@@ -0,0 +1,134 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import itertools
+import os
+import weakref
+from array import array
+from typing import Any, Callable, Iterator
+
+# The jobs which are inherited by the worker processes when they are forked. Since the data and the display filter
+# are inherited, only the tasks (e.g. plans), the ranges of the items to evaluate and the positions of the matching
+# items need to be transferred between the processes.
+_jobs = {}
+_job_ids = itertools.count()
+
+# The locks which are replaced in forked processes as (owner, attribute, factory) by the id of the owner and the name
+# of the attribute (see reinit_after_fork).
+_locks = {}
+
+
+def _reinit_locks():
+    for owner_ref, attribute, create in list(_locks.values()):
+        owner = owner_ref()
+        if owner is not None:
+            setattr(owner, attribute, create())
+
+
+def reinit_after_fork(owner: Any, attribute: str, create: Callable[[], Any]):
+    """
+    Replaces a lock of an object or a module with a new one in forked processes. Threads are not forked, hence a lock
+    which is held by another thread while the process is forked would never be released in the forked process.
+    :param owner: The object or module referring to the lock. The lock is not replaced anymore when it is deleted.
+    :param attribute: The name of the attribute referring to the lock.
+    :param create: A function creating a new lock (e.g. threading.Lock).
+    """
+    key = (id(owner), attribute)
+    _locks[key] = (weakref.ref(owner, lambda _: _locks.pop(key, None)), attribute, create)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_locks)
+
+
+def is_supported() -> bool:
+    """ Checks whether worker processes can be forked on this platform. """
+    # Importing multiprocessing takes a while, hence it is imported when worker processes are used.
+    import multiprocessing
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def _match_range(job_id: int, task: Any, start: int, stop: int) -> array:
+    """ Returns the positions of the items in the range which match the task (runs in a worker process). """
+    return _jobs[job_id](task, start, stop)
+
+
+def _shutdown(executor, job_id: int, wait: bool):
+    _jobs.pop(job_id, None)
+    executor.shutdown(wait=wait)
+
+
+class WorkerPool:
+    """
+    A pool of forked worker processes which evaluate ranges of the items they inherited when they were forked. The
+    worker processes are forked when the first task is submitted and are reused by subsequent tasks, hence the pool
+    needs to be replaced as soon as the inherited state (e.g. the data) changes.
+    """
+
+    def __init__(self, match_range: Callable[[Any, int, int], array], workers: int):
+        """
+        Initializes the WorkerPool.
+        :param match_range: A function which returns the positions of the items in a range (start, stop) matching a
+                            task. The function is inherited by the worker processes, while the tasks are pickled.
+        :param workers: The number of worker processes.
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self._job_id = next(_job_ids)
+        self._workers = workers
+        _jobs[self._job_id] = match_range
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+        # Pools which are not closed explicitly are shut down when they are garbage collected.
+        self._finalizer = weakref.finalize(self, _shutdown, self._executor, self._job_id, False)
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def iter_matching_positions(self, task: Any, length: int, chunks_per_worker: int = 4) -> Iterator[int]:
+        """
+        Evaluates the task on the items using the worker processes. The items are partitioned into consecutive ranges,
+        hence the positions of the matching items are returned in their original order.
+        :param task: The task which is passed to the function matching a range (e.g. a plan). It needs to be picklable.
+        :param length: The number of items.
+        :param chunks_per_worker: The number of ranges per worker process. More ranges balance the load between the
+                                  worker processes better, fewer ranges cause less overhead.
+        """
+        chunk_size = max(1, -(-length // (self._workers * chunks_per_worker)))
+        futures = []
+        try:
+            futures = [
+                self._executor.submit(_match_range, self._job_id, task, start, min(start + chunk_size, length))
+                for start in range(0, length, chunk_size)
+            ]
+            if futures:
+                # The worker processes are forked when the first task is submitted, hence the function matching a
+                # range is not needed by this process anymore (it refers to the display filter and the data).
+                _jobs.pop(self._job_id, None)
+            for future in futures:
+                yield from future.result()
+        finally:
+            # Stop evaluating when the result is not consumed entirely.
+            for future in futures:
+                future.cancel()
+
+    def close(self, wait: bool = True):
+        """
+        Shuts down the worker processes. Tasks which are still evaluated by other threads are completed.
+        :param wait: Whether to wait until the worker processes exited.
+        """
+        if self._finalizer.detach() is not None:
+            _shutdown(self._executor, self._job_id, wait)
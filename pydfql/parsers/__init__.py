@@ -14,4 +14,5 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-from pydfql.parsers.display_filter import DisplayFilterParser
\ No newline at end of file
+from pydfql.parsers.display_filter import DisplayFilterParser, PYPARSING, RECURSIVE_DESCENT
+from pydfql.parsers.normalizer import DisplayFilterNormalizer
@@ -15,18 +15,59 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import re
+import sys
+import threading
 from collections import deque
-
-import pyparsing as pp
-import dacite
-from ipranger.ipranger import IPAddresses, IPRangerFormatParser
+from typing import TYPE_CHECKING
+
+from pydfql import parallel
+
+if TYPE_CHECKING:
+    import pyparsing as pp
+
+# Pyparsing determines the number of arguments of parse actions when they are called the first time, which is not
+# thread-safe. Hence, grammars are warmed up by one thread at a time before they are used, while parsing is not
+# serialized.
+parse_lock = threading.Lock()
+parallel.reinit_after_fork(sys.modules[__name__], 'parse_lock', threading.Lock)
+
+
+def warm_up(element: 'pp.ParserElement') -> 'pp.ParserElement':
+    """
+    Prepares the given element of a grammar for being used by multiple threads at the same time. The element is
+    streamlined and all parse actions of the element and its sub elements are called once, so that pyparsing determines
+    the number of their arguments. Since the parse actions are called with empty tokens, they must not have side
+    effects.
+    :param element: the element to warm up.
+    :return: the given element.
+    """
+    import pyparsing as pp
+    with parse_lock:
+        element.streamline()
+        elements, visited = [element], set()
+        while elements:
+            element_ = elements.pop()
+            if id(element_) in visited:
+                continue
+            visited.add(id(element_))
+            for parse_action in element_.parseAction:
+                try:
+                    parse_action('', 0, pp.ParseResults([]))
+                except Exception:
+                    # Parse actions may fail on empty tokens, but the number of arguments is known anyway.
+                    pass
+            elements.extend(element_.recurse())
+            elements.extend(element_.ignoreExprs)
+    return element
 
 
 def _quoted_string():
+    import pyparsing as pp
     return pp.QuotedString("'") | pp.QuotedString('"')
 
 
 def _safe_word():
+    import pyparsing as pp
     return pp.Word(
         pp.printables
             .replace('(', '').replace(')', '')
@@ -36,12 +77,14 @@ def _safe_word():
 
 
 def _signed_float():
+    import pyparsing as pp
     return pp.Combine(pp.Optional('-') + pp.Word(pp.nums) + pp.Optional('.' + pp.Word(pp.nums))).setParseAction(
         lambda tokens: list(map(float, tokens.as_list()))
     )
 
 
 def _string_list():
+    import pyparsing as pp
     return pp.delimitedList(
         _quoted_string()
     ).addParseAction(lambda tokens: [tokens.asList()])
@@ -49,6 +92,7 @@ def _string_list():
 
 def _number_list():
     """ e.g. "1", "1,2,3", "1-3", "0..3" """
+    import pyparsing as pp
     signed_float = _signed_float()
     return pp.delimitedList(
         pp.Group(signed_float + pp.Literal('..') + signed_float) |
@@ -59,6 +103,8 @@ def _number_list():
 
 def _ip_v4_list():
     """ e.g. '127.0.0.1', '192.168.0.1/24', '192.168.0.1-10', '192.168-169.1,2,3', ... """
+    import dacite
+    from ipranger.ipranger import IPAddresses, IPRangerFormatParser
     return IPRangerFormatParser.IP_ADDRESSES.setParseAction(
         lambda tokens: [[dacite.from_dict(IPAddresses, tokens.as_dict())]]
     )
@@ -108,6 +154,7 @@ def _slice():
         # Return the first and the third item. The second item (operator) is ignored.
         return spec[0], spec[2]
 
+    import pyparsing as pp
     number = pp.common.signed_integer
     return pp.Literal('[').suppress() + (
         (
@@ -122,11 +169,35 @@ def _slice():
     ) + pp.Literal(']').suppress()
 
 
-white = pp.White(' ').suppress()
-quotedString = _quoted_string()
-safeWord = _safe_word()
-signedFloat = _signed_float()
-stringList = _string_list()
-numberList = _number_list()
-ipv4List = _ip_v4_list()
-slice = _slice()
+def _build_elements() -> dict:
+    import pyparsing as pp
+    elements = {
+        'white': pp.White(' ').suppress(),
+        'quotedString': _quoted_string(),
+        'safeWord': _safe_word(),
+        'signedFloat': _signed_float(),
+        'stringList': _string_list(),
+        'numberList': _number_list(),
+        'ipv4List': _ip_v4_list(),
+        'slice': _slice(),
+    }
+    # The elements are shared by the grammars, which may be used by other threads as soon as they are built.
+    for element in elements.values():
+        warm_up(element)
+    return elements
+
+
+# The elements shared by the grammars (e.g. white, quotedString, numberList, ...). Since importing pyparsing and
+# building the elements takes a while, they are built when any of them is used first.
+_ELEMENT_NAMES = ('white', 'quotedString', 'safeWord', 'signedFloat', 'stringList', 'numberList', 'ipv4List', 'slice')
+_elements_lock = threading.Lock()
+parallel.reinit_after_fork(sys.modules[__name__], '_elements_lock', threading.Lock)
+
+
+def __getattr__(name: str):
+    if name not in _ELEMENT_NAMES:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    with _elements_lock:
+        if name not in globals():
+            globals().update(_build_elements())
+    return globals()[name]
@@ -14,120 +14,224 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import pyparsing as pp
-from typing import List, Union, Optional, Callable, Dict
-from pydfql.exceptions import ParserError
+import re
+import sys
+import threading
+
+from typing import List, Union, Optional, Callable, Dict, TYPE_CHECKING
+from pydfql import parallel
+from pydfql.caches import LRUCache
+from pydfql.exceptions import ParserError, UnknownFieldError
 from pydfql.models import Expression
 from pydfql.parsers import common as pc
+from pydfql.parsers.recursive_descent import RecursiveDescentParser
+
+if TYPE_CHECKING:
+    import pyparsing as pp
+
+# Parses display filters using a grammar built with pyparsing.
+PYPARSING = 'pyparsing'
+# Parses display filters using a hand-written recursive descent parser in a single pass.
+RECURSIVE_DESCENT = 'recursive-descent'
+
+# The maximum number of distinct configurations (backend, field names and function names) whose grammars are kept.
+GRAMMAR_CACHE_SIZE = 256
+
+# The grammars shared by all parsers, keyed by the backend and the sorted field names and function names.
+_grammars = LRUCache(max_entries=GRAMMAR_CACHE_SIZE)
+_grammars_lock = threading.Lock()
+parallel.reinit_after_fork(sys.modules[__name__], '_grammars_lock', threading.Lock)
+
+# Field names which consist of the same characters as any other name, separated by line breaks.
+_GENERIC_FIELD_NAMES = re.compile(r'[A-Za-z0-9_.\-]+(?:\n[A-Za-z0-9_.\-]+)*')
+
+
+def _build_grammar(field_names: List[str], function_names: List[str]) -> 'pp.ParserElement':
+    """
+    Builds the grammar of a display filter. Expressions refer to functions by name, so that the grammar does not
+    depend on the functions themselves and can be shared between parsers.
+    field_names: list of field names ought to be valid. If the list is empty, everything is possible.
+    function_names: list of names of functions for transforming values.
+    """
+    import pyparsing as pp
+
+    # Function
+    # --------
+    # Function name and field name enclosed in brackets
+    function = lambda arguments: (
+            pp.oneOf(function_names) + pp.Literal('(').suppress() + arguments + pp.Literal(')').suppress()
+    )
+
+    # Field Name
+    # ----------
+    # Field names as specified - or alphanumeric string including '_', '-' and '.'
+    field_name = pp.oneOf(field_names) if field_names else pp.Word(pp.alphanums + '_-.')
+
+    # Slice
+    # -----
+    # A slice spec surrounded by square brackets (e.g. [:1,1:2,1-2,2])
+    slice = pc.slice
+
+    # Value
+    # -----
+    # Either single-quoted, double-quoted, unquoted value or a list of ip addresses, strings, or numbers enclosed
+    # by curly braces.
+    value = (
+            pc.quotedString |
+            pc.safeWord |
+            pp.Literal('{').suppress() + (pc.ipv4List | pc.stringList | pc.numberList) + pp.Literal('}').suppress()
+    )
+
+    # Comparison Operators
+    # --------------------
+    # Comparison operators are transformed to the python representation.
+    equal_operator = pp.oneOf(['==', 'eq'], caseless=True).setParseAction(lambda token: '==')
+    not_equal_operator = pp.oneOf(['!=', 'neq'], caseless=True).setParseAction(lambda token: '!=')
+    greater_than_or_equal_operator = pp.oneOf(['>=', 'ge'], caseless=True).setParseAction(lambda token: '>=')
+    greater_than_operator = pp.oneOf(['>', 'gt'], caseless=True).setParseAction(lambda token: '>')
+    less_than_or_equal_operator = pp.oneOf(['<=', 'le'], caseless=True).setParseAction(lambda token: '<=')
+    less_than_operator = pp.oneOf(['<', 'lt'], caseless=True).setParseAction(lambda token: '<')
+    contains_operator = pp.oneOf(['~=', 'contains'], caseless=True).setParseAction(lambda token: '~=')
+    matches_operator = pp.oneOf(['~', 'matches'], caseless=True).setParseAction(lambda token: '~')
+    in_operator = pp.CaselessLiteral('in').setParseAction(lambda token: 'in')
+    bitwise_and_operator = pp.Literal('&')
+    comparison_operator = (
+            equal_operator | not_equal_operator |
+            greater_than_or_equal_operator | greater_than_operator |
+            less_than_or_equal_operator | less_than_operator |
+            contains_operator | matches_operator | in_operator |
+            bitwise_and_operator
+    )
+
+    # Logical Operators
+    # -----------------
+    # Logical Operators are transformed to the python representation (e.g. not, and, or, ^).
+    not_operator = pp.CaselessLiteral('not') + pc.white | pp.CaselessLiteral('!').setParseAction(lambda token: 'not')
+    and_operator = pp.oneOf(['&&', 'and'], caseless=True).setParseAction(lambda token: 'and')
+    or_operator = pp.oneOf(['||', 'or'], caseless=True).setParseAction(lambda token: 'or')
+    xor_operator = pp.oneOf(['^^', 'xor'], caseless=True).setParseAction(lambda token: '^')
+    logical_operator = pc.white + (and_operator | or_operator | xor_operator) + pc.white
+
+    # Expression
+    # ----------
+    expression = pp.Forward()
+
+    # Function including field name, comparison operator and value - if function is specified
+    expression |= (function(field_name) + pc.white + comparison_operator + pc.white + value).setParseAction(
+        # field name, comparison operator, value, function
+        lambda tokens: [tokens[1], tokens[2], tokens[3], tokens[0]]
+    ) if function_names else pp.Forward()
+
+    # Function including field name with slice, comparison operator and value - if function is specified
+    expression |= (
+            function(field_name + slice) + pc.white() + comparison_operator + pc.white + value).setParseAction(
+        # field name, comparison operator, value, function, slice
+        lambda tokens: [tokens[1], tokens[3], tokens[4], tokens[0], tokens[2]]
+    ) if function_names else pp.Forward()
+
+    # Field name, comparison operator and value
+    expression |= (field_name + slice + pc.white + comparison_operator + pc.white + value).setParseAction(
+        # field_name, comparison operator, value, function, slice
+        lambda tokens: [tokens[0], tokens[2], tokens[3], None, tokens[1]]
+    )
+
+    # Field name, comparison operator and value
+    expression |= (field_name + pc.white + comparison_operator + pc.white + value)
+
+    # Field name
+    expression |= field_name
+
+    # Display Filter
+    # --------------
+    # Expressions connected with logical operators, optionally enclosed in parentheses.
+    grammar = pp.infixNotation(
+        expression.addParseAction(lambda tokens: Expression(*tokens.asList())),
+        [
+            (not_operator, 1, pp.opAssoc.RIGHT),
+            (logical_operator, 2, pp.opAssoc.LEFT),
+        ]
+    )
+    # Prepares the grammar for parsing. Otherwise the grammar is modified when the first display filter is parsed,
+    # which may interfere with other threads parsing display filters at the same time, since parsing is not serialized.
+    return pc.warm_up(grammar)
 
 
 class DisplayFilterParser:
-    """ A parser for a display filter. """
+    """
+    A parser for a display filter. The parser can be used by multiple threads at the same time.
+
+    Building the grammar is expensive. Hence, the grammar is built when the first display filter is parsed and is
+    shared by all parsers using the same backend, field names and function names.
+    """
 
-    def __init__(self, field_names: Optional[List[str]] = None, functions: Optional[Dict[str, Callable]] = None):
+    def __init__(self,
+                 field_names: Optional[List[str]] = None,
+                 functions: Optional[Dict[str, Callable]] = None,
+                 backend: str = PYPARSING):
         """
         Initializes the DisplayFilterParser with a list of valid field names and possible functions.
         field_names: optional list of field names ought to be valid (e.g. 'column', 'table.column', ...).
                      if none is given, everything is possible.
         functions: optional list of functions for transforming values (e.g. 'len(column)', 'upper(column)', ...)
+        backend: either PYPARSING or RECURSIVE_DESCENT. Both accept the same display filters and return the same
+                 expressions, but the hand-written RECURSIVE_DESCENT parser is considerably faster on long display
+                 filters.
         """
+        if backend not in (PYPARSING, RECURSIVE_DESCENT):
+            raise ValueError("Unknown parser backend '{}'!".format(backend))
+        self._functions = dict(functions or {})
+        self._backend = backend
+        field_names = field_names or []
+        if _GENERIC_FIELD_NAMES.fullmatch('\n'.join(field_names)):
+            # Field names are parsed like any other name and are looked up afterwards, so that neither building the
+            # grammar nor parsing slows down when there are many field names.
+            self._field_names = frozenset(field_names)
+            grammar_field_names = ()
+        else:
+            # Field names which can not be parsed like any other name (e.g. containing spaces) need to be part of the
+            # grammar. The order does not matter, since longer field names are always tried first.
+            self._field_names = None
+            grammar_field_names = tuple(sorted(set(field_names)))
+        self._grammar_key = (backend, grammar_field_names, tuple(sorted(self._functions)))
+        self._grammar = None
+
+    @property
+    def backend(self) -> str:
+        return self._backend
 
-        # Function
-        # --------
-        # Function name and field name enclosed in brackets
-        function = lambda arguments: (
-                pp.oneOf(functions.keys()) + pp.Literal('(').suppress() + arguments + pp.Literal(')').suppress()
-        )
-
-        # Field Name
-        # ----------
-        # Field names as specified - or alphanumeric string including '_', '-' and '.'
-        field_name = pp.oneOf(field_names) if field_names else pp.Word(pp.alphanums + '_-.')
-
-        # Slice
-        # -----
-        # A slice spec surrounded by square brackets (e.g. [:1,1:2,1-2,2])
-        slice = pc.slice
-
-        # Value
-        # -----
-        # Either single-quoted, double-quoted, unquoted value or a list of ip addresses, strings, or numbers enclosed
-        # by curly braces.
-        value = (
-                pc.quotedString |
-                pc.safeWord |
-                pp.Literal('{').suppress() + (pc.ipv4List | pc.stringList | pc.numberList) + pp.Literal('}').suppress()
-        )
-
-        # Comparison Operators
-        # --------------------
-        # Comparison operators are transformed to the python representation.
-        equal_operator = pp.oneOf(['==', 'eq'], caseless=True).setParseAction(lambda token: '==')
-        not_equal_operator = pp.oneOf(['!=', 'neq'], caseless=True).setParseAction(lambda token: '!=')
-        greater_than_or_equal_operator = pp.oneOf(['>=', 'ge'], caseless=True).setParseAction(lambda token: '>=')
-        greater_than_operator = pp.oneOf(['>', 'gt'], caseless=True).setParseAction(lambda token: '>')
-        less_than_or_equal_operator = pp.oneOf(['<=', 'le'], caseless=True).setParseAction(lambda token: '<=')
-        less_than_operator = pp.oneOf(['<', 'lt'], caseless=True).setParseAction(lambda token: '<')
-        contains_operator = pp.oneOf(['~=', 'contains'], caseless=True).setParseAction(lambda token: '~=')
-        matches_operator = pp.oneOf(['~', 'matches'], caseless=True).setParseAction(lambda token: '~')
-        in_operator = pp.CaselessLiteral('in').setParseAction(lambda token: 'in')
-        bitwise_and_operator = pp.Literal('&')
-        comparison_operator = (
-                equal_operator | not_equal_operator |
-                greater_than_or_equal_operator | greater_than_operator |
-                less_than_or_equal_operator | less_than_operator |
-                contains_operator | matches_operator | in_operator |
-                bitwise_and_operator
-        )
-
-        # Logical Operators
-        # -----------------
-        # Logical Operators are transformed to the python representation (e.g. not, and, or, ^).
-        not_operator = pp.CaselessLiteral('not') + pc.white | pp.CaselessLiteral('!').setParseAction(lambda token: 'not')
-        and_operator = pp.oneOf(['&&', 'and'], caseless=True).setParseAction(lambda token: 'and')
-        or_operator = pp.oneOf(['||', 'or'], caseless=True).setParseAction(lambda token: 'or')
-        xor_operator = pp.oneOf(['^^', 'xor'], caseless=True).setParseAction(lambda token: '^')
-        logical_operator = pc.white + (and_operator | or_operator | xor_operator) + pc.white
-
-        # Expression
-        # ----------
-        expression = pp.Forward()
-
-        # Function including field name, comparison operator and value - if function is specified
-        expression |= (function(field_name) + pc.white + comparison_operator + pc.white + value).setParseAction(
-            # field name, comparison operator, value, function
-            lambda tokens: [tokens[1], tokens[2], tokens[3], functions.get(tokens[0])]
-        ) if functions else pp.Forward()
-
-        # Function including field name with slice, comparison operator and value - if function is specified
-        expression |= (
-                function(field_name + slice) + pc.white() + comparison_operator + pc.white + value).setParseAction(
-            # field name, comparison operator, value, function, slice
-            lambda tokens: [tokens[1], tokens[3], tokens[4], functions.get(tokens[0]), tokens[2]]
-        ) if functions else pp.Forward()
-
-        # Field name, comparison operator and value
-        expression |= (field_name + slice + pc.white + comparison_operator + pc.white + value).setParseAction(
-            # field_name, comparison operator, value, function, slice
-            lambda tokens: [tokens[0], tokens[2], tokens[3], None, tokens[1]]
-        )
-
-        # Field name, comparison operator and value
-        expression |= (field_name + pc.white + comparison_operator + pc.white + value)
-
-        # Field name
-        expression |= field_name
-
-        # Display Filter
-        # --------------
-        # Expressions connected with logical operators, optionally enclosed in parentheses.
-        self._display_filter_format = pp.infixNotation(
-            expression.addParseAction(lambda tokens: Expression(*tokens.asList())),
-            [
-                (not_operator, 1, pp.opAssoc.RIGHT),
-                (logical_operator, 2, pp.opAssoc.LEFT),
-            ]
-        )
+    def _get_grammar(self) -> Union['pp.ParserElement', RecursiveDescentParser]:
+        """ Returns the grammar shared by all parsers with the same configuration. """
+        if self._grammar is None:
+            with _grammars_lock:
+                grammar = _grammars.get(self._grammar_key)
+                if grammar is None:
+                    backend, field_names, function_names = self._grammar_key
+                    build = _build_grammar if backend == PYPARSING else RecursiveDescentParser
+                    grammar = build(list(field_names), list(function_names))
+                    _grammars.put(self._grammar_key, grammar)
+            self._grammar = grammar
+        return self._grammar
+
+    def _resolve(self, tokens: List) -> List:
+        """
+        Checks whether the fields used in the expressions are valid and replaces the names of the functions with the
+        functions themselves.
+        :raises UnknownFieldError, when an expression refers to an unknown field.
+        """
+        result = []
+        for token in tokens:
+            if isinstance(token, list):
+                token = self._resolve(token)
+            elif isinstance(token, Expression):
+                if self._field_names is not None and token.field not in self._field_names:
+                    import difflib
+                    raise UnknownFieldError(token.field, difflib.get_close_matches(token.field, self._field_names))
+                if token.function is not None:
+                    token = Expression(
+                        token.field, token.operator, token.value, self._functions[token.function], token.slicer_specs
+                    )
+            result.append(token)
+        return result
 
     def parse(self, format: str) -> List[Union[Expression, str]]:
         """
@@ -135,11 +239,19 @@ class DisplayFilterParser:
         :param format: a display filter string. See class documentation for examples.
         :return a list of expressions and logical operators as string.
         :raises ParserError, when the given display filter could not be parsed correctly.
+        :raises UnknownFieldError, when the display filter refers to an unknown field.
         """
         try:
             if not format or not format.strip():
                 return []
-            return self._display_filter_format.parseString(format, parseAll=True).asList()
+            grammar = self._get_grammar()
+            if self._backend == RECURSIVE_DESCENT:
+                tokens = grammar.parse(format)
+            else:
+                tokens = grammar.parseString(format, parseAll=True).asList()
+            return self._resolve(tokens) if self._functions or self._field_names is not None else tokens
+        except ParserError:
+            raise
         except Exception:
             # This error indicates that there is something wrong with the given display filter.
             # Especially if the given display filter is some kind of user input this error needs to be handled
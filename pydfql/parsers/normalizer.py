@@ -0,0 +1,269 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from pydfql.expressions import from_tree, to_tree
+from pydfql.models import EqualitySet, Expression, TypedExpression
+
+# The result of a display filter which does not match any item.
+CONSTANT_FALSE = [False]
+# The result of a display filter which matches all items.
+CONSTANT_TRUE = [True]
+
+# Comparison operators which specify a lower or upper bound of a value.
+_LOWER_BOUND_OPERATORS = ('>', '>=')
+_UPPER_BOUND_OPERATORS = ('<', '<=')
+
+
+class DisplayFilterNormalizer:
+    """
+    Rewrites the output of the DisplayFilterParser into a canonical form without changing which items are matched:
+
+        * chains of the same logical operator are flattened and redundant parentheses are removed
+        * operands of 'and', 'or' and 'xor' are sorted and duplicates are removed
+        * double negations are removed
+        * contradictions (e.g. 'a and not a') and tautologies (e.g. 'a or not a') are replaced by constants
+        * equality comparisons on the same field which are or-ed are merged into a single 'in' membership test
+        * lower and upper bounds on the same field which are and-ed are reduced to the tightest ones
+
+    Note that the evaluator tries several types (e.g. numbers and dates) when comparing values and that lists of item
+    values match when any value in the list matches. Hence, bounds are only reduced when all types agree on which bound
+    is the tightest one, and contradicting bounds (e.g. 'a > 5 and a < 3') are not treated as contradiction, since an
+    item value like [1, 6] matches both of them.
+    """
+
+    def __init__(self, functions: Optional[Dict[str, Callable]] = None, evaluator=None):
+        """
+        Initializes the DisplayFilterNormalizer.
+        :param functions: The dictionary of functions used in the display filter. Used to refer to functions by name.
+        :param evaluator: The evaluator used to evaluate the expressions. Bounds are only reduced when an evaluator
+                          is given whose comparison operators order values naturally (e.g. the DefaultEvaluator).
+        """
+        self._function_names = {id(function): name for name, function in (functions or {}).items()}
+        self._evaluator = evaluator
+
+    def _function_name(self, function: Optional[Callable]) -> str:
+        if function is None:
+            return ''
+        return self._function_names.get(id(function), getattr(function, '__name__', repr(function)))
+
+    def _key(self, node) -> str:
+        """ Returns a canonical string representation of a node which is used for sorting and comparing nodes. """
+        if isinstance(node, bool):
+            return str(node)
+        if isinstance(node, Expression):
+            return '{}({}{})|{}|{!r}{}'.format(
+                self._function_name(node.function),
+                node.field,
+                repr(node.slicer_specs) if node.slicer_specs else '',
+                node.operator or '',
+                node.value,
+                # Expressions bound to the type of their field compare values of that type only (see Schema).
+                '|' + node.field_type if isinstance(node, TypedExpression) else '')
+        operator, operands = node
+        if operator == 'not':
+            return 'not ' + self._key(operands)
+        return operator + '(' + ', '.join(self._key(operand) for operand in operands) + ')'
+
+    def _field_key(self, expression: Expression) -> str:
+        """ Returns a key which identifies the field including slicers and functions of an expression. """
+        return '{}|{}|{!r}'.format(id(expression.function), expression.field, expression.slicer_specs)
+
+    def _simplify(self, node):
+        if isinstance(node, (bool, Expression)):
+            return node
+        operator, operands = node
+        if operator == 'not':
+            return self._simplify_not(self._simplify(operands))
+        operands = self._flatten(operator, [self._simplify(operand) for operand in operands])
+        if operator == 'xor':
+            return self._simplify_xor(operands)
+        return self._simplify_and_or(operator, operands)
+
+    def _flatten(self, operator: str, operands: List) -> List:
+        """ Flattens chains of the same logical operator (e.g. '(a and b) and c' -> 'a and b and c'). """
+        result = []
+        for operand in operands:
+            if isinstance(operand, tuple) and operand[0] == operator:
+                result.extend(operand[1])
+            else:
+                result.append(operand)
+        return result
+
+    def _simplify_not(self, operand):
+        if isinstance(operand, bool):
+            return not operand
+        if isinstance(operand, tuple) and operand[0] == 'not':
+            # Double negation (e.g. 'not not a' -> 'a').
+            return operand[1]
+        return 'not', operand
+
+    def _simplify_xor(self, operands: List):
+        # Constants and pairs of equal operands cancel out (e.g. 'a xor b xor a' -> 'b').
+        negate = False
+        unique_operands = OrderedDict()
+        for operand in operands:
+            if isinstance(operand, bool):
+                negate ^= operand
+                continue
+            key = self._key(operand)
+            if key in unique_operands:
+                del unique_operands[key]
+            else:
+                unique_operands[key] = operand
+        if not unique_operands:
+            return negate
+        result = self._sorted('xor', list(unique_operands.values()))
+        return self._simplify_not(result) if negate else result
+
+    def _simplify_and_or(self, operator: str, operands: List):
+        absorbing = operator == 'or'  # 'or' is absorbed by True, 'and' by False.
+        unique_operands = OrderedDict()
+        for operand in operands:
+            if isinstance(operand, bool):
+                if operand == absorbing:
+                    return absorbing
+                # The neutral element (True for 'and', False for 'or') can be removed.
+                continue
+            unique_operands.setdefault(self._key(operand), operand)
+        for key in unique_operands:
+            if 'not ' + key in unique_operands:
+                # A contradiction (e.g. 'a and not a') or a tautology (e.g. 'a or not a').
+                return absorbing
+        operands = list(unique_operands.values())
+        if operator == 'or':
+            operands = self._merge_equality_comparisons(operands)
+        else:
+            operands = self._reduce_bounds(operands)
+        if not operands:
+            return not absorbing
+        return self._sorted(operator, operands)
+
+    def _sorted(self, operator: str, operands: List):
+        if len(operands) == 1:
+            return operands[0]
+        return operator, tuple(sorted(operands, key=self._key))
+
+    def _merge_equality_comparisons(self, operands: List) -> List:
+        """ Merges or-ed equality comparisons on the same field (e.g. 'a == 1 or a == 2' -> 'a in {1, 2}'). """
+        groups = OrderedDict()
+        result = []
+        for operand in operands:
+            if isinstance(operand, Expression) and (
+                    (operand.operator == '==' and isinstance(operand.value, str)) or
+                    (operand.operator == 'in' and isinstance(operand.value, EqualitySet))):
+                groups.setdefault(self._field_key(operand), []).append(operand)
+            else:
+                result.append(operand)
+        for expressions in groups.values():
+            if len(expressions) == 1:
+                result.append(expressions[0])
+                continue
+            values = set()
+            for expression in expressions:
+                values.update(expression.value if expression.operator == 'in' else [expression.value])
+            expression = expressions[0]
+            result.append(Expression(
+                expression.field, 'in', EqualitySet(sorted(values)), expression.function, expression.slicer_specs
+            ))
+        return result
+
+    def _implies(self, expression: Expression, other: Expression) -> bool:
+        """
+        Checks whether any item value matching the expression also matches the other expression. Both expressions
+        need to specify a bound in the same direction on the same field.
+        """
+        if self._evaluator is None or not hasattr(self._evaluator, 'evaluators'):
+            return False
+        evaluators = self._evaluator.evaluators.get(expression.operator, [])
+        other_evaluators = self._evaluator.evaluators.get(other.operator, [])
+        if [type(evaluator) for evaluator in evaluators] != [type(evaluator) for evaluator in other_evaluators]:
+            return False
+        for evaluator, other_evaluator in zip(evaluators, other_evaluators):
+            try:
+                value = evaluator.convert_expression_value(expression.value)
+            except Exception:
+                # The expression does not match any item value using this evaluator.
+                continue
+            if isinstance(value, bool):
+                # The evaluator accepts the value but never matches any item value.
+                continue
+            try:
+                other_value = other_evaluator.convert_expression_value(other.value)
+                if isinstance(other_value, bool):
+                    return False
+                if expression.operator in _LOWER_BOUND_OPERATORS:
+                    # e.g. 'a >= 5' implies 'a > 3', 'a > 3' implies 'a >= 3'
+                    strict = expression.operator == '>=' and other.operator == '>'
+                    implied = value > other_value if strict else value >= other_value
+                else:
+                    # e.g. 'a <= 3' implies 'a < 5', 'a < 5' implies 'a <= 5'
+                    strict = expression.operator == '<=' and other.operator == '<'
+                    implied = value < other_value if strict else value <= other_value
+            except Exception:
+                # The types of the values do not match or can not be compared.
+                return False
+            if not implied:
+                return False
+        return True
+
+    def _reduce_bounds(self, operands: List) -> List:
+        """ Removes and-ed bounds which are implied by tighter bounds (e.g. 'a > 1 and a > 3' -> 'a > 3'). """
+        groups = OrderedDict()
+        for operand in operands:
+            if isinstance(operand, Expression) and isinstance(operand.value, str):
+                if operand.operator in _LOWER_BOUND_OPERATORS:
+                    groups.setdefault(('lower', self._field_key(operand)), []).append(operand)
+                elif operand.operator in _UPPER_BOUND_OPERATORS:
+                    groups.setdefault(('upper', self._field_key(operand)), []).append(operand)
+        redundant = set()
+        for expressions in groups.values():
+            for expression in expressions:
+                for other in expressions:
+                    if expression is not other and id(other) not in redundant and self._implies(other, expression):
+                        redundant.add(id(expression))
+                        break
+        return [operand for operand in operands if id(operand) not in redundant]
+
+    def normalize(self, expressions: List[Union[Expression, str, List]]) -> List[Union[Expression, str, List, bool]]:
+        """
+        Normalizes the output of the DisplayFilterParser.
+        :param expressions: List of expressions and logical operators.
+        :return: the normalized list of expressions and logical operators. Either CONSTANT_FALSE or CONSTANT_TRUE is
+                 returned when the display filter does not match any item or matches all items.
+        """
+        if not expressions:
+            return []
+        node = self._simplify(to_tree(expressions))
+        if isinstance(node, bool):
+            return CONSTANT_TRUE if node else CONSTANT_FALSE
+        return from_tree(node)
+
+    def fingerprint(self, expressions: List[Union[Expression, str, List, bool]]) -> str:
+        """
+        Returns a fingerprint of normalized expressions which is stable across processes. Functions are referred to
+        by name.
+        """
+        if not expressions:
+            key = ''
+        elif expressions in (CONSTANT_FALSE, CONSTANT_TRUE):
+            key = str(expressions[0])
+        else:
+            key = self._key(to_tree(expressions))
+        import hashlib
+        return hashlib.sha256(key.encode('utf8')).hexdigest()
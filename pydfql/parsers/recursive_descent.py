@@ -0,0 +1,324 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
+import string
+import sys
+import threading
+from typing import List, Optional, Tuple, Union, TYPE_CHECKING
+
+from pydfql import parallel
+from pydfql.models import Expression
+from pydfql.parsers import common as pc
+
+if TYPE_CHECKING:
+    import pyparsing as pp
+
+# The characters skipped before each token (tabs are expanded before parsing). Spaces are required between field names,
+# comparison operators, values and logical operators.
+_WHITESPACE = ' \n\r'
+_LINE_BREAKS = '\n\r'
+
+# Comparison operators in the order they are tried and their python representation.
+_COMPARISON_OPERATORS = [
+    (('==', 'EQ'), '=='),
+    (('!=', 'NEQ'), '!='),
+    (('>=', 'GE'), '>='),
+    (('>', 'GT'), '>'),
+    (('<=', 'LE'), '<='),
+    (('<', 'LT'), '<'),
+    (('~=', 'CONTAINS'), '~='),
+    (('~', 'MATCHES'), '~'),
+    (('IN',), 'in'),
+]
+_LOGICAL_OPERATORS = [
+    (('&&', 'AND'), 'and'),
+    (('||', 'OR'), 'or'),
+    (('^^', 'XOR'), '^'),
+]
+
+_GENERIC_FIELD_NAME = re.compile('[{}]+'.format(re.escape(string.ascii_letters + string.digits + '_-.')))
+_SAFE_WORD = re.compile('[{}]+'.format(re.escape(
+    ''.join(c for c in string.printable if c not in string.whitespace and c not in '()[]{}')
+)))
+_QUOTED_STRINGS = {quote: re.compile('{0}[^{0}\n\r]*{0}'.format(quote)) for quote in '\'"'}
+_WHITESPACE_ESCAPES = ((r"\t", "\t"), (r"\n", "\n"), (r"\f", "\f"), (r"\r", "\r"))
+
+# Lists of numbers (e.g. '{1, 2-3, 4..5}') and lists of strings (e.g. '{"a", 'b'}'). Lists containing less than three
+# dots can not be lists of ip addresses.
+_NUMBER_ITEM = re.compile(r'(-?\d+(?:\.\d+)?)[ \n\r]*(?:(\.\.|-)[ \n\r]*(-?\d+(?:\.\d+)?))?')
+_NUMBER_LIST = re.compile(r'{{[ \n\r]*(?:{0}[ \n\r]*,[ \n\r]*)*{0}[ \n\r]*}}'.format(
+    r'-?\d+(?:\.\d+)?[ \n\r]*(?:(?:\.\.|-)[ \n\r]*-?\d+(?:\.\d+)?)?'
+))
+_STRING = re.compile(r'"[^"\n\r]*"|' + r"'[^'\n\r]*'")
+_STRING_LIST = re.compile(r'{{[ \n\r]*(?:(?:{0})[ \n\r]*,[ \n\r]*)*(?:{0})[ \n\r]*}}'.format(_STRING.pattern))
+
+# Other lists (e.g. ip addresses) and slices are parsed by the elements of the grammar, which are built when first used.
+_elements = None
+_elements_lock = threading.Lock()
+parallel.reinit_after_fork(sys.modules[__name__], '_elements_lock', threading.Lock)
+
+# The result of parsing a part of a display filter: the position after the part and the token, or None on mismatch.
+_Result = Optional[Tuple[int, Union[Expression, str, List]]]
+
+
+class RecursiveDescentParser:
+    """
+    A hand-written parser for the display filter language which produces the same expressions and logical operators as
+    the grammar built by the DisplayFilterParser, but parses display filters in a single pass. Like the grammar,
+    expressions refer to functions by name.
+
+    Note that the grammar does not accept slices inside of functions (e.g. 'len(name[0]) == 1'), hence this parser does
+    not either.
+    """
+
+    def __init__(self, field_names: List[str], function_names: List[str]):
+        """
+        Initializes the RecursiveDescentParser.
+        field_names: list of field names ought to be valid. If the list is empty, everything is possible.
+        function_names: list of names of functions for transforming values.
+        """
+        self._field_name = self._longest_match(field_names) if field_names else _GENERIC_FIELD_NAME
+        self._function_name = self._longest_match(function_names) if function_names else None
+
+    @staticmethod
+    def _longest_match(names: List[str]) -> 're.Pattern':
+        """ Returns a pattern matching the longest of the names, like the grammar does. """
+        return re.compile('|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True)))
+
+    def _skip(self, text: str, position: int) -> int:
+        while position < len(text) and text[position] in _WHITESPACE:
+            position += 1
+        return position
+
+    def _white(self, text: str, position: int) -> int:
+        """ Returns the position after the spaces separating two tokens, or -1 when there are no spaces. """
+        while position < len(text) and text[position] in _LINE_BREAKS:
+            position += 1
+        if position >= len(text) or text[position] != ' ':
+            return -1
+        return self._skip(text, position)
+
+    def _literal(self, text: str, position: int, literal: str) -> int:
+        position = self._skip(text, position)
+        return position + len(literal) if text.startswith(literal, position) else -1
+
+    def _keyword(self, text: str, position: int, operators: List) -> Tuple[int, Optional[str]]:
+        """ Matches one of the operators case-insensitively and returns the position after it and its name. """
+        position = self._skip(text, position)
+        for symbols, name in operators:
+            for symbol in symbols:
+                if text[position:position + len(symbol)].upper() == symbol:
+                    return position + len(symbol), name
+        return -1, None
+
+    def _get_element(self, name: str) -> 'pp.ParserElement':
+        """ Returns the element of the grammar used to parse other lists ('list') or slices ('slice'). """
+        global _elements
+        if _elements is None:
+            with _elements_lock:
+                if _elements is None:
+                    import pyparsing as pp
+                    _elements = {
+                        'list': pc.warm_up(
+                            pp.Literal('{').suppress() +
+                            (pc.ipv4List | pc.stringList | pc.numberList) +
+                            pp.Literal('}').suppress()
+                        ),
+                        'slice': pc.warm_up(pc.slice),
+                    }
+        return _elements[name]
+
+    def _element(self, text: str, position: int, name: str) -> Tuple[int, List]:
+        """ Parses a part of the display filter using an element of the grammar. """
+        import pyparsing as pp
+        element = self._get_element(name)
+        try:
+            position, tokens = element._parse(text, position)
+            return position, tokens.asList()
+        except pp.ParseBaseException:
+            return -1, []
+
+    def _unquote(self, value: str) -> str:
+        value = value[1:-1]
+        if '\\' in value:
+            for escaped, character in _WHITESPACE_ESCAPES:
+                value = value.replace(escaped, character)
+        return value
+
+    def _list(self, text: str, position: int) -> _Result:
+        """ Parses a list of ip addresses, strings or numbers enclosed by curly braces. """
+        if not text.startswith('{', position):
+            return None
+        match = _STRING_LIST.match(text, position)
+        if match:
+            return match.end(), [self._unquote(value) for value in _STRING.findall(match.group())]
+        match = _NUMBER_LIST.match(text, position)
+        if match and match.group().count('.') < 3:
+            return match.end(), [
+                [float(start), operator, float(end)] if operator else float(start)
+                for start, operator, end in _NUMBER_ITEM.findall(match.group())
+            ]
+        position, tokens = self._element(text, position, 'list')
+        return (position, tokens[0]) if position >= 0 else None
+
+    def _value(self, text: str, position: int) -> _Result:
+        position = self._skip(text, position)
+        quote = text[position:position + 1]
+        match = _QUOTED_STRINGS[quote].match(text, position) if quote in _QUOTED_STRINGS else None
+        if match:
+            return match.end(), self._unquote(match.group())
+        match = _SAFE_WORD.match(text, position)
+        if match:
+            return match.end(), match.group()
+        return self._list(text, position)
+
+    def _comparison(self, text: str, position: int) -> Tuple[int, List]:
+        """ Parses the comparison operator and the value following a field. """
+        position = self._white(text, position)
+        if position < 0:
+            return -1, []
+        end, operator = self._keyword(text, position, _COMPARISON_OPERATORS)
+        if end < 0:
+            end, operator = self._literal(text, position, '&'), '&'
+        if end < 0:
+            return -1, []
+        position = self._white(text, end)
+        result = self._value(text, position) if position >= 0 else None
+        if result is None:
+            return -1, []
+        return result[0], [operator, result[1]]
+
+    def _match(self, pattern: 're.Pattern', text: str, position: int) -> Tuple[int, Optional[str]]:
+        position = self._skip(text, position)
+        match = pattern.match(text, position)
+        return (match.end(), match.group()) if match else (-1, None)
+
+    def _function_expression(self, text: str, position: int) -> _Result:
+        """ Parses a function including field name, comparison operator and value (e.g. 'len(name) > 3'). """
+        position, function = self._match(self._function_name, text, position)
+        if position >= 0:
+            position = self._literal(text, position, '(')
+        field = None
+        if position >= 0:
+            position, field = self._match(self._field_name, text, position)
+        if position >= 0:
+            position = self._literal(text, position, ')')
+        if position < 0:
+            return None
+        position, comparison = self._comparison(text, position)
+        if position < 0:
+            return None
+        return position, Expression(field, comparison[0], comparison[1], function)
+
+    def _expression(self, text: str, position: int) -> _Result:
+        if self._function_name is not None:
+            result = self._function_expression(text, position)
+            if result is not None:
+                return result
+        position, field = self._match(self._field_name, text, position)
+        if position < 0:
+            return None
+        # Field name with slice, comparison operator and value
+        slice_position, tokens = self._element(text, position, 'slice') \
+            if text.startswith('[', self._skip(text, position)) else (-1, [])
+        if slice_position >= 0:
+            end, comparison = self._comparison(text, slice_position)
+            if end >= 0:
+                return end, Expression(field, comparison[0], comparison[1], None, tokens[0])
+        # Field name, comparison operator and value
+        end, comparison = self._comparison(text, position)
+        if end >= 0:
+            return end, Expression(field, *comparison)
+        # Field name
+        return position, Expression(field)
+
+    def _operand(self, text: str, position: int) -> _Result:
+        """ Parses an expression or a display filter enclosed in parentheses. """
+        result = self._expression(text, position)
+        if result is not None:
+            return result
+        position = self._literal(text, position, '(')
+        result = self._display_filter(text, position) if position >= 0 else None
+        if result is None:
+            return None
+        position = self._literal(text, result[0], ')')
+        return (position, result[1]) if position >= 0 else None
+
+    def _not(self, text: str, position: int) -> int:
+        """ Returns the position after a 'not' operator, or -1 when there is none. """
+        position = self._skip(text, position)
+        if text[position:position + 3].upper() == 'NOT':
+            end = self._white(text, position + 3)
+            if end >= 0:
+                return end
+        return position + 1 if text.startswith('!', position) else -1
+
+    def _negation(self, text: str, position: int) -> _Result:
+        """ Parses an operand preceded by any number of 'not' operators. """
+        negations = []
+        while True:
+            end = self._not(text, position)
+            if end < 0:
+                break
+            negations.append(position)
+            position = end
+        result = self._operand(text, position)
+        # When the operand can not be parsed, the last 'not' may be the name of a field (e.g. 'not == 1').
+        while result is None and negations:
+            result = self._operand(text, negations.pop())
+        if result is None:
+            return None
+        position, token = result
+        for _ in negations:
+            token = ['not', token]
+        return position, token
+
+    def _logical_operator(self, text: str, position: int) -> Tuple[int, Optional[str]]:
+        position = self._white(text, position)
+        if position < 0:
+            return -1, None
+        position, operator = self._keyword(text, position, _LOGICAL_OPERATORS)
+        return (self._white(text, position), operator) if position >= 0 else (-1, None)
+
+    def _display_filter(self, text: str, position: int) -> _Result:
+        """ Parses operands connected by logical operators, which all have the same precedence. """
+        result = self._negation(text, position)
+        if result is None:
+            return None
+        position, token = result
+        tokens = [token]
+        while True:
+            end, operator = self._logical_operator(text, position)
+            result = self._negation(text, end) if end >= 0 else None
+            if result is None:
+                break
+            position, token = result
+            tokens += [operator, token]
+        return position, tokens if len(tokens) > 1 else tokens[0]
+
+    def parse(self, text: str) -> List[Union[Expression, str, List]]:
+        """
+        Parses a display filter string.
+        :return a list of expressions and logical operators as string.
+        :raises ValueError, when the given display filter could not be parsed correctly.
+        """
+        # Like pyparsing, tabs are expanded before parsing.
+        text = text.expandtabs()
+        result = self._display_filter(text, 0)
+        if result is None or self._skip(text, result[0]) != len(text):
+            raise ValueError('Error parsing display filter!')
+        return [result[1]]
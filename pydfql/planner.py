@@ -0,0 +1,227 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple, Union
+
+from pydfql.expressions import from_tree, iter_expressions, to_tree
+from pydfql.models import EqualitySet, Expression
+from pydfql.statistics import StatisticsCollector, to_ordered_value
+
+# Evaluates the expressions item by item and stops evaluating as soon as the result is known.
+SCAN = 'scan'
+# Evaluates each expression on all items at once using the predicate cache and combines the bitsets.
+BITMAP = 'bitmap'
+# Lets the database select the candidate items before evaluating the expressions item by item.
+PUSHDOWN = 'pushdown'
+
+# The selectivity of expressions on fields without statistics.
+_DEFAULT_SELECTIVITIES = {
+    None: 0.9,
+    '==': 0.1,
+    '!=': 0.9,
+    'in': 0.2,
+    '~': 0.25,
+    '~=': 0.25,
+    '&': 0.5,
+    '>': 1 / 3,
+    '>=': 1 / 3,
+    '<': 1 / 3,
+    '<=': 1 / 3,
+}
+
+# The relative cost of evaluating an expression on a single item.
+_OPERATOR_COSTS = {
+    None: 0.5,
+    '==': 1.0,
+    '!=': 1.0,
+    'in': 2.0,
+    '~': 3.0,
+    '~=': 1.0,
+    '&': 1.0,
+    '>': 4.0,
+    '>=': 4.0,
+    '<': 4.0,
+    '<=': 4.0,
+}
+# Comparing dates requires parsing the item values which is quite expensive.
+_DATE_COST = 20.0
+_FUNCTION_COST = 0.5
+_SLICER_COST = 10.0
+
+
+@dataclass
+class Plan:
+    """ Describes how a display filter is evaluated. """
+    access_path: str
+    expressions: List[Union[Expression, str, List]]
+    selectivity: float  # The estimated fraction of matching items.
+    cost: float  # The estimated cost of the evaluation in units of the cost of comparing two values.
+
+
+class CostBasedPlanner:
+    """
+    Decides how a display filter is evaluated based on the statistics of the data.
+
+    The selectivity of each expression is estimated using the null rate, the number of distinct values and the
+    histograms of the fields. Operands of 'and' and 'or' are reordered so that cheap expressions which are likely to
+    decide the result are evaluated first. Finally, the access path with the lowest estimated cost is chosen.
+    """
+
+    def __init__(self, statistics: StatisticsCollector = None, default_row_count: int = 1000):
+        """
+        Initializes the CostBasedPlanner.
+        :param statistics: The statistics of the data. If no statistics are given default selectivities are used.
+        :param default_row_count: The number of items assumed when neither statistics nor the data are available.
+        """
+        self._statistics = statistics
+        self._default_row_count = default_row_count
+
+    @property
+    def statistics(self) -> StatisticsCollector:
+        return self._statistics
+
+    def _has_statistics(self, expression: Expression) -> bool:
+        return self._statistics is not None and self._statistics.row_count > 0 and \
+            not expression.function and not expression.slicer_specs
+
+    def estimate_cost(self, expression: Expression) -> float:
+        """ Returns the estimated cost of evaluating the expression on a single item. """
+        cost = _OPERATOR_COSTS.get(expression.operator, 1.0)
+        if expression.operator in ('>', '>=', '<', '<=') and self._statistics is not None and \
+                self._statistics.value_type(expression.field) == 'date':
+            cost = _DATE_COST
+        if expression.operator == 'in' and isinstance(expression.value, EqualitySet):
+            # Each value of merged equality comparisons is compared on its own, lists are looked up in a set instead.
+            cost *= max(1, len(expression.value))
+        if expression.function:
+            cost += _FUNCTION_COST
+        if expression.slicer_specs:
+            cost += _SLICER_COST
+        return cost
+
+    def estimate_selectivity(self, expression: Expression) -> float:
+        """ Returns the estimated fraction of items matching the expression. """
+        default = _DEFAULT_SELECTIVITIES.get(expression.operator, 0.5)
+        if not self._has_statistics(expression):
+            return default
+        statistics = self._statistics
+        field = expression.field
+        not_null = 1.0 - statistics.null_rate(field)
+        operator = expression.operator
+        if operator is None:
+            return not_null
+        equal = not_null / max(1, statistics.distinct_count(field))
+        if operator == '==':
+            return equal
+        if operator == '!=':
+            return 1.0 - equal
+        if operator == 'in' and isinstance(expression.value, EqualitySet):
+            return min(not_null, equal * len(expression.value))
+        if operator in ('>', '>=', '<', '<='):
+            histogram = statistics.histogram(field)
+            value = to_ordered_value(statistics.value_type(field), expression.value)
+            if histogram is None or value is None:
+                return not_null * default
+            less = histogram.fraction_less_than(value)
+            return not_null * (less if operator in ('<', '<=') else 1.0 - less)
+        return not_null * default
+
+    def _estimate(self, node) -> Tuple[float, float]:
+        """ Returns the estimated selectivity and cost per item of a node. """
+        if isinstance(node, Expression):
+            return self.estimate_selectivity(node), self.estimate_cost(node)
+        operator, operands = node
+        if operator == 'not':
+            selectivity, cost = self._estimate(operands)
+            return 1.0 - selectivity, cost
+        estimates = [self._estimate(operand) for operand in operands]
+        selectivity, cost = estimates[0]
+        for other_selectivity, other_cost in estimates[1:]:
+            if operator == 'and':
+                # The other operand is only evaluated for items matching the previous operands.
+                cost += selectivity * other_cost
+                selectivity *= other_selectivity
+            elif operator == 'or':
+                # The other operand is only evaluated for items not matching the previous operands.
+                cost += (1.0 - selectivity) * other_cost
+                selectivity = selectivity + other_selectivity - selectivity * other_selectivity
+            else:
+                cost += other_cost
+                selectivity = selectivity * (1.0 - other_selectivity) + other_selectivity * (1.0 - selectivity)
+        return selectivity, cost
+
+    def _order(self, node):
+        """ Reorders the operands of 'and' and 'or' so that the expected cost of the evaluation is minimal. """
+        if isinstance(node, Expression):
+            return node
+        operator, operands = node
+        if operator == 'not':
+            return operator, self._order(operands)
+        operands = [self._order(operand) for operand in self._flatten(operator, operands)]
+        if operator in ('and', 'or'):
+            def _rank(operand) -> float:
+                selectivity, cost = self._estimate(operand)
+                # The probability that evaluating the operand decides the result of the whole chain.
+                decisive = 1.0 - selectivity if operator == 'and' else selectivity
+                return cost / decisive if decisive > 0 else float('inf')
+            operands = sorted(operands, key=_rank)
+        return operator, tuple(operands)
+
+    def _flatten(self, operator: str, operands) -> List:
+        result = []
+        for operand in operands:
+            if isinstance(operand, tuple) and operand[0] == operator:
+                result.extend(self._flatten(operator, operand[1]))
+            else:
+                result.append(operand)
+        return result
+
+    def plan(self,
+             expressions: List[Union[Expression, str, List]],
+             row_count: Optional[int] = None,
+             is_cached: Callable[[Expression], bool] = None,
+             can_push_down: bool = False) -> Plan:
+        """
+        Plans the evaluation of the normalized expressions of a display filter.
+        :param expressions: The normalized list of expressions and logical operators.
+        :param row_count: The number of items, if known.
+        :param is_cached: A function which checks whether the result of an expression is found in the predicate cache.
+                          If no function is given, the bitmap access path is not considered.
+        :param can_push_down: Whether the database can select the candidate items.
+        :return: the plan containing the chosen access path and the reordered expressions.
+        """
+        if row_count is None:
+            row_count = self._statistics.row_count if self._statistics is not None else self._default_row_count
+        if not expressions or not any(isinstance(token, (Expression, list)) for token in expressions):
+            # Constants (e.g. the result of normalizing 'a and not a') do not need to be evaluated at all.
+            return Plan(SCAN, expressions, 1.0 if expressions != [False] else 0.0, 0.0)
+        node = self._order(to_tree(expressions))
+        selectivity, cost = self._estimate(node)
+        access_path, cost = SCAN, cost * row_count
+        if can_push_down:
+            # Evaluating expressions in the database is way cheaper than transferring and evaluating all items.
+            access_path = PUSHDOWN
+        elif is_cached is not None:
+            # The bitmap access path evaluates the expressions not found in the predicate cache on all items, but
+            # makes their results available for subsequent display filters.
+            bitmap_cost = row_count * sum(
+                self.estimate_cost(expression) for expression in iter_expressions(expressions)
+                if not is_cached(expression)
+            )
+            if bitmap_cost <= cost:
+                access_path, cost = BITMAP, bitmap_cost
+        return Plan(access_path, from_tree(node), selectivity, cost)
@@ -0,0 +1,244 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import sys
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from pydfql.exceptions import ParserError, UnknownFieldError
+from pydfql.expressions import map_expressions, to_tree
+from pydfql.models import EqualitySet, Expression
+from pydfql.parsers.normalizer import CONSTANT_FALSE, CONSTANT_TRUE
+
+# The version of the json representation. Plans of other versions are rejected.
+JSON_VERSION = 1
+
+# The logical and comparison operators (as returned by the DisplayFilterParser) which are accepted in json plans.
+_LOGICAL_OPERATORS = frozenset(['and', 'or', '^', 'not'])
+_COMPARISON_OPERATORS = frozenset([None, '==', '!=', '>=', '>', '<=', '<', '~=', '~', 'in', '&'])
+
+
+class DisplayFilterPlan:
+    """
+    A parsed and normalized display filter which can be evaluated by a display filter without parsing it again.
+
+    Functions are referred to by the name they are registered with, so that plans can be pickled (e.g. to send them to
+    worker processes) and converted to json (e.g. to store them or to share them between services). The functions are
+    looked up when the plan is evaluated by a display filter.
+    """
+
+    def __init__(self, expressions: List[Union[Expression, str, List, bool]]):
+        """
+        Initializes the DisplayFilterPlan.
+        :param expressions: The normalized list of expressions and logical operators. The functions of the expressions
+                            need to be specified by name.
+        """
+        self._expressions = expressions
+
+    @classmethod
+    def from_expressions(cls,
+                         expressions: List[Union[Expression, str, List, bool]],
+                         functions: Dict[str, Callable]) -> 'DisplayFilterPlan':
+        """
+        Creates a plan from the normalized output of the DisplayFilterParser.
+        :param functions: The dictionary of functions used in the display filter.
+        :raises ValueError, when an expression uses a function which is not found in the dictionary of functions.
+        """
+        function_names = {id(function): name for name, function in functions.items()}
+
+        def _name(expression: Expression) -> Expression:
+            if expression.function is None:
+                if type(expression) is not Expression:
+                    # Expressions bound to a schema refer to evaluators, they are bound again when the plan is used.
+                    return Expression(expression.field, expression.operator, expression.value, None,
+                                      expression.slicer_specs)
+                return expression
+            if id(expression.function) not in function_names:
+                raise ValueError("The function '{}' is not registered!".format(expression.function))
+            return Expression(
+                expression.field, expression.operator, expression.value, function_names[id(expression.function)],
+                expression.slicer_specs
+            )
+
+        return cls(map_expressions(expressions, _name))
+
+    @property
+    def expressions(self) -> List[Union[Expression, str, List, bool]]:
+        return self._expressions
+
+    def bind(self,
+             functions: Dict[str, Callable],
+             field_names: Optional[List[str]] = None) -> List[Union[Expression, str, List, bool]]:
+        """
+        Returns the expressions of the plan using the given functions, as the DisplayFilterNormalizer would return them.
+        :param functions: The dictionary of functions used to look up the functions by name.
+        :param field_names: The field names which are allowed in the display filter. If no field names are given there
+                            are no restrictions regarding the field names.
+        :raises ParserError, when the plan refers to an unknown function.
+        :raises UnknownFieldError, when the plan refers to an unknown field.
+        """
+        if self._expressions == CONSTANT_FALSE:
+            return CONSTANT_FALSE
+        if self._expressions == CONSTANT_TRUE:
+            return CONSTANT_TRUE
+        field_names = set(field_names) if field_names else None
+
+        def _bind(expression: Expression) -> Expression:
+            if field_names is not None and expression.field not in field_names:
+                raise UnknownFieldError(expression.field)
+            if expression.function is None:
+                return expression
+            if expression.function not in functions:
+                raise ParserError("Unknown function '{}'!".format(expression.function))
+            return Expression(
+                expression.field, expression.operator, expression.value, functions[expression.function],
+                expression.slicer_specs
+            )
+
+        return map_expressions(self._expressions, _bind)
+
+    def to_json(self) -> str:
+        """ Returns the json representation of the plan. """
+        return json.dumps({'version': JSON_VERSION, 'expressions': _encode(self._expressions)})
+
+    @classmethod
+    def from_json(cls, data: str) -> 'DisplayFilterPlan':
+        """
+        Creates a plan from its json representation. Since plans may be received from other services, only known
+        logical operators, comparison operators and slicer specifications are accepted.
+        :raises ValueError, when the json representation is malformed or of an unsupported version.
+        """
+        import dacite
+        try:
+            data = json.loads(data)
+            if data['version'] != JSON_VERSION:
+                raise ValueError('Unsupported version {}!'.format(data['version']))
+            return cls(_decode_plan(data['expressions']))
+        except (KeyError, TypeError, AttributeError, dacite.DaciteError) as err:
+            raise ValueError('Malformed display filter plan!') from err
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DisplayFilterPlan) and self._expressions == other._expressions
+
+    def __repr__(self) -> str:
+        return 'DisplayFilterPlan({!r})'.format(self._expressions)
+
+
+def _is_ip_addresses(value: Any) -> bool:
+    # Lists of ip addresses are created by the parser using ipranger. As long as ipranger was not imported, the value
+    # can not be a list of ip addresses.
+    module = sys.modules.get('ipranger.ipranger')
+    return module is not None and isinstance(value, module.IPAddresses)
+
+
+def _encode_value(value: Any) -> Any:
+    if _is_ip_addresses(value):
+        return {'ip_addresses': asdict(value)}
+    if isinstance(value, EqualitySet):
+        return {'equality_set': [_encode_value(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode_value(item) for item in value]
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if 'ip_addresses' in value:
+            import dacite
+            from ipranger.ipranger import IPAddresses
+            # Parts of ip addresses without ranges are stored as None, although their type is a list.
+            return dacite.from_dict(IPAddresses, value['ip_addresses'], config=dacite.Config(check_types=False))
+        return EqualitySet(_decode_value(item) for item in value['equality_set'])
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    return value
+
+
+def _encode(tokens: List) -> List:
+    result = []
+    for token in tokens:
+        if isinstance(token, list):
+            result.append(_encode(token))
+        elif isinstance(token, Expression):
+            result.append({
+                'field': token.field,
+                'operator': token.operator,
+                'value': _encode_value(token.value),
+                'function': token.function,
+                'slicer_specs': token.slicer_specs
+            })
+        else:
+            result.append(token)
+    return result
+
+
+def _is_index(value: Any) -> bool:
+    return type(value) is int
+
+
+def _is_slicer_spec(spec: Any) -> bool:
+    """ Tests whether a slicer specification is an index or a range of optional indices (e.g. 0 or [None, 2]). """
+    if isinstance(spec, list):
+        return len(spec) == 2 and all(index is None or _is_index(index) for index in spec)
+    return _is_index(spec)
+
+
+def _decode_expression(token: dict) -> Expression:
+    field, operator, function = token['field'], token['operator'], token['function']
+    slicer_specs = token['slicer_specs']
+    if not isinstance(field, str) or operator not in _COMPARISON_OPERATORS or \
+            not (function is None or isinstance(function, str)) or \
+            not (slicer_specs is None or (isinstance(slicer_specs, list) and all(map(_is_slicer_spec, slicer_specs)))):
+        raise ValueError('Malformed display filter plan!')
+    return Expression(field, operator, _decode_value(token['value']), function, slicer_specs)
+
+
+def _decode(tokens: List) -> List:
+    """
+    Decodes the expressions and logical operators of a json plan.
+    :raises ValueError, when a token is neither an expression, a list of tokens nor a logical operator.
+    """
+    if not isinstance(tokens, list):
+        raise ValueError('Malformed display filter plan!')
+    result = []
+    for token in tokens:
+        if isinstance(token, list):
+            result.append(_decode(token))
+        elif isinstance(token, dict):
+            result.append(_decode_expression(token))
+        elif isinstance(token, str) and token in _LOGICAL_OPERATORS:
+            result.append(token)
+        else:
+            raise ValueError('Malformed display filter plan!')
+    return result
+
+
+def _decode_plan(expressions: List) -> List:
+    """
+    Decodes the expressions of a json plan.
+    :raises ValueError, when the expressions and logical operators are malformed.
+    """
+    if expressions in (CONSTANT_FALSE, CONSTANT_TRUE) and isinstance(expressions[0], bool):
+        return list(expressions)
+    expressions = _decode(expressions)
+    if expressions:
+        try:
+            # Logical operators need to be placed between (or in front of) their operands.
+            to_tree(expressions)
+        except ValueError as err:
+            raise ValueError('Malformed display filter plan!') from err
+    return expressions
@@ -0,0 +1,138 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
+from typing import Any, List, Union, TYPE_CHECKING
+
+from pydfql.expressions import iter_expressions, map_expressions
+from pydfql.models import Expression, Parameter
+from pydfql.plans import DisplayFilterPlan
+
+if TYPE_CHECKING:
+    from pydfql.display_filters import BaseDisplayFilter
+
+# Unquoted and quoted values of the form '$name' are placeholders in prepared display filters.
+_PARAMETER = re.compile(r'\$([A-Za-z_][A-Za-z0-9_]*)')
+
+
+def to_parameters(expressions: List[Union[Expression, str, List]]) -> List[Union[Expression, str, List]]:
+    """ Replaces the values of the form '$name' by parameters. """
+
+    def _to_parameter(expression: Expression) -> Expression:
+        match = _PARAMETER.fullmatch(expression.value) if isinstance(expression.value, str) else None
+        if match is None:
+            return expression
+        return Expression(
+            expression.field, expression.operator, Parameter(match.group(1)), expression.function,
+            expression.slicer_specs
+        )
+
+    return map_expressions(expressions, _to_parameter)
+
+
+def get_parameters(expressions: List[Union[Expression, str, List]]) -> List[str]:
+    """ Returns the names of the parameters in the order they appear in the expressions. """
+    return list(dict.fromkeys(
+        expression.value.name for expression in iter_expressions(expressions)
+        if isinstance(expression.value, Parameter)
+    ))
+
+
+def _convert_value(name: str, value: Any) -> str:
+    """ Converts a bound value to the value the parser returns for an unquoted value. """
+    if value is None or isinstance(value, bool) or isinstance(value, (list, tuple, set, frozenset, dict)):
+        raise ValueError("Invalid value '{}' for parameter '{}'!".format(value, name))
+    return str(value)
+
+
+def _convert_list(name: str, values: Any) -> List[Union[float, str]]:
+    """ Converts a bound list to the list the parser returns for a list of numbers or strings. """
+    if not isinstance(values, (list, tuple, set, frozenset)):
+        raise ValueError("Parameter '{}' of the 'in'-operator needs to be a list!".format(name))
+    result = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            result.append(float(value))
+        elif isinstance(value, str):
+            result.append(value)
+        else:
+            raise ValueError("Invalid value '{}' for parameter '{}'!".format(value, name))
+    return result
+
+
+class PreparedDisplayFilter:
+    """
+    A display filter containing placeholders (e.g. 'host == $host and port in $ports'), which is parsed once and
+    executed many times using different values. Since the values are bound to the parsed expressions instead of being
+    formatted into the display filter, they can neither change the display filter nor need to be quoted.
+
+    Values are converted once per execution. Values of the 'in'-operator need to be lists of numbers or strings, other
+    values are compared like unquoted values of the display filter (e.g. 80 like 'port == 80').
+    """
+
+    def __init__(self, display_filter: 'BaseDisplayFilter', plan: DisplayFilterPlan, parameters: List[str]):
+        """
+        Initializes the PreparedDisplayFilter.
+        :param display_filter: The display filter which evaluates the prepared display filter.
+        :param plan: The normalized expressions containing parameters.
+        :param parameters: The names of the parameters. Parameters may be left out by the normalizer (e.g. in
+                           'port == $port and not port == $port'), but still need to be bound.
+        """
+        self._display_filter = display_filter
+        self._plan = plan
+        self._parameters = list(parameters)
+
+    @property
+    def parameters(self) -> List[str]:
+        """ Returns the names of the parameters in the order they appear in the display filter. """
+        return list(self._parameters)
+
+    def bind(self, **values: Any) -> DisplayFilterPlan:
+        """
+        Binds the values to the parameters. The plan can be passed to the filter method of the display filter.
+        :raises ValueError, when a value is missing, unknown or of an invalid type.
+        """
+        for name in values:
+            if name not in self._parameters:
+                raise ValueError("Unknown parameter '{}'!".format(name))
+        for name in self._parameters:
+            if name not in values:
+                raise ValueError("Missing value for parameter '{}'!".format(name))
+        converted = {}
+
+        def _bind(expression: Expression) -> Expression:
+            if not isinstance(expression.value, Parameter):
+                return expression
+            name, is_list = expression.value.name, expression.operator == 'in'
+            key = (name, is_list)
+            if key not in converted:
+                converted[key] = _convert_list(name, values[name]) if is_list else _convert_value(name, values[name])
+            return Expression(
+                expression.field, expression.operator, converted[key], expression.function, expression.slicer_specs
+            )
+
+        return DisplayFilterPlan(map_expressions(self._plan.expressions, _bind))
+
+    def filter(self, **values: Any):
+        """
+        Filters the data of the display filter using the values of the parameters.
+        :raises ValueError, when a value is missing, unknown or of an invalid type.
+        :raises ParserError, when a value does not match the type declared in the schema of the display filter.
+        """
+        return self._display_filter.filter(self.bind(**values))
+
+    def __repr__(self) -> str:
+        return 'PreparedDisplayFilter({!r})'.format(self._plan.expressions)
@@ -0,0 +1,165 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from pydfql.evaluators.common import AbstractEvaluator, DateEvaluator, IntegerEvaluator, IPv4AddressEvaluator, \
+    IPv6AddressEvaluator, MACAddressEvaluator, MembershipEvaluator, NumberEvaluator, StringEvaluator, \
+    VersionStringEvaluator
+from pydfql.exceptions import ParserError
+from pydfql.expressions import map_expressions
+from pydfql.models import Expression, Parameter, TypedExpression
+
+# The types of fields which can be declared in a schema.
+NUMBER = 'number'
+STRING = 'string'
+DATE = 'date'
+IPV4 = 'ipv4'
+IPV6 = 'ipv6'
+MAC = 'mac'
+VERSION = 'version'
+
+# The evaluator used to convert and compare the values of each type.
+_EVALUATORS = {
+    NUMBER: NumberEvaluator,
+    STRING: StringEvaluator,
+    DATE: DateEvaluator,
+    IPV4: IPv4AddressEvaluator,
+    IPV6: IPv6AddressEvaluator,
+    MAC: MACAddressEvaluator,
+    VERSION: VersionStringEvaluator,
+}
+
+# The comparison of a converted expression value and a converted item value for each operator.
+_CALLBACKS = {
+    '==': lambda expression_value, item_value: item_value == expression_value,
+    '!=': lambda expression_value, item_value: item_value != expression_value,
+    '>=': lambda expression_value, item_value: item_value >= expression_value,
+    '>': lambda expression_value, item_value: item_value > expression_value,
+    '<=': lambda expression_value, item_value: item_value <= expression_value,
+    '<': lambda expression_value, item_value: item_value < expression_value,
+    '~': lambda expression_value, item_value: expression_value.search(item_value) is not None,
+    '~=': lambda expression_value, item_value: expression_value in item_value,
+    '&': lambda expression_value, item_value: (item_value & expression_value) > 0,
+}
+
+# The operators supported by each type. Strings are not ordered, and only strings are matched by regular expressions.
+_ORDERED_OPERATORS = ('==', '!=', '>=', '>', '<=', '<', 'in')
+_OPERATORS = {
+    NUMBER: _ORDERED_OPERATORS + ('&',),
+    STRING: ('==', '!=', '~', '~=', 'in'),
+    DATE: _ORDERED_OPERATORS,
+    IPV4: _ORDERED_OPERATORS,
+    IPV6: _ORDERED_OPERATORS,
+    MAC: _ORDERED_OPERATORS,
+    VERSION: _ORDERED_OPERATORS,
+}
+
+
+class Schema:
+    """
+    Declares the types of fields (e.g. {'port': NUMBER, 'ip': IPV4}). Without a schema the type of an item value is not
+    known, hence the evaluator tries several types (e.g. IPv4 addresses, dates, numbers and strings) for each item
+    value. Expressions on declared fields are instead bound to a single evaluator when the display filter is parsed,
+    their values are converted once and comparisons which can not match any item value are rejected.
+
+    Expressions using functions or slicers are not bound, since they change the type of the item value.
+    """
+
+    def __init__(self, fields: Dict[str, str]):
+        """
+        Initializes the Schema.
+        :param fields: A dictionary of field names and their types.
+        :raises ValueError, when a type is not known.
+        """
+        for field, field_type in fields.items():
+            if field_type not in _EVALUATORS:
+                raise ValueError("Unknown type '{}' of field '{}'!".format(field_type, field))
+        self._fields = dict(fields)
+        # The evaluators are shared by all expressions, since they do not keep any state while evaluating.
+        self._evaluators = {
+            (field_type, operator): self._create_evaluator(field_type, operator)
+            for field_type in set(self._fields.values()) for operator in _OPERATORS[field_type]
+        }
+
+    def _create_evaluator(self, field_type: str, operator: str) -> AbstractEvaluator:
+        if operator == 'in':
+            return MembershipEvaluator(_EVALUATORS[field_type](_CALLBACKS['==']))
+        if operator == '&':
+            return IntegerEvaluator(_CALLBACKS[operator])
+        return _EVALUATORS[field_type](_CALLBACKS[operator])
+
+    @property
+    def fields(self) -> Dict[str, str]:
+        return dict(self._fields)
+
+    def field_type(self, field: str) -> Optional[str]:
+        """ Returns the type of the field, or None if the type of the field is not declared. """
+        return self._fields.get(field)
+
+    def _convert(self, expression: Expression, evaluator: AbstractEvaluator) -> Any:
+        """
+        Converts the value of the expression using the evaluator the expression is bound to.
+        :raises ParserError, when the value can not be converted.
+        """
+        field_type = self._fields[expression.field]
+        try:
+            value = evaluator.convert_expression_value(expression.value)
+            if isinstance(value, bool):
+                # The evaluator accepts the value but never matches any item value (e.g. dates containing dots).
+                raise ValueError(expression.value)
+            if expression.operator == '~':
+                value = re.compile(value)
+        except Exception:
+            raise ParserError("Invalid value '{}' for field '{}' of type '{}'!".format(
+                expression.value, expression.field, field_type
+            ))
+        return value
+
+    def bind_expression(self, expression: Expression) -> Expression:
+        """
+        Binds the expression to the evaluator of the type of its field. Expressions on fields whose type is not declared
+        are returned as they are.
+        :raises ParserError, when the type of the field does not support the operator or the value.
+        """
+        field_type = self._fields.get(expression.field)
+        if field_type is None or not expression.operator or expression.function or expression.slicer_specs:
+            return expression
+        evaluator = self._evaluators.get((field_type, expression.operator))
+        if evaluator is None:
+            raise ParserError("The operator '{}' is not supported by field '{}' of type '{}'!".format(
+                expression.operator, expression.field, field_type
+            ))
+        if isinstance(expression.value, Parameter):
+            # The value of a prepared display filter is converted when it is bound.
+            return expression
+        return TypedExpression(
+            expression.field, expression.operator, expression.value, expression.function, expression.slicer_specs,
+            field_type, self._convert(expression, evaluator), evaluator
+        )
+
+    def bind(self, expressions: List[Union[Expression, str, List, bool]]) -> List[Union[Expression, str, List, bool]]:
+        """
+        Binds the expressions on declared fields to the evaluators of their types.
+        :param expressions: The normalized list of expressions and logical operators.
+        :raises ParserError, when an expression can not match any item value.
+        """
+        if not any(isinstance(token, (Expression, list)) for token in expressions):
+            # Constants (e.g. CONSTANT_FALSE) are compared by identity, hence they are returned as they are.
+            return expressions
+        return map_expressions(expressions, self.bind_expression)
+
@@ -14,12 +14,40 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-import ipaddress
-from typing import Any, List
-
-import pyparsing as pp
+import sys
+import threading
+from typing import Any, List, TYPE_CHECKING
 
+from pydfql import parallel
 from pydfql.exceptions import ProgrammingError
+from pydfql.parsers import common as pc
+
+if TYPE_CHECKING:
+    import pyparsing as pp
+
+# The grammars of mac, ipv4 and ipv6 addresses, which are prepared when first used.
+_grammars = None
+_grammars_lock = threading.Lock()
+parallel.reinit_after_fork(sys.modules[__name__], '_grammars_lock', threading.Lock)
+
+
+def _get_grammar(name: str) -> 'pp.ParserElement':
+    """ Returns the grammar of mac ('mac'), ipv4 ('ipv4') or ipv6 ('ipv6') addresses. """
+    global _grammars
+    if _grammars is None:
+        with _grammars_lock:
+            if _grammars is None:
+                import pyparsing as pp
+                grammars = {
+                    'mac': pp.common.mac_address,
+                    'ipv4': pp.common.ipv4_address,
+                    'ipv6': pp.common.ipv6_address,
+                }
+                # Prepare the shared grammars for parsing, so that they are not modified when used by multiple threads.
+                for grammar in grammars.values():
+                    pc.warm_up(grammar)
+                _grammars = grammars
+    return _grammars[name]
 
 
 class BasicSlicer:
@@ -119,7 +147,7 @@ class MacSlicer(BasicSlicer):
     def is_type(value) -> bool:
         """ Checks whether the given value is a mac address. """
         try:
-            pp.common.mac_address.parseString(value, parse_all=True)
+            _get_grammar('mac').parseString(value, parse_all=True)
             return True
         except:
             return False
@@ -139,13 +167,14 @@ class IPv4Slicer(BasicSlicer):
     """
 
     def __init__(self, specs, value):
+        import ipaddress
         super().__init__(specs, ipaddress.IPv4Address(value).exploded, '.')
 
     @staticmethod
     def is_type(value) -> bool:
         """ Checks whether the given value is an ipv4 address. """
         try:
-            pp.common.ipv4_address.parseString(value, parse_all=True)
+            _get_grammar('ipv4').parseString(value, parse_all=True)
             return True
         except:
             return False
@@ -164,13 +193,14 @@ class IPv6Slicer(BasicSlicer):
     """
 
     def __init__(self, specs, value):
+        import ipaddress
         super().__init__(specs, ipaddress.IPv6Address(value).exploded, ':')
 
     @staticmethod
     def is_type(value) -> bool:
         """ Checks whether the value is an ipv6 address. """
         try:
-            pp.common.ipv6_address.parseString(value, parse_all=True)
+            _get_grammar('ipv6').parseString(value, parse_all=True)
             return True
         except:
             return False
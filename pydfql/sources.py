@@ -0,0 +1,170 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import csv
+import json
+import xml.etree.ElementTree as ElementTree
+from typing import BinaryIO, Iterator, Optional, TextIO, Union
+
+# The names of the supported formats.
+CSV = 'csv'
+JSON = 'json'
+JSON_LINES = 'jsonl'
+NMAP_XML = 'nmap'
+
+_EXTENSIONS = {
+    '.csv': CSV,
+    '.json': JSON,
+    '.jsonl': JSON_LINES,
+    '.ndjson': JSON_LINES,
+    '.xml': NMAP_XML,
+}
+
+
+def detect_format(file_name: Optional[str] = None, head: bytes = b'') -> str:
+    """
+    Detects the format of a file by its extension or, if the extension is not known, by its first bytes.
+    :param file_name: The name of the file, if any.
+    :param head: The first bytes of the file.
+    :return: the name of the format.
+    """
+    if file_name:
+        for extension, format in _EXTENSIONS.items():
+            if file_name.lower().endswith(extension):
+                return format
+    head = head.lstrip(b'\xef\xbb\xbf').lstrip()
+    if head.startswith(b'<'):
+        return NMAP_XML
+    if head.startswith(b'['):
+        return JSON
+    if head.startswith(b'{'):
+        # A document containing a single object is read the same way as JSON lines.
+        return JSON_LINES
+    return CSV
+
+
+def iter_csv(file: TextIO, delimiter: str = ',') -> Iterator[dict]:
+    """ Returns the rows of a csv file as dictionaries. The first row contains the field names. """
+    reader = csv.reader(file, delimiter=delimiter)
+    field_names = next(reader, None)
+    if field_names is None:
+        return
+    for row in reader:
+        yield dict(zip(field_names, row))
+
+
+def iter_json(file: TextIO, chunk_size: int = 65536) -> Iterator[dict]:
+    """
+    Returns the objects of a json file. When the file contains an array, its elements are decoded one by one while
+    the file is read, so that the array is never kept in memory as a whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip('\ufeff').lstrip()
+    if not buffer:
+        return
+    if not buffer.startswith('['):
+        # The file contains a single value which needs to be decoded as a whole.
+        value = json.loads(buffer + file.read())
+        yield from value if isinstance(value, list) else [value]
+        return
+    position = 1
+    while True:
+        # Skip the separators between the elements of the array.
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer):
+                break
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ValueError('Unexpected end of json array!')
+            buffer, position = chunk, 0
+        if buffer[position] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The element is not read completely yet.
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        separator = end
+        while separator < len(buffer) and buffer[separator] in ' \t\r\n':
+            separator += 1
+        if separator == len(buffer) or buffer[separator] not in ',]':
+            # The element may continue in the next chunk (e.g. the number '1.5' split into '1' and '.5').
+            chunk = file.read(chunk_size)
+            if chunk:
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+        yield value
+        position = end
+
+
+def iter_json_lines(file: TextIO) -> Iterator[dict]:
+    """ Returns the objects of a file containing one json object per line. """
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _get_service_name(service: Optional[ElementTree.Element]) -> str:
+    """ Returns the banner of a service (e.g. 'product: OpenSSH version: 4.3') or its name, if there is no banner. """
+    if service is None:
+        return ''
+    attributes = service.attrib
+    banner = ''
+    if attributes.get('method') == 'probed':
+        relevant = ['product', 'version', 'extrainfo']
+        not_relevant = ['name', 'method', 'conf', 'cpelist', 'servicefp', 'tunnel']
+        for key in relevant:
+            if key in attributes:
+                banner += '{0}: {1} '.format(key, attributes[key])
+        for key, value in attributes.items():
+            if key not in not_relevant and key not in relevant:
+                banner += '{0}: {1} '.format(key, value)
+    return banner.rstrip() or attributes.get('name', '')
+
+
+def iter_nmap_xml(file: Union[str, BinaryIO]) -> Iterator[dict]:
+    """
+    Returns the ports of the hosts found in a nmap xml file as dictionaries containing the host, port, protocol, status
+    and service. The file is parsed incrementally and each host is discarded after its ports were returned, so that
+    memory does not grow with the size of the scan.
+    :param file: The name of the file or a binary file object.
+    """
+    root = None
+    for event, element in ElementTree.iterparse(file, events=('start', 'end')):
+        if root is None:
+            root = element
+        if event != 'end' or element.tag != 'host':
+            continue
+        addresses = {address.get('addrtype'): address.get('addr') for address in element.iter('address')}
+        host = addresses.get('ipv4') or addresses.get('ipv6') or ''
+        for port in element.iterfind('ports/port'):
+            state = port.find('state')
+            yield {
+                'host': host,
+                'port': port.get('portid', ''),
+                'protocol': port.get('protocol', ''),
+                'status': state.get('state', '') if state is not None else '',
+                'service': _get_service_name(port.find('service'))
+            }
+        # Discard the hosts parsed so far, since the root element keeps references to all of them.
+        element.clear()
+        root.clear()
@@ -0,0 +1,375 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import bisect
+import datetime
+import math
+import random
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from pydfql import parallel
+from pydfql.evaluators.common import default_date_parser
+from pydfql.stores import DataStoreListener
+
+_NUMBER_PATTERN = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+_IPV4_PATTERN = re.compile(r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$')
+_MAC_PATTERN = re.compile(r'^[0-9a-fA-F]{2}([:-][0-9a-fA-F]{2}){5}$')
+_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?')
+
+# Value types for which histograms are built, since they have a natural order.
+ORDERED_TYPES = ('number', 'date', 'ipv4', 'ipv6')
+
+
+def detect_type(value: Any) -> Optional[str]:
+    """
+    Detects the type of a value using cheap checks only. Returns one of 'boolean', 'number', 'date', 'ipv4', 'ipv6',
+    'mac', 'string', 'list' or 'dict', or None when the value is null (None or an empty string, list or dictionary).
+    """
+    import ipaddress
+    if value is None or value == '' or value == [] or value == {}:
+        return None
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return 'date'
+    if isinstance(value, ipaddress.IPv4Address):
+        return 'ipv4'
+    if isinstance(value, ipaddress.IPv6Address):
+        return 'ipv6'
+    if isinstance(value, (list, tuple)):
+        return 'list'
+    if isinstance(value, dict):
+        return 'dict'
+    value = str(value)
+    if _NUMBER_PATTERN.match(value):
+        return 'number'
+    if _IPV4_PATTERN.match(value):
+        return 'ipv4'
+    if _MAC_PATTERN.match(value):
+        return 'mac'
+    if ':' in value:
+        try:
+            ipaddress.IPv6Address(value)
+            return 'ipv6'
+        except ValueError:
+            pass
+    if _DATE_PATTERN.match(value):
+        return 'date'
+    return 'string'
+
+
+def to_ordered_value(value_type: str, value: Any) -> Optional[float]:
+    """
+    Converts a value of one of the ordered types into a number which preserves the order of the values.
+    Returns None when the value can not be converted.
+    """
+    import ipaddress
+    try:
+        if value_type == 'number':
+            return float(value)
+        if value_type == 'date':
+            if not isinstance(value, datetime.datetime):
+                value = value if isinstance(value, datetime.date) else default_date_parser.parse(str(value))
+            if not isinstance(value, datetime.datetime):
+                value = datetime.datetime(value.year, value.month, value.day)
+            return value.replace(tzinfo=None).timestamp()
+        if value_type == 'ipv4':
+            return float(int(ipaddress.IPv4Address(value)))
+        if value_type == 'ipv6':
+            return float(int(ipaddress.IPv6Address(value)))
+    except Exception:
+        pass
+    return None
+
+
+def _hash64(value: Any) -> int:
+    """ Returns a well distributed 64 bit hash of a value (using the finalizer of splitmix64). """
+    try:
+        h = hash(value)
+    except TypeError:
+        h = hash(repr(value))
+    h = (h ^ (h >> 30)) * 0xbf58476d1ce4e5b9 & 0xffffffffffffffff
+    h = (h ^ (h >> 27)) * 0x94d049bb133111eb & 0xffffffffffffffff
+    return h ^ (h >> 31)
+
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct values using a fixed amount of memory (2 ** precision bytes). The standard error
+    of the estimate is about 1.04 / sqrt(2 ** precision). Note that values can not be removed.
+    """
+
+    def __init__(self, precision: int = 10):
+        """
+        Initializes the HyperLogLog.
+        :param precision: The number of bits used to select a register. Needs to be between 4 and 16.
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("The precision needs to be between 4 and 16.")
+        self._precision = precision
+        self._registers = bytearray(1 << precision)
+
+    def add(self, value: Any):
+        """ Adds a value. """
+        h = _hash64(value)
+        index = h >> (64 - self._precision)
+        # The rank is the position of the leftmost 1-bit in the remaining bits.
+        remaining = (h << self._precision) & 0xffffffffffffffff
+        rank = 64 - self._precision + 1 if remaining == 0 else 64 - remaining.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self) -> int:
+        """ Returns the estimated number of distinct values. """
+        m = len(self._registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction using linear counting.
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class EquiDepthHistogram:
+    """
+    A histogram whose buckets contain about the same number of values. The bucket boundaries are stored as sorted
+    list of numbers (see to_ordered_value).
+    """
+
+    def __init__(self, boundaries: List[float]):
+        """
+        Initializes the EquiDepthHistogram.
+        :param boundaries: The sorted bucket boundaries including the minimum and the maximum value.
+        """
+        self._boundaries = boundaries
+
+    @classmethod
+    def build(cls, values: Iterable[float], buckets: int = 16) -> 'EquiDepthHistogram':
+        """ Builds a histogram with the given number of buckets from a list of values. """
+        values = sorted(values)
+        if not values:
+            return cls([])
+        buckets = max(1, min(buckets, len(values)))
+        boundaries = [values[(len(values) - 1) * i // buckets] for i in range(buckets)] + [values[-1]]
+        return cls(boundaries)
+
+    @property
+    def boundaries(self) -> List[float]:
+        return self._boundaries
+
+    def fraction_less_than(self, value: float) -> float:
+        """ Returns the estimated fraction of values which are less than the given value. """
+        boundaries = self._boundaries
+        if not boundaries or value <= boundaries[0]:
+            return 0.0
+        if value > boundaries[-1]:
+            return 1.0
+        buckets = len(boundaries) - 1
+        if buckets == 0:
+            return 0.0
+        index = bisect.bisect_left(boundaries, value) - 1
+        low, high = boundaries[index], boundaries[index + 1]
+        # Assume the values are uniformly distributed within a bucket.
+        within = (value - low) / (high - low) if high > low else 0.0
+        return min(1.0, (index + within) / buckets)
+
+
+class FieldStatistics:
+    """ Statistics about the values of a single field. """
+
+    def __init__(self, sample_size: int, random_generator: random.Random):
+        self.count = 0  # The number of rows having a non-null value.
+        self.types = Counter()
+        self.distinct = HyperLogLog()
+        self._sample = []
+        self._sample_size = sample_size
+        self._seen = 0
+        self._random = random_generator
+        self._histogram = None
+
+    @property
+    def value_type(self) -> Optional[str]:
+        """ Returns the most common type of the values, or None if there are no values. """
+        most_common = self.types.most_common(1)
+        return most_common[0][0] if most_common else None
+
+    def add(self, value: Any):
+        value_type = detect_type(value)
+        if value_type is None:
+            return
+        self.count += 1
+        self.types[value_type] += 1
+        self.distinct.add(value if value_type not in ('list', 'dict') else repr(value))
+        if value_type in ORDERED_TYPES:
+            # Keep a uniform sample of the values using reservoir sampling.
+            self._seen += 1
+            if len(self._sample) < self._sample_size:
+                self._sample.append(value)
+                self._histogram = None
+            else:
+                position = self._random.randrange(self._seen)
+                if position < self._sample_size:
+                    self._sample[position] = value
+                    self._histogram = None
+
+    def remove(self, value: Any):
+        value_type = detect_type(value)
+        if value_type is None:
+            return
+        self.count -= 1
+        self.types[value_type] -= 1
+        if self.types[value_type] <= 0:
+            del self.types[value_type]
+        # Distinct counts can not be decremented, hence they are upper bounds once values were removed.
+        if value_type in ORDERED_TYPES:
+            self._seen = max(0, self._seen - 1)
+            try:
+                self._sample.remove(value)
+                self._histogram = None
+            except ValueError:
+                pass
+
+    def histogram(self, buckets: int = 16) -> Optional[EquiDepthHistogram]:
+        """ Returns an equi-depth histogram of the values if the field is of an ordered type, otherwise None. """
+        value_type = self.value_type
+        if value_type not in ORDERED_TYPES:
+            return None
+        if self._histogram is None:
+            values = (to_ordered_value(value_type, value) for value in self._sample)
+            self._histogram = EquiDepthHistogram.build([value for value in values if value is not None], buckets)
+        return self._histogram
+
+
+class StatisticsCollector(DataStoreListener):
+    """
+    Collects statistics about the fields of a list of items: the number of rows, the null rate, the detected value
+    type, an estimate of the number of distinct values and equi-depth histograms for numeric, date and IP fields.
+
+    The collector can be registered as listener of a data store to keep the statistics up to date incrementally.
+    Histograms are built from a uniform sample of the values and rebuilt lazily when the sample changed. The statistics
+    can be updated and read by multiple threads.
+    """
+
+    def __init__(self,
+                 get_record: Callable[[Any], Dict] = None,
+                 sample_size: int = 1024,
+                 seed: int = 0):
+        """
+        Initializes the StatisticsCollector.
+        :param get_record: A function which returns the dictionary of field names and values of an item. Nested
+                           dictionaries are flattened using the dot-notation (e.g. 'a.b'). Items are expected to be
+                           dictionaries per default.
+        :param sample_size: The number of values per field which are used to build histograms.
+        :param seed: The seed of the random number generator used for sampling.
+        """
+        self._get_record = get_record if get_record is not None else (lambda item: item)
+        self._sample_size = sample_size
+        self._random = random.Random(seed)
+        self._fields = {}
+        self._row_count = 0
+        self._lock = threading.RLock()
+        parallel.reinit_after_fork(self, '_lock', threading.RLock)
+
+    def _iter_fields(self, record: Dict, prefix: str = ''):
+        for key, value in record.items():
+            name = prefix + str(key)
+            if isinstance(value, dict) and value:
+                yield from self._iter_fields(value, name + '.')
+            else:
+                yield name, value
+
+    def _add(self, item: Any):
+        with self._lock:
+            self._row_count += 1
+            for name, value in self._iter_fields(self._get_record(item)):
+                field_statistics = self._fields.get(name)
+                if field_statistics is None:
+                    field_statistics = self._fields[name] = FieldStatistics(self._sample_size, self._random)
+                field_statistics.add(value)
+
+    def _remove(self, item: Any):
+        with self._lock:
+            self._row_count -= 1
+            for name, value in self._iter_fields(self._get_record(item)):
+                field_statistics = self._fields.get(name)
+                if field_statistics is not None:
+                    field_statistics.remove(value)
+
+    def collect(self, items: Iterable) -> 'StatisticsCollector':
+        """ Adds the statistics of the given items. """
+        for item in items:
+            self._add(item)
+        return self
+
+    def on_insert(self, position: int, item: Any):
+        self._add(item)
+
+    def on_update(self, position: int, old_item: Any, new_item: Any):
+        self._remove(old_item)
+        self._add(new_item)
+
+    def on_remove(self, position: int, item: Any):
+        self._remove(item)
+
+    @property
+    def row_count(self) -> int:
+        return self._row_count
+
+    @property
+    def field_names(self) -> List[str]:
+        with self._lock:
+            return list(self._fields)
+
+    def get(self, field_name: str) -> Optional[FieldStatistics]:
+        """ Returns the statistics of a field, or None if the field was not seen yet. """
+        with self._lock:
+            return self._fields.get(field_name)
+
+    def null_rate(self, field_name: str) -> float:
+        """ Returns the fraction of rows in which the field is missing or null. """
+        with self._lock:
+            if not self._row_count:
+                return 0.0
+            field_statistics = self._fields.get(field_name)
+            count = field_statistics.count if field_statistics is not None else 0
+            return max(0.0, 1.0 - count / self._row_count)
+
+    def value_type(self, field_name: str) -> Optional[str]:
+        """ Returns the most common type of the values of the field. """
+        with self._lock:
+            field_statistics = self._fields.get(field_name)
+            return field_statistics.value_type if field_statistics is not None else None
+
+    def distinct_count(self, field_name: str) -> int:
+        """ Returns the estimated number of distinct values of the field. """
+        with self._lock:
+            field_statistics = self._fields.get(field_name)
+            if field_statistics is None:
+                return 0
+            # The estimate can not exceed the number of values.
+            return min(field_statistics.distinct.count(), field_statistics.count) if field_statistics.count else 0
+
+    def histogram(self, field_name: str) -> Optional[EquiDepthHistogram]:
+        """ Returns an equi-depth histogram of the values of the field, or None if the field is not ordered. """
+        with self._lock:
+            field_statistics = self._fields.get(field_name)
+            return field_statistics.histogram() if field_statistics is not None else None
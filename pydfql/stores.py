@@ -0,0 +1,148 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import threading
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from pydfql import parallel
+
+
+class DataStoreListener:
+    """
+    Receives notifications about changes of a data store. This class is meant as base class for indexes, statistics
+    and caches which are attached to a data store and need to be kept in sync with it. Each notification only covers
+    the rows which actually changed, so derived state can be maintained incrementally.
+    """
+
+    def on_insert(self, position: int, item: Any):
+        """ Called after an item was inserted at the given position. """
+        pass
+
+    def on_update(self, position: int, old_item: Any, new_item: Any):
+        """ Called after the item at the given position was replaced. """
+        pass
+
+    def on_remove(self, position: int, item: Any):
+        """ Called after the item at the given position was removed. Items behind the position moved up by one. """
+        pass
+
+
+class DataStore:
+    """
+    A list based data store which keeps track of changes using a data version counter.
+
+    The data version is incremented on every modification made through the data store. Components which derive
+    state from the data (e.g. caches) can compare data versions to detect changes, while components which need to be
+    kept in sync (e.g. statistics) can register a DataStoreListener.
+
+    Modifications are serialized, so the data store can be modified by multiple threads. Listeners are notified by the
+    modifying thread while holding the lock of the data store. Snapshots are not copied, instead the list of items is
+    copied by the first modification after a snapshot was taken (copy-on-write).
+    """
+
+    def __init__(self, data: List = None):
+        """
+        Initializes the DataStore.
+        :param data: The items. The items are copied into a list owned by the data store, since changes which are not
+                     made through the data store would not increment the data version.
+        """
+        self._data = list(data) if data is not None else []
+        self._version = 0
+        # Whether the list of items was returned by snapshot, hence it needs to be copied before it is modified.
+        self._shared = False
+        self._listeners = []
+        self._lock = threading.RLock()
+        parallel.reinit_after_fork(self, '_lock', threading.RLock)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+
+    def __getitem__(self, position: int) -> Any:
+        return self._data[position]
+
+    @property
+    def version(self) -> int:
+        """ Returns the data version which is incremented on every modification. """
+        return self._version
+
+    def snapshot(self) -> Tuple[int, List]:
+        """
+        Returns the data version and the list of items. The list is not affected by subsequent modifications, so it can
+        be evaluated while other threads modify the data store. Note that the list must not be modified.
+        """
+        with self._lock:
+            self._shared = True
+            return self._version, self._data
+
+    def _get_modifiable_data(self) -> List:
+        """ Returns the list of items, which is copied first if it is shared with a snapshot. """
+        if self._shared:
+            self._data = list(self._data)
+            self._shared = False
+        return self._data
+
+    def add_listener(self, listener: DataStoreListener):
+        """ Registers a listener which is notified about any changes of the data store. """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: DataStoreListener):
+        """ Unregisters a previously registered listener. """
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def append(self, item: Any):
+        """ Appends an item to the data store. """
+        self.extend([item])
+
+    def extend(self, items: Iterable):
+        """ Appends a list of items to the data store. The data version is incremented only once. """
+        with self._lock:
+            position = len(self._data)
+            self._get_modifiable_data().extend(items)
+            self._version += 1
+            for position, item in enumerate(self._data[position:], start=position):
+                for listener in self._listeners:
+                    listener.on_insert(position, item)
+
+    def remove(self, item: Any):
+        """
+        Removes the first occurrence of the item from the data store.
+        :raises ValueError, when the item is not present.
+        """
+        with self._lock:
+            position = self._data.index(item)
+            item = self._get_modifiable_data().pop(position)
+            self._version += 1
+            for listener in self._listeners:
+                listener.on_remove(position, item)
+
+    def update(self, position: int, item: Any):
+        """
+        Replaces the item at the given position.
+        :raises IndexError, when the position is out of range.
+        """
+        with self._lock:
+            # Normalize negative positions so that listeners always receive the actual position.
+            position = range(len(self._data))[position]
+            old_item = self._data[position]
+            self._get_modifiable_data()[position] = item
+            self._version += 1
+            for listener in self._listeners:
+                listener.on_update(position, old_item, item)
@@ -35,9 +35,13 @@ setup(
         'test': [
             'pytest==7.3.1',
             'pytest-cov==4.0.0',
-            'pexpect==4.8.0',
-            'python-libnmap==0.7.0'
+            'pexpect==4.8.0'
         ]
     },
     include_package_data=True,
+    entry_points={
+        'console_scripts': [
+            'pydfql=pydfql.cli:main'
+        ]
+    },
 )
@@ -0,0 +1,126 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import asyncio
+import sqlite3
+import unittest
+
+from pydfql.display_filters import AsyncDisplayFilter, DictDisplayFilter, SQLDisplayFilter
+from pydfql.exceptions import ParserError
+from pydfql.planner import CostBasedPlanner
+
+
+async def to_async_iterable(items):
+    for item in items:
+        yield item
+
+
+async def collect(async_iterator):
+    return [item async for item in async_iterator]
+
+
+class TestAsyncDisplayFilter(unittest.IsolatedAsyncioTestCase):
+    data = [
+        {'name': 'Morpheus', 'age': 38, 'gender': 'male', 'killed': False, 'power': None},
+        {'name': 'Neo', 'age': 35, 'gender': 'male', 'killed': False, 'power': 'flight'},
+        {'name': 'Cipher', 'age': 48, 'gender': 'male', 'killed': True, 'power': None},
+        {'name': 'Trinity', 'age': 32, 'gender': 'female', 'killed': False, 'power': None}
+    ]
+
+    async def test_filter_async_iterable(self):
+        for display_filter in [
+            '', 'name == Neo', 'age > 33 and gender == male', 'power', 'not killed == True',
+            'name == Neo and not name == Neo', 'name == Neo or not name == Neo'
+        ]:
+            with self.subTest(display_filter=display_filter):
+                expected = list(DictDisplayFilter(self.data).filter(display_filter))
+                self.assertEqual(expected, await collect(AsyncDisplayFilter(self.data).filter(display_filter)))
+                async_display_filter = AsyncDisplayFilter(lambda: to_async_iterable(self.data))
+                self.assertEqual(expected, await collect(async_display_filter.filter(display_filter)))
+                async_display_filter.planner = CostBasedPlanner()
+                self.assertEqual(expected, await collect(async_display_filter.filter(display_filter)))
+
+    async def test_async_iterator_can_only_be_consumed_once(self):
+        display_filter = AsyncDisplayFilter(to_async_iterable(self.data))
+        self.assertEqual(1, len(await collect(display_filter.filter('name == Neo'))))
+        with self.assertRaises(ValueError):
+            await collect(display_filter.filter('name == Neo'))
+
+    async def test_filter_yields_control_to_event_loop(self):
+        ticks = 0
+
+        async def _tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.ensure_future(_tick())
+        await asyncio.sleep(0)
+        ticks = 0
+        display_filter = AsyncDisplayFilter([{'value': i} for i in range(1000)], batch_size=10)
+        result = await collect(display_filter.filter('value > 10'))
+        ticker.cancel()
+        self.assertEqual(989, len(result))
+        self.assertGreaterEqual(ticks, 90)
+
+    async def test_invalid_display_filter_raises_parser_error(self):
+        with self.assertRaises(ParserError):
+            await collect(AsyncDisplayFilter(self.data).filter('name =='))
+
+
+class TestAsyncSQLDisplayFilter(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.connection.execute('CREATE TABLE data (name text, age integer)')
+        self.connection.executemany(
+            'INSERT INTO data VALUES (?, ?)', [('name{}'.format(i), i) for i in range(250)]
+        )
+
+    def tearDown(self):
+        self.connection.close()
+
+    async def test_afilter(self):
+        for display_filter, no_items in [
+            ('', 250), ('age < 100', 100), ('name == name7 or age >= 240', 11), ('age < 0', 0),
+            ('age < 1 and not age < 1', 0)
+        ]:
+            with self.subTest(display_filter=display_filter):
+                sql_display_filter = SQLDisplayFilter(self.connection, 'data')
+                expected = list(sql_display_filter.filter(display_filter))
+                self.assertEqual(no_items, len(expected))
+                self.assertEqual(expected, await collect(sql_display_filter.afilter(display_filter, batch_size=32)))
+                sql_display_filter.planner = CostBasedPlanner()
+                self.assertEqual(expected, await collect(sql_display_filter.afilter(display_filter, batch_size=32)))
+
+    async def test_afilter_fetches_rows_in_batches(self):
+        fetched = []
+        sql_display_filter = SQLDisplayFilter(self.connection, 'data')
+        fetch_matching_rows = sql_display_filter._fetch_matching_rows
+
+        def _fetch_matching_rows(cursor, batch_size, matches):
+            count, items = fetch_matching_rows(cursor, batch_size, matches)
+            fetched.append(count)
+            return count, items
+
+        sql_display_filter._fetch_matching_rows = _fetch_matching_rows
+        self.assertEqual(250, len(await collect(sql_display_filter.afilter('age >= 0', batch_size=100))))
+        self.assertEqual([100, 100, 50], fetched)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,271 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import sqlite3
+import unittest
+
+from parameterized import parameterized
+
+from pydfql.caches import ConversionCache, LRUCache, PredicateCache, ResultCache
+from pydfql.display_filters import DictDisplayFilter, SQLDisplayFilter
+from pydfql.evaluators import DefaultEvaluator
+from pydfql.exceptions import EvaluationError
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(1, cache.statistics.evictions)
+
+    def test_memory_bound_evicts_entries(self):
+        cache = LRUCache(max_entries=10, max_memory=10, sizeof=lambda value: value)
+        cache.put('a', 4)
+        cache.put('b', 4)
+        cache.put('c', 4)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(8, cache.statistics.memory)
+        # Values which exceed the memory bound on their own are not stored at all.
+        cache.put('d', 11)
+        self.assertNotIn('d', cache)
+        self.assertEqual(2, len(cache))
+
+    def test_statistics(self):
+        cache = LRUCache()
+        cache.put('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNone(cache.get('a', is_valid=lambda value: value > 1))
+        statistics = cache.statistics
+        self.assertEqual((1, 2, 0), (statistics.hits, statistics.misses, statistics.entries))
+        self.assertAlmostEqual(1 / 3, statistics.hit_rate)
+
+
+class TestConversionCache(unittest.TestCase):
+
+    def _convert(self, value):
+        self.conversions.append(value)
+        return float(value)
+
+    def setUp(self):
+        self.conversions = []
+
+    def test_conversions_are_remembered(self):
+        cache = ConversionCache()
+        self.assertEqual(443.0, cache.convert(float, '443', self._convert))
+        self.assertEqual(443.0, cache.convert(float, '443', self._convert))
+        self.assertEqual(['443'], self.conversions)
+        statistics = cache.statistics
+        self.assertEqual((1, 1, 1), (statistics.hits, statistics.misses, statistics.entries))
+        self.assertGreater(statistics.memory, 0)
+
+    def test_conversions_are_remembered_per_target(self):
+        cache = ConversionCache()
+        cache.convert(float, '443', self._convert)
+        cache.convert(int, '443', self._convert)
+        self.assertEqual(['443', '443'], self.conversions)
+
+    def test_failed_conversions_are_remembered(self):
+        cache = ConversionCache()
+        for _ in range(2):
+            with self.assertRaises(EvaluationError):
+                cache.convert(float, 'abc', self._convert)
+        self.assertEqual(['abc'], self.conversions)
+
+    @parameterized.expand([[1], [-0.0], [True], [b'1']])
+    def test_only_strings_are_remembered(self, value):
+        cache = ConversionCache()
+        cache.convert(float, value, self._convert)
+        cache.convert(float, value, self._convert)
+        self.assertEqual([value, value], self.conversions)
+        self.assertEqual(0, len(cache))
+
+    def test_referenced_entries_get_a_second_chance(self):
+        cache = ConversionCache(max_entries=2)
+        cache.convert(float, '1', self._convert)
+        cache.convert(float, '2', self._convert)
+        cache.convert(float, '1', self._convert)
+        cache.convert(float, '3', self._convert)
+        cache.convert(float, '1', self._convert)
+        cache.convert(float, '3', self._convert)
+        self.assertEqual(['1', '2', '3'], self.conversions)
+        self.assertEqual(1, cache.statistics.evictions)
+
+    def test_memory_bound_evicts_entries(self):
+        cache = ConversionCache(max_memory=300)
+        for value in range(10):
+            cache.convert(float, str(value), self._convert)
+        self.assertLessEqual(cache.statistics.memory, 300)
+        self.assertLess(len(cache), 10)
+
+    def test_clear(self):
+        cache = ConversionCache()
+        cache.convert(float, '1', self._convert)
+        cache.clear()
+        self.assertEqual((0, 0), (len(cache), cache.statistics.memory))
+
+    def test_default_evaluator_uses_conversion_cache(self):
+        cache = ConversionCache()
+        display_filter = DictDisplayFilter([{'port': '443'}, {'port': '443'}, {'port': '80'}],
+                                           evaluator=DefaultEvaluator(conversion_cache=cache))
+        self.assertEqual(2, len(list(display_filter.filter('port == 443'))))
+        self.assertGreater(cache.statistics.hits, 0)
+        self.assertEqual(2, len(list(display_filter.filter('port == 443'))))
+        self.assertEqual(1, len(list(display_filter.filter('port ~ "^8"'))))
+
+
+class TestResultCache(unittest.TestCase):
+
+    data = [
+        {"name": "Morpheus", "age": 38, "gender": "male", "killed": False},
+        {"name": "Neo", "age": 35, "gender": "male", "killed": False},
+        {"name": "Cipher", "age": 48, "gender": "male", "killed": True},
+        {"name": "Trinity", "age": 32, "gender": "female", "killed": False}
+    ]
+
+    def test_outdated_data_version_is_a_miss(self):
+        cache = ResultCache()
+        cache.put('key', 1, [0, 2])
+        self.assertEqual([0, 2], list(cache.get('key', 1)))
+        self.assertIsNone(cache.get('key', 2))
+        self.assertEqual(0, cache.statistics.entries)
+
+    def test_dict_display_filter_replays_cached_results(self):
+        display_filter = DictDisplayFilter(list(self.data))
+        display_filter.result_cache = ResultCache()
+        expected_result = [self.data[0], self.data[1], self.data[2]]
+        self.assertEqual(expected_result, list(display_filter.filter('gender == male')))
+        # Operator aliases and whitespace do not matter.
+        self.assertEqual(expected_result, list(display_filter.filter('gender  eq male')))
+        self.assertEqual((1, 1), (display_filter.result_cache.statistics.hits,
+                                  display_filter.result_cache.statistics.misses))
+
+    def test_dict_display_filter_invalidates_cached_results_on_modification(self):
+        display_filter = DictDisplayFilter(list(self.data))
+        display_filter.result_cache = ResultCache()
+        self.assertEqual(3, len(list(display_filter.filter('gender == male'))))
+        display_filter.append({"name": "Smith", "age": 47, "gender": "male", "killed": False})
+        self.assertEqual(4, len(list(display_filter.filter('gender == male'))))
+        self.assertEqual(0, display_filter.result_cache.statistics.hits)
+
+    def test_changes_to_the_given_list_do_not_make_cached_results_stale(self):
+        data = list(self.data)
+        display_filter = DictDisplayFilter(data)
+        display_filter.result_cache = ResultCache()
+        display_filter.predicate_cache = PredicateCache()
+        self.assertEqual(3, len(list(display_filter.filter('gender == male'))))
+        # The display filter keeps its own copy of the items, hence changes which bypass it are not visible.
+        data.append({"name": "Smith", "age": 47, "gender": "male", "killed": False})
+        data[0] = {"name": "Niobe", "age": 40, "gender": "female", "killed": False}
+        self.assertEqual(3, len(list(display_filter.filter('gender == male'))))
+        self.assertEqual(3, len(list(display_filter.filter('gender == male and age > 0'))))
+        self.assertEqual(3, len(list(DictDisplayFilter(list(self.data)).filter('gender == male'))))
+
+    def test_partially_consumed_results_are_not_cached(self):
+        display_filter = DictDisplayFilter(list(self.data))
+        display_filter.result_cache = ResultCache()
+        next(display_filter.filter('gender == male'))
+        self.assertEqual(0, display_filter.result_cache.statistics.entries)
+
+    def test_sql_display_filter_invalidates_cached_results_on_modification(self):
+        connection = sqlite3.connect(':memory:')
+        connection.execute('CREATE TABLE data (name text, age integer)')
+        connection.executemany('INSERT INTO data VALUES (?, ?)', [('Neo', 35), ('Trinity', 32)])
+        display_filter = SQLDisplayFilter(connection, 'data')
+        display_filter.result_cache = ResultCache()
+        self.assertEqual(2, len(list(display_filter.filter('age > 30'))))
+        self.assertEqual(2, len(list(display_filter.filter('age > 30'))))
+        connection.execute("INSERT INTO data VALUES ('Morpheus', 38)")
+        self.assertEqual(3, len(list(display_filter.filter('age > 30'))))
+        statistics = display_filter.result_cache.statistics
+        self.assertEqual((1, 2), (statistics.hits, statistics.misses))
+
+    def test_changing_the_configuration_invalidates_cached_results(self):
+        display_filter = DictDisplayFilter(list(self.data), functions={'f': lambda value: value.lower()})
+        display_filter.result_cache = ResultCache()
+        self.assertEqual([self.data[1]], list(display_filter.filter('f(name) == neo')))
+        # The function is replaced by a different function using the same name.
+        display_filter.functions = {'f': lambda value: value.upper()}
+        self.assertEqual([], list(display_filter.filter('f(name) == neo')))
+        self.assertEqual([self.data[1]], list(display_filter.filter('age == 35.0')))
+        # Ages are compared as strings instead of numbers.
+        display_filter.schema = {'age': 'string'}
+        self.assertEqual([], list(display_filter.filter('age == 35.0')))
+        self.assertEqual(0, display_filter.result_cache.statistics.hits)
+
+
+class TestPredicateCache(unittest.TestCase):
+
+    data = [
+        {"name": "Morpheus", "age": 38, "gender": "male", "killed": False},
+        {"name": "Neo", "age": 35, "gender": "male", "killed": False, "power": ["flight", "bullet-time"]},
+        {"name": "Cipher", "age": 48, "gender": "male", "killed": True},
+        {"name": "Trinity", "age": 32, "gender": "female", "killed": False},
+        {"value": "0"},
+        {"value": 1},
+        {"value": "abcd"},
+        {"value": ["a", "b"]},
+        {"value": True},
+    ]
+
+    @parameterized.expand([
+        ['name'],
+        ['not power'],
+        ['age >= 32 and gender == male'],
+        ['name == Neo or name == Trinity'],
+        ['gender == female xor power'],
+        ['gender == male and not (age > 35)'],
+        ['not gender == male or killed == True and age > 40'],
+        ['value == 1 or value == abcd and not value ~= a'],
+    ])
+    def test_bitsets_match_item_by_item_evaluation(self, display_filter):
+        expected_result = list(DictDisplayFilter(self.data).filter(display_filter))
+        cached_display_filter = DictDisplayFilter(self.data)
+        cached_display_filter.predicate_cache = PredicateCache()
+        self.assertEqual(expected_result, list(cached_display_filter.filter(display_filter)))
+
+    def test_refined_display_filter_only_evaluates_new_expressions(self):
+        display_filter = DictDisplayFilter(self.data[:4])
+        display_filter.predicate_cache = PredicateCache()
+        self.assertEqual(3, len(list(display_filter.filter('gender == male'))))
+        self.assertEqual(1, len(list(display_filter.filter('gender == male and age > 40'))))
+        self.assertEqual(0, len(list(display_filter.filter('gender == male and age > 40 and not killed == True'))))
+        statistics = display_filter.predicate_cache.statistics
+        self.assertEqual((3, 3), (statistics.hits, statistics.misses))
+
+    def test_modification_invalidates_bitsets(self):
+        display_filter = DictDisplayFilter(self.data[:4])
+        display_filter.predicate_cache = PredicateCache()
+        self.assertEqual(3, len(list(display_filter.filter('gender == male'))))
+        display_filter.remove(self.data[0])
+        self.assertEqual(2, len(list(display_filter.filter('gender == male'))))
+        self.assertEqual(0, display_filter.predicate_cache.statistics.hits)
+
+    def test_changing_the_configuration_invalidates_bitsets(self):
+        display_filter = DictDisplayFilter(self.data[:4], functions={'f': lambda value: value.lower()})
+        display_filter.predicate_cache = PredicateCache()
+        self.assertEqual([self.data[1]], list(display_filter.filter('f(name) == neo')))
+        display_filter.functions = {'f': lambda value: value.upper()}
+        self.assertEqual([], list(display_filter.filter('f(name) == neo')))
+        display_filter.field_names = ['name', 'age']
+        self.assertEqual(0, display_filter.predicate_cache.statistics.entries)
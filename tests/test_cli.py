@@ -0,0 +1,75 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from parameterized import parameterized
+
+DATA_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+PROJECT_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def run(*args, input: bytes = None) -> subprocess.CompletedProcess:
+    environment = dict(os.environ, PYTHONPATH=PROJECT_DIRECTORY)
+    return subprocess.run(
+        [sys.executable, '-m', 'pydfql'] + list(args), input=input, capture_output=True, env=environment, timeout=60
+    )
+
+
+class TestCommandLine(unittest.TestCase):
+
+    def test_filter_csv_file(self):
+        result = run('age < 40', os.path.join(DATA_DIRECTORY, 'csv_example.csv'))
+        self.assertEqual(0, result.returncode)
+        lines = result.stdout.decode().splitlines()
+        self.assertEqual('name,actor,age,gender,killed', lines[0])
+        self.assertIn('Neo,Keanu Reeves,35,male,False', lines)
+        self.assertNotIn('Cipher', result.stdout.decode())
+
+    def test_filter_json_file(self):
+        result = run('age.born > 1962', os.path.join(DATA_DIRECTORY, 'json_example.json'))
+        self.assertEqual(0, result.returncode)
+        records = [json.loads(line) for line in result.stdout.decode().splitlines()]
+        self.assertEqual(['Neo', 'Trinity'], [record['name'] for record in records])
+
+    @parameterized.expand([(['-j', '1'],), (['-j', '3'],)])
+    def test_filter_nmap_xml_from_stdin(self, jobs):
+        with open(os.path.join(DATA_DIRECTORY, 'nmap_example.xml'), 'rb') as file:
+            result = run('port == 80 and status == open', '-c', *jobs, input=file.read())
+        self.assertEqual(0, result.returncode)
+        self.assertEqual(b'8\n', result.stdout)
+
+    def test_filter_json_lines_from_stdin(self):
+        data = b'{"host": "10.0.0.1", "port": 22}\n{"host": "10.0.0.2", "port": 80}\n'
+        result = run('port == 22', '-o', 'csv', input=data)
+        self.assertEqual(0, result.returncode)
+        self.assertEqual(b'host,port\n10.0.0.1,22\n', result.stdout)
+
+    def test_exit_status(self):
+        data = b'{"port": 22}\n'
+        self.assertEqual(1, run('port == 80', input=data).returncode)
+        result = run('port ==', input=data)
+        self.assertEqual(2, result.returncode)
+        self.assertIn(b'Error parsing display filter!', result.stderr)
+        self.assertEqual(2, run('port == 22', os.path.join(DATA_DIRECTORY, 'missing.csv')).returncode)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import csv
+import io
+import os
+import tempfile
+import unittest
+
+from parameterized import parameterized
+
+from pydfql.caches import PredicateCache, ResultCache
+from pydfql.display_filters import CSVDisplayFilter, DictDisplayFilter
+from pydfql.planner import CostBasedPlanner
+
+DATA_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+
+class TestCSVDisplayFilter(unittest.TestCase):
+    data = 'name,actor,age,gender,killed\r\n' \
+           'Morpheus,Laurence Fishburne,38,male,False\r\n' \
+           '"Neo","Keanu Reeves",35,male,False\r\n' \
+           '\r\n' \
+           'Cipher,"Pantoliano, Joe",48,male,True\r\n' \
+           'Trinity,"Carrie-Anne\nMoss",32,female\r\n' \
+           'Tank,Marcus Chong,28,male,False'
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as file:
+            file.write(self.data)
+        self.file_name = file.name
+        self.display_filter = CSVDisplayFilter(self.file_name)
+
+    def tearDown(self):
+        self.display_filter.close()
+        os.remove(self.file_name)
+
+    def test_column_names_are_read_from_header(self):
+        self.assertEqual(['name', 'actor', 'age', 'gender', 'killed'], self.display_filter.column_names)
+        self.assertEqual(['name', 'actor', 'age', 'gender', 'killed'], self.display_filter.field_names)
+        self.assertEqual(5, len(self.display_filter))
+
+    @parameterized.expand([
+        ('',), ('name == Neo',), ('age > 33 and gender == male',), ('killed',), ('not killed',),
+        ('len(name) > 3',), ('actor contains "Joe"',), ('actor contains "\\nMoss"',), ('name[0] == N',),
+    ])
+    def test_filter_returns_same_items_as_dict_display_filter(self, display_filter):
+        dict_display_filter = DictDisplayFilter(list(csv.DictReader(io.StringIO(self.data, newline=''))))
+        expected = [{key: value for key, value in item.items() if value is not None}
+                    for item in dict_display_filter.filter(display_filter)]
+        self.assertEqual(expected, list(self.display_filter.filter(display_filter)))
+
+    def test_filter_with_caches_and_planner(self):
+        self.display_filter.result_cache = ResultCache()
+        self.display_filter.predicate_cache = PredicateCache()
+        self.display_filter.planner = CostBasedPlanner(self.display_filter.collect_statistics())
+        for _ in range(2):
+            self.assertEqual(['Neo', 'Tank'], [
+                item['name'] for item in self.display_filter.filter('age < 36 and gender == male')
+            ])
+
+    def test_filter_without_header(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('22;ssh\n80;http\n')
+        try:
+            with CSVDisplayFilter(file.name, ['port', 'service'], delimiter=';', header=False) as display_filter:
+                self.assertEqual([{'port': '80', 'service': 'http'}], list(display_filter.filter('port > 22')))
+        finally:
+            os.remove(file.name)
+
+    def test_filter_empty_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            pass
+        try:
+            with CSVDisplayFilter(file.name) as display_filter:
+                self.assertEqual([], display_filter.column_names)
+                self.assertEqual([], list(display_filter.filter('')))
+        finally:
+            os.remove(file.name)
+
+    def test_filter_example_file(self):
+        with CSVDisplayFilter(os.path.join(DATA_DIRECTORY, 'csv_example.csv')) as display_filter:
+            self.assertEqual([{
+                'name': 'Neo', 'actor': 'Keanu Reeves', 'age': '35', 'gender': 'male', 'killed': 'False'
+            }], list(display_filter.filter('name == Neo')))
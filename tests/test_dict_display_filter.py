@@ -327,3 +327,15 @@ class TestDictDisplayFilter(unittest.TestCase):
     def test_functions_none(self, display_filter):
         data = [{'value': 'foobar'}, {'value': 'FOOBAR'}, {'value': 'FOO'}, {'value': 'BAR'}]
         self.assertRaises(ParserError, lambda: list(DictDisplayFilter(data, functions={}).filter(display_filter)))
+
+    def test_modifications_are_visible_to_subsequent_filters(self):
+        display_filter = DictDisplayFilter([dict(item) for item in self.data])
+        self.assertEqual(0, display_filter.data_version)
+        display_filter.append({"name": "Smith", "age": 47, "gender": "male", "killed": False})
+        display_filter.extend([{"name": "Switch", "age": 29, "gender": "female", "killed": True}])
+        self.assertEqual(2, len(list(display_filter.filter('killed == True'))))
+        display_filter.remove({"name": "Cipher", "age": 48, "gender": "male", "killed": True})
+        self.assertEqual(1, len(list(display_filter.filter('killed == True'))))
+        display_filter.update(0, {"name": "Morpheus", "age": 38, "gender": "male", "killed": True})
+        self.assertEqual(2, len(list(display_filter.filter('killed == True'))))
+        self.assertEqual(4, display_filter.data_version)
@@ -0,0 +1,124 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+
+from parameterized import parameterized
+
+from pydfql.display_filters import DictDisplayFilter
+from pydfql.evaluators import DefaultEvaluator
+from pydfql.models import EqualitySet, Expression
+from pydfql.parsers import DisplayFilterParser, DisplayFilterNormalizer
+from pydfql.parsers.normalizer import CONSTANT_FALSE, CONSTANT_TRUE
+
+
+class TestDisplayFilterNormalizer(unittest.TestCase):
+    parser = DisplayFilterParser()
+    normalizer = DisplayFilterNormalizer(evaluator=DefaultEvaluator())
+
+    data = [
+        {"name": "Morpheus", "age": 38, "gender": "male", "killed": False},
+        {"name": "Neo", "age": 35, "gender": "male", "killed": False, "power": ["flight", "bullet-time"]},
+        {"name": "Cipher", "age": 48, "gender": "male", "killed": True},
+        {"name": "Trinity", "age": "32", "gender": "female", "killed": False},
+        {"name": "Smith", "age": [1, 60], "gender": "male", "killed": "True"},
+        {"name": "Oracle", "age": "1999/06/17", "gender": "female"},
+        {"name": "Seraph", "age": "0x20", "gender": "male"},
+        {"name": "Link", "age": "10.2.2.2", "gender": "male"},
+    ]
+
+    def normalize(self, display_filter):
+        return self.normalizer.normalize(self.parser.parse(display_filter))
+
+    @parameterized.expand([
+        ['(((a == 1)))', 'a == 1'],
+        ['not not a == 1', 'a == 1'],
+        ['!(not a)', 'a'],
+        ['a and a', 'a'],
+        ['a and b', 'b and (a)'],
+        ['(a and b) and c', 'a and (b and c)'],
+        ['a or b and c', '(c and b) or a'],
+        ['a xor b', 'b ^^ a'],
+        ['a eq 1 && b neq 2', 'b != 2 and a == 1'],
+        ['a > 1 and a > 3', 'a > 3'],
+        ['a >= 5 and a > 3 and a < 10 and a <= 7', 'a <= 7 and a >= 5'],
+    ])
+    def test_equivalent_display_filters_are_normalized_identically(self, display_filter, other_display_filter):
+        expressions = self.normalize(display_filter)
+        other_expressions = self.normalize(other_display_filter)
+        self.assertEqual(expressions, other_expressions)
+        self.assertEqual(self.normalizer.fingerprint(expressions), self.normalizer.fingerprint(other_expressions))
+
+    def test_equality_comparisons_are_merged(self):
+        self.assertEqual([Expression('a', 'in', EqualitySet(['1', '2', '3']))],
+                         self.normalize('a == 1 or a == 3 or (a == 2 or a == 1)'))
+
+    def test_equality_comparisons_on_different_fields_are_not_merged(self):
+        self.assertEqual([[Expression('a', '==', '1'), 'or', Expression('b', '==', '2')]],
+                         self.normalize('b == 2 or a == 1'))
+
+    @parameterized.expand([
+        # Integers are also interpreted as dates, so '12' is later than '100' (year 100).
+        ['a > 12 and a > 100'],
+        ['a < 12 and a < 100'],
+        # Different types can not be compared.
+        ['a > 1 and a > 10.2.2.2'],
+    ])
+    def test_ambiguous_bounds_are_not_reduced(self, display_filter):
+        self.assertEqual(2, len(self.normalize(display_filter)[0][::2]))
+
+    @parameterized.expand([
+        ['a and not a', CONSTANT_FALSE],
+        ['a == 1 and b and not (a eq 1)', CONSTANT_FALSE],
+        ['a or not a', CONSTANT_TRUE],
+        ['a xor a', CONSTANT_FALSE],
+        ['not (a xor a)', CONSTANT_TRUE],
+    ])
+    def test_constants(self, display_filter, expected_result):
+        self.assertIs(expected_result, self.normalize(display_filter))
+
+    def test_fingerprint_refers_to_functions_by_name(self):
+        functions = {'lower': lambda value: value.lower()}
+        other_functions = {'lower': lambda value: value.lower()}
+        parser = DisplayFilterParser(functions=functions)
+        other_parser = DisplayFilterParser(functions=other_functions)
+        normalizer = DisplayFilterNormalizer(functions=functions)
+        other_normalizer = DisplayFilterNormalizer(functions=other_functions)
+        self.assertEqual(
+            normalizer.fingerprint(normalizer.normalize(parser.parse('lower(a) == b'))),
+            other_normalizer.fingerprint(other_normalizer.normalize(other_parser.parse('lower(a) == b')))
+        )
+
+    @parameterized.expand([
+        ['age == 35 or age == 38 or age == 0x20'],
+        ['age == 32 or name == Neo or age == 48'],
+        ['killed == True or killed == False'],
+        ['age == 1 or age == 60'],
+        ['age > 30 and age > 34'],
+        ['age > 30 and age >= 32 and age < 40 and age <= 38'],
+        ['age > 1999/01/01 and age > 1998/01/01'],
+        ['age > 12 and age > 100'],
+        ['age > 40 and age < 35'],
+        ['not not killed'],
+        ['gender == male and (gender == male or power) and not not age >= 35'],
+        ['power xor killed xor power'],
+        ['age > 10.2.2.1 and age > 10.2.2.0'],
+    ])
+    def test_normalized_display_filter_matches_same_items(self, display_filter):
+        display_filter_object = DictDisplayFilter(self.data)
+        expressions = display_filter_object._display_filter_parser.parse(display_filter)
+        expected_result = list(display_filter_object._filter_data(self.data, expressions))
+        self.assertEqual(expected_result, list(display_filter_object.filter(display_filter)))
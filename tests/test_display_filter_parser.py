@@ -16,9 +16,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from parameterized import parameterized
 
-from pydfql.exceptions import ParserError
+from pydfql.exceptions import ParserError, UnknownFieldError
 from pydfql.models import Expression
-from pydfql.parsers import DisplayFilterParser
+from pydfql.parsers import DisplayFilterParser, PYPARSING, RECURSIVE_DESCENT
 from tests import TestCase
 
 
@@ -183,3 +183,67 @@ class TestFilterStringParser(TestCase):
         self.assertRaisesException(
             lambda: self.generic_display_filter_parser.parse(filter_string), filter_string, ParserError
         )
+
+    def test_grammar_is_shared_by_parsers_with_same_configuration(self):
+        parser = DisplayFilterParser(['port', 'address'], functions={'len': len})
+        other_parser = DisplayFilterParser(['address', 'port'], functions={'len': lambda value: 0})
+        self.assertIsNone(parser._grammar)
+        parser.parse('port == 22')
+        other_parser.parse('port == 22')
+        self.assertIs(parser._grammar, other_parser._grammar)
+        self.assertIs(parser._grammar, DisplayFilterParser(['address'], functions={'len': len})._get_grammar())
+        self.assertIsNot(parser._grammar, DisplayFilterParser(['address'], functions={'upper': len})._get_grammar())
+        self.assertIsNot(parser._grammar, DisplayFilterParser(['port address'], functions={'len': len})._get_grammar())
+
+    @parameterized.expand([
+        (PYPARSING,),
+        (RECURSIVE_DESCENT,),
+    ])
+    def test_unknown_field_suggests_similar_fields(self, backend):
+        parser = DisplayFilterParser(['address', 'port', 'protocol'], functions={'len': len}, backend=backend)
+        with self.assertRaises(UnknownFieldError) as context:
+            parser.parse('port == 22 and (len(adress) > 3)')
+        self.assertEqual('adress', context.exception.field)
+        self.assertEqual(['address'], context.exception.suggestions)
+        self.assertEqual("Unknown field 'adress'! Did you mean 'address'?", str(context.exception))
+        with self.assertRaises(UnknownFieldError) as context:
+            parser.parse('xyz')
+        self.assertEqual([], context.exception.suggestions)
+        self.assertEqual("Unknown field 'xyz'!", str(context.exception))
+
+    def test_unknown_field_is_parser_error(self):
+        self.assertRaises(ParserError, DisplayFilterParser(['address']).parse, 'adress')
+
+    @parameterized.expand([
+        (PYPARSING,),
+        (RECURSIVE_DESCENT,),
+    ])
+    def test_wide_schema(self, backend):
+        field_names = ['field{}.value'.format(i) for i in range(50000)]
+        parser = DisplayFilterParser(field_names, backend=backend)
+        self.assertEqual(
+            [[Expression('field0.value', '==', '1'), 'or', Expression('field49999.value', '>', '2')]],
+            parser.parse('field0.value == 1 or field49999.value > 2')
+        )
+        self.assertRaises(UnknownFieldError, parser.parse, 'field50000.value')
+
+    @parameterized.expand([
+        (PYPARSING,),
+        (RECURSIVE_DESCENT,),
+    ])
+    def test_field_names_which_are_not_parsed_like_other_names(self, backend):
+        parser = DisplayFilterParser(['port number', 'address'], backend=backend)
+        self.assertEqual([Expression('port number', '==', '22')], parser.parse('port number == 22'))
+        self.assertEqual([Expression('address')], parser.parse('address'))
+        self.assertRaises(ParserError, parser.parse, 'port')
+
+    def test_functions_are_bound_per_parser(self):
+        upper, lower = (lambda value: value.upper()), (lambda value: value.lower())
+        self.assertEqual(
+            [[Expression('address', '==', 'a', upper), 'and', Expression('port', '==', '1', upper)]],
+            DisplayFilterParser(['address', 'port'], {'f': upper}).parse('f(address) == a and (f(port) == 1)')
+        )
+        self.assertEqual(
+            [Expression('address', '==', 'a', lower)],
+            DisplayFilterParser(['address', 'port'], {'f': lower}).parse('f(address) == a')
+        )
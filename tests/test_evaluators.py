@@ -0,0 +1,274 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+from unittest import mock
+
+from parameterized import parameterized
+
+from pydfql.caches import ConversionCache
+from pydfql.display_filters import DictDisplayFilter
+from pydfql.evaluators import DefaultEvaluator, Evaluator, common
+from pydfql.evaluators.common import CallbackEvaluator, DateEvaluator, DateParser, IntegerEvaluator, \
+    IPv4AddressEvaluator, IPv6AddressEvaluator, ListEvaluator, MACAddressEvaluator, MembershipEvaluator, \
+    NumberEvaluator, StringEvaluator
+from pydfql.models import EqualitySet, Expression
+
+
+class TestEvaluateBatch(unittest.TestCase):
+    item_values = [
+        1, 2, 1.0, 16, 2 ** 60 + 1, '1', '01', '0x10', '1.5', 'a', 'A', 'é', '10.0.0.1', '10.0.0.2', '::1',
+        '2020-01-01', '2021-05-05 10:00', True, False, None, '', [], [1, 2], ['a', '10.0.0.1'], {'x': 1}
+    ]
+
+    @parameterized.expand([
+        (NumberEvaluator(lambda expression_value, item_value: expression_value == item_value), '==', '16'),
+        (NumberEvaluator(lambda expression_value, item_value: item_value > expression_value), '>', '1'),
+        (IntegerEvaluator(lambda expression_value, item_value: (item_value & expression_value) > 0), '&', '2'),
+        (StringEvaluator(lambda expression_value, item_value: expression_value != item_value), '!=', 'a'),
+        (StringEvaluator(lambda expression_value, item_value: expression_value in item_value), '~=', '1'),
+        (DateEvaluator(lambda expression_value, item_value: item_value >= expression_value), '>=', '2021-01-01'),
+        (IPv4AddressEvaluator(lambda expression_value, item_value: item_value == expression_value), '==', '10.0.0.1'),
+        (IPv6AddressEvaluator(lambda expression_value, item_value: item_value != expression_value), '!=', '::1'),
+        (ListEvaluator(), 'in', [[1.0, '-', 3.0], 16.0, 'a', [['b'], 'A']]),
+        (ListEvaluator(), 'in', 'not a list'),
+    ])
+    def test_evaluate_batch_equals_evaluate(self, evaluator, operator, expression_value):
+        expected = [evaluator.evaluate(expression_value, operator, item_value) for item_value in self.item_values]
+        self.assertEqual(expected, evaluator.evaluate_batch(expression_value, operator, self.item_values))
+
+    @parameterized.expand([
+        (Expression('x'),),
+        (Expression('x', '==', '1'),),
+        (Expression('x', '!=', '10.0.0.1'),),
+        (Expression('x', '<', '2021-01-01'),),
+        (Expression('x', '~', '^1'),),
+        (Expression('x', 'in', [[1.0, '..', 2.0], 'a']),),
+        (Expression('x', 'in', EqualitySet(['1', 'a', '::1'])),),
+    ])
+    def test_default_evaluator_evaluate_batch_equals_evaluate(self, expression):
+        evaluator = DefaultEvaluator()
+        expected = [evaluator.evaluate(expression, item_value) for item_value in self.item_values]
+        self.assertEqual(expected, evaluator.evaluate_batch(expression, self.item_values))
+
+    @parameterized.expand([
+        (Expression('x', '==', '1'),),
+        (Expression('x', '!=', '10.0.0.1'),),
+        (Expression('x', '>', '::'),),
+        (Expression('x', '~=', '0'),),
+        (Expression('x', '&', '0x10'),),
+    ])
+    def test_conversion_cache_does_not_change_results(self, expression):
+        uncached_evaluator = DefaultEvaluator()
+        for evaluators in uncached_evaluator.evaluators.values():
+            for evaluator in evaluators:
+                evaluator.conversion_cache = None
+        cached_evaluator = DefaultEvaluator(conversion_cache=ConversionCache())
+        expected = [uncached_evaluator.evaluate(expression, item_value) for item_value in self.item_values]
+        for _ in range(2):
+            self.assertEqual(expected, [
+                cached_evaluator.evaluate(expression, item_value) for item_value in self.item_values
+            ])
+            self.assertEqual(expected, cached_evaluator.evaluate_batch(expression, self.item_values))
+
+    def test_custom_evaluators_fall_back_to_evaluate(self):
+        class LowerCaseEvaluator(StringEvaluator):
+            def _convert_item_value(self, value):
+                return str(value).lower()
+
+        class OddEvaluator(Evaluator):
+            def evaluate(self, expression, item_value) -> bool:
+                return item_value % 2 == 1
+
+        evaluator = LowerCaseEvaluator(lambda expression_value, item_value: expression_value == item_value)
+        self.assertEqual([False, True, True], evaluator.evaluate_batch('a', '==', ['b', 'a', 'A']))
+        self.assertEqual([True, False, True], OddEvaluator({}).evaluate_batch(Expression('x', '==', '1'), [1, 2, 3]))
+        evaluator = CallbackEvaluator(lambda expression_value, item_value: item_value.startswith(expression_value))
+        self.assertEqual([True, False, False], evaluator.evaluate_batch('a', '~', ['ab', 'b', None]))
+
+    def test_display_filter_evaluates_items_in_batches(self):
+        data = [{'value': i} for i in range(3000)]
+        display_filter = DictDisplayFilter(data)
+        calls = []
+        evaluate_batch = display_filter._evaluator.evaluate_batch
+
+        def _evaluate_batch(expression, item_values):
+            calls.append(len(item_values))
+            return evaluate_batch(expression, item_values)
+
+        display_filter._evaluator.evaluate_batch = _evaluate_batch
+        self.assertEqual(2000, len(list(display_filter.filter('value >= 1000'))))
+        self.assertEqual([1024, 1024, 952], calls)
+
+
+class TestListEvaluator(unittest.TestCase):
+
+    @parameterized.expand([
+        ('16', True),
+        (16, True),
+        ('16.0', True),
+        ('1.5', True),
+        ('2.5', True),
+        ('5', True),
+        ('5.5', False),
+        ('7', True),
+        ('9', False),
+        ('a', True),
+        ('b', False),
+        (None, False),
+        ([1], False),
+        ('nan', False),
+    ])
+    def test_evaluate(self, item_value, expected_result):
+        # The overlapping ranges (1-3 and 2..5) are merged and the empty range (9..1) is ignored.
+        expression_value = [[1.0, '-', 3.0], 16.0, 'a', [2.0, '..', 5.0], [7.0, '-', 8.0], [9.0, '..', 1.0], 'nan']
+        evaluator = ListEvaluator()
+        self.assertEqual(expected_result, evaluator.evaluate(expression_value, 'in', item_value))
+        self.assertEqual([expected_result], evaluator.evaluate_batch(expression_value, 'in', [item_value]))
+
+    def test_evaluate_large_list(self):
+        expression_value = [float(port) for port in range(0, 10000, 2)]
+        expression_value += [[float(i), '..', i + 0.5] for i in range(5000)]
+        evaluator = ListEvaluator()
+        item_values = [str(value) for value in range(-1, 10001)] + [i + 0.25 for i in range(5000)]
+        expected = [
+            (0 <= value < 10000 and value % 2 == 0) or 0 <= value < 5000 for value in range(-1, 10001)
+        ] + [True] * 5000
+        self.assertEqual(expected, evaluator.evaluate_batch(expression_value, 'in', item_values))
+        self.assertEqual(expected, [evaluator.evaluate(expression_value, 'in', value) for value in item_values])
+
+    def test_unhashable_values(self):
+        evaluator = ListEvaluator()
+        self.assertTrue(evaluator.evaluate([['b'], 'A', [1, 2]], 'in', 'b'))
+        self.assertTrue(evaluator.evaluate([{'x': 1}, 'a'], 'in', {'x': 1}))
+        self.assertFalse(evaluator.evaluate([{'x': 1}, 'a'], 'in', {'x': 2}))
+
+    def test_lists_are_converted_once(self):
+        evaluator = ListEvaluator()
+        lists = [[1.0, 2.0], ['a', 'b']]
+        with mock.patch.object(common, '_ListMatcher', wraps=common._ListMatcher) as list_matcher:
+            for item_value in range(1000):
+                for expression_value in lists:
+                    evaluator.evaluate(expression_value, 'in', item_value)
+                    evaluator.evaluate_batch(expression_value, 'in', [item_value])
+        self.assertEqual(2, list_matcher.call_count)
+
+
+class TestMembershipEvaluator(unittest.TestCase):
+
+    @parameterized.expand([
+        [80, True],
+        ['0x50', True],
+        [445.5, True],
+        [4000, True],
+        [3999, False],
+        ['abc', False],
+        [None, False],
+    ])
+    def test_evaluate(self, item_value, expected_result):
+        evaluator = MembershipEvaluator(NumberEvaluator(lambda expression_value, item_value: False))
+        expression_value = evaluator.convert_expression_value([80.0, [440.0, '..', 450.0], [4000.0, '-', 5000.0]])
+        self.assertEqual(expected_result, evaluator.evaluate_converted(expression_value, 'in', item_value))
+        self.assertEqual([expected_result], evaluator.evaluate_converted_batch(expression_value, 'in', [item_value]))
+
+    def test_values_which_can_not_be_converted_raise_error(self):
+        evaluator = MembershipEvaluator(MACAddressEvaluator(lambda expression_value, item_value: False))
+        with self.assertRaises(Exception):
+            evaluator.convert_expression_value(['00:11', 'zz'])
+
+
+class TestMACAddressEvaluator(unittest.TestCase):
+
+    @parameterized.expand([
+        ['00:11:22:33:44:55', (0x00, 0x11, 0x22, 0x33, 0x44, 0x55)],
+        ['AA-bb-CC', (0xaa, 0xbb, 0xcc)],
+        ['0:1', (0, 1)],
+    ])
+    def test_convert(self, value, expected_result):
+        self.assertEqual(expected_result, MACAddressEvaluator(lambda e, i: e == i).convert_item_value(value))
+
+    @parameterized.expand([['zz'], ['00:111'], ['00::11'], [None], [1]])
+    def test_convert_invalid_value(self, value):
+        with self.assertRaises(Exception):
+            MACAddressEvaluator(lambda e, i: e == i).convert_item_value(value)
+
+
+class TestDateParser(unittest.TestCase):
+
+    @parameterized.expand([
+        ['2020-01-02'],
+        ['2020-01-02 10:00'],
+        ['2020-01-02T10:00:30'],
+        ['2020-01-02T10:00:30.5'],
+        ['2020-01-02T10:00:30.123456Z'],
+        ['2020-01-02 10:00:30+02:00'],
+        ['2020-01-02T10:00:30-05:30'],
+        ['02/01/2020 10:00'],
+        ['Jan 2 2020'],
+    ])
+    def test_parse_like_dateutil(self, value):
+        from dateutil.parser import parse as parse_date
+        self.assertEqual(parse_date(value), DateParser().parse(value))
+
+    def test_iso_dates_are_not_cached(self):
+        parser = DateParser()
+        parser.parse('2020-01-02T10:00:00')
+        self.assertEqual(0, parser.cache.statistics.misses)
+
+    def test_parse_formats(self):
+        import datetime
+        parser = DateParser(formats=['%d/%b/%Y:%H:%M:%S %z'])
+        self.assertEqual(
+            datetime.datetime(2020, 1, 2, 10, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+            parser.parse('02/Jan/2020:10:00:00 +0200')
+        )
+
+    def test_remember_dates(self):
+        parser = DateParser()
+        self.assertEqual(parser.parse('Jan 2 2020'), parser.parse('Jan 2 2020'))
+        self.assertEqual((1, 1), (parser.cache.statistics.hits, parser.cache.statistics.misses))
+
+    def test_remember_invalid_dates(self):
+        parser = DateParser()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                parser.parse('no date')
+        self.assertEqual((1, 1), (parser.cache.statistics.hits, parser.cache.statistics.misses))
+
+    def test_setting_formats_clears_cache(self):
+        parser = DateParser()
+        parser.parse('02.01.2020')
+        parser.formats = ['%m.%d.%Y']
+        self.assertEqual(['%m.%d.%Y'], parser.formats)
+        self.assertEqual(0, parser.cache.statistics.entries)
+        self.assertEqual(2, parser.parse('02.01.2020').month)
+
+    def test_max_entries(self):
+        parser = DateParser(max_entries=2)
+        for value in ['Jan 1 2020', 'Jan 2 2020', 'Jan 3 2020']:
+            parser.parse(value)
+        self.assertEqual(2, parser.cache.statistics.entries)
+
+    def test_default_evaluator_uses_date_parser(self):
+        parser = DateParser(formats=['%d/%b/%Y:%H:%M:%S'])
+        display_filter = DictDisplayFilter([{'time': '02/Jan/2020:10:00:00'}, {'time': '02/Jan/2021:10:00:00'}],
+                                           evaluator=DefaultEvaluator(date_parser=parser))
+        self.assertEqual(1, len(list(display_filter.filter('time > 2020-06-01'))))
+        self.assertGreater(parser.cache.statistics.misses, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import itertools
+import unittest
+
+from parameterized import parameterized
+
+from pydfql.expressions import fold, iter_expressions
+from pydfql.parsers import DisplayFilterParser
+
+
+class TestFold(unittest.TestCase):
+    parser = DisplayFilterParser()
+
+    @parameterized.expand([
+        ['a and b or c'],
+        ['a or b and c'],
+        ['not a and b'],
+        ['not a ^^ b'],
+        ['a xor b and c'],
+        ['a xor (not b)'],
+        ['not (a or b) and not c'],
+        ['a and (b xor c) or not (a and c)'],
+    ])
+    def test_fold_uses_python_operator_precedence(self, display_filter):
+        expressions = self.parser.parse(display_filter)
+        for values in itertools.product([False, True], repeat=3):
+            assignment = dict(zip('abc', values))
+            # Evaluate the display filter using python itself.
+            python_expression = display_filter.replace('^^', '^').replace('xor', '^')
+            expected_result = bool(eval(python_expression, {}, assignment))
+            actual_result = fold(
+                expressions,
+                leaf=lambda expression: assignment[expression.field],
+                not_=lambda value: not value,
+                and_=lambda left, right: left and right,
+                or_=lambda left, right: left or right,
+                xor_=lambda left, right: left ^ right
+            )
+            self.assertEqual(expected_result, bool(actual_result), f'{display_filter} with {assignment}')
+
+    def test_fold_malformed_expressions_raises_value_error(self):
+        expressions = self.parser.parse('a and b')[0][:2]
+        self.assertRaises(ValueError, lambda: fold(expressions, bool, bool, min, max, max))
+
+    def test_iter_expressions(self):
+        expressions = self.parser.parse('a and (b or not c)')
+        self.assertEqual(['a', 'b', 'c'], [expression.field for expression in iter_expressions(expressions)])
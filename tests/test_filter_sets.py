@@ -0,0 +1,139 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+from unittest import mock
+
+from parameterized import parameterized
+
+from pydfql.display_filters import DictDisplayFilter
+from pydfql.evaluators import Evaluator, common
+from pydfql.evaluators.common import StringEvaluator
+from pydfql.exceptions import ParserError
+from pydfql.filter_sets import FilterSet
+from pydfql.planner import CostBasedPlanner
+
+
+class TestFilterSet(unittest.TestCase):
+    data = [
+        {'host': '10.0.0.1', 'port': 22, 'service': 'ssh', 'tags': ['internal', 'linux']},
+        {'host': '10.0.0.2', 'port': '443', 'service': 'https', 'tags': []},
+        {'host': '10.0.0.3', 'port': 80.0, 'service': 'http'},
+        {'host': '::1', 'port': '0x16', 'service': 'ssh', 'tags': ['linux']},
+        {'host': '10.0.0.5', 'port': None, 'service': 'unknown'},
+    ]
+    display_filters = {
+        'ssh': 'port == 22',
+        'web': 'port == 80 or port == 443',
+        'internal': 'tags == internal',
+        'linux_ssh': 'service == ssh and tags == linux',
+        'localhost': 'host == ::1',
+        'not_ssh': 'not service == ssh',
+        'numbers': 'port in {80, 443}',
+        'upper': 'upper(service) == SSH',
+        'always': 'port or not port',
+        'never': 'port and not port',
+        'all': '',
+        'mixed': 'host == 10.0.0.1 or port > 100',
+    }
+
+    def _create_filter_set(self, planner: CostBasedPlanner = None) -> FilterSet:
+        filter_set = FilterSet()
+        filter_set.planner = planner
+        for filter_id, display_filter in self.display_filters.items():
+            filter_set.add(filter_id, display_filter)
+        return filter_set
+
+    def _get_expected_filter_ids(self, item) -> list:
+        return [
+            filter_id for filter_id, display_filter in self.display_filters.items()
+            if list(DictDisplayFilter([item]).filter(display_filter))
+        ]
+
+    @parameterized.expand([(None,), (CostBasedPlanner(),)])
+    def test_match_returns_same_filters_as_dict_display_filter(self, planner):
+        filter_set = self._create_filter_set(planner)
+        for item in self.data:
+            self.assertEqual(self._get_expected_filter_ids(item), filter_set.match(item))
+
+    def test_match_all_returns_matching_items_and_filter_ids(self):
+        filter_set = FilterSet()
+        filter_set.add('ssh', 'port == 22')
+        filter_set.add('web', 'port == 80')
+        result = list(filter_set.match_all(self.data))
+        self.assertEqual([
+            (self.data[0], ['ssh']), (self.data[2], ['web']), (self.data[3], ['ssh'])
+        ], result)
+
+    def test_shared_expressions_are_evaluated_once_per_item(self):
+        filter_set = FilterSet()
+        filter_set.add('a', 'service ~ "^ss" and port == 22')
+        filter_set.add('b', 'service ~ "^ss" or host == 10.0.0.2')
+        filter_set.add('c', 'not service ~ "^ss"')
+        with mock.patch.object(filter_set, '_get_item_value', wraps=filter_set._get_item_value) as get_item_value:
+            self.assertEqual(['a', 'b'], filter_set.match(self.data[0]))
+        fields = [call.args[0].field for call in get_item_value.call_args_list]
+        self.assertEqual(1, fields.count('service'))
+        self.assertEqual(1, fields.count('port'))
+
+    def test_equality_comparisons_are_looked_up(self):
+        filter_set = FilterSet()
+        for i in range(100):
+            filter_set.add(i, 'host == 10.0.0.{} and service == ssh'.format(i))
+        with mock.patch.object(filter_set._evaluator, 'evaluate') as evaluate:
+            self.assertEqual([1], filter_set.match(self.data[0]))
+            self.assertEqual([], filter_set.match(self.data[2]))
+        evaluate.assert_not_called()
+
+    def test_add_and_remove(self):
+        filter_set = FilterSet()
+        filter_set.add('ssh', 'port == 22')
+        self.assertEqual(['ssh'], filter_set.match(self.data[0]))
+        filter_set.add('ssh', 'port == 80')
+        filter_set.add('internal', 'tags == internal')
+        self.assertEqual(['internal'], filter_set.match(self.data[0]))
+        self.assertEqual(['ssh', 'internal'], filter_set.filter_ids)
+        filter_set.remove('internal')
+        self.assertEqual([], filter_set.match(self.data[0]))
+        self.assertEqual(1, len(filter_set))
+        self.assertNotIn('internal', filter_set)
+        with self.assertRaises(KeyError):
+            filter_set.remove('internal')
+
+    def test_invalid_display_filter_raises_parser_error(self):
+        with self.assertRaises(ParserError):
+            FilterSet().add('invalid', 'port ==')
+
+    def test_custom_evaluator_is_not_looked_up(self):
+        filter_set = FilterSet(evaluator=Evaluator({
+            '==': [StringEvaluator(lambda expression_value, item_value: expression_value.lower() == item_value.lower())]
+        }))
+        filter_set.add('ssh', 'service == SSH')
+        self.assertEqual(['ssh'], filter_set.match(self.data[0]))
+
+    def test_lists_are_converted_once(self):
+        filter_set = FilterSet()
+        filter_set.add('ports', 'port in {20..25, 80}')
+        filter_set.add('services', 'service in {"ssh", "http"}')
+        with mock.patch.object(common, '_ListMatcher', wraps=common._ListMatcher) as list_matcher:
+            for _ in range(100):
+                self.assertEqual(['ports', 'services'], filter_set.match(self.data[0]))
+                self.assertEqual(['services'], filter_set.match(self.data[3]))
+        self.assertEqual(2, list_matcher.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import subprocess
+import sys
+import unittest
+from typing import Set
+
+from parameterized import parameterized
+
+PROJECT_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules which take a while to import and are only imported when they are used.
+LAZY_MODULES = [
+    'pyparsing', 'dateutil', 'packaging', 'ipranger', 'dacite', 'ipaddress', 'asyncio', 'multiprocessing',
+    'concurrent.futures', 'hashlib'
+]
+
+
+def imported_modules(code: str) -> Set[str]:
+    """ Runs the code in a new process and returns the names of the modules imported (see 'python -X importtime'). """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, timeout=60, env=dict(os.environ, PYTHONPATH=PROJECT_DIRECTORY)
+    )
+    if process.returncode != 0:
+        raise AssertionError(process.stderr)
+    return {
+        line.rsplit('|', 1)[1].strip() for line in process.stderr.splitlines() if line.startswith('import time:')
+    }
+
+
+class TestImports(unittest.TestCase):
+
+    @parameterized.expand([
+        ['import pydfql'],
+        ['import pydfql.cli'],
+        ['from pydfql import DictDisplayFilter; DictDisplayFilter([{"a": "b"}])'],
+    ])
+    def test_import_does_not_import_lazy_modules(self, code):
+        modules = imported_modules(code)
+        self.assertIn('pydfql', modules)
+        self.assertEqual([], [module for module in LAZY_MODULES if module in modules])
+
+    @parameterized.expand([
+        ['a == b', []],
+        ['a in {1, 2..3}', []],
+        ['a > 2020-01-01', ['dateutil']],
+        ['a == 10.0.0.1', ['ipaddress']],
+        ['a in {10.0.0.1/24}', ['pyparsing', 'ipranger', 'dacite', 'ipaddress']],
+        # The grammar of the pyparsing backend contains the elements used to parse lists of ip addresses.
+        ['a == b', ['pyparsing', 'ipranger', 'dacite', 'ipaddress'], 'pyparsing'],
+    ])
+    def test_modules_are_imported_when_used(self, display_filter, expected_modules, backend='recursive-descent'):
+        modules = imported_modules(
+            'from pydfql import DictDisplayFilter\n'
+            'display_filter = DictDisplayFilter([{{"a": "b"}}])\n'
+            'display_filter.parser_backend = {!r}\n'
+            'list(display_filter.filter({!r}))'.format(backend, display_filter)
+        )
+        self.assertEqual(expected_modules, [module for module in LAZY_MODULES if module in modules])
+
+
+if __name__ == '__main__':
+    unittest.main()
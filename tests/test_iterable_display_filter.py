@@ -0,0 +1,73 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+
+from parameterized import parameterized
+
+from pydfql.display_filters import DictDisplayFilter, IterableDisplayFilter
+from pydfql.planner import CostBasedPlanner
+
+
+class TestIterableDisplayFilter(unittest.TestCase):
+    data = [
+        {'name': 'Morpheus', 'age': 38, 'gender': 'male', 'killed': False, 'power': None},
+        {'name': 'Neo', 'age': 35, 'gender': 'male', 'killed': False, 'power': 'flight'},
+        {'name': 'Cipher', 'age': 48, 'gender': 'male', 'killed': True, 'power': None},
+        {'name': 'Trinity', 'age': 32, 'gender': 'female', 'killed': False, 'power': None}
+    ]
+
+    @parameterized.expand([
+        ('',), ('name == Neo',), ('age > 33 and gender == male',), ('power',), ('not killed == True',),
+        ('name == Neo and not name == Neo',), ('name == Neo or not name == Neo',), ('len(name) > 3',)
+    ])
+    def test_filter_returns_same_items_as_dict_display_filter(self, display_filter):
+        expected = list(DictDisplayFilter(self.data).filter(display_filter))
+        self.assertEqual(expected, list(IterableDisplayFilter(self.data).filter(display_filter)))
+        self.assertEqual(expected, list(IterableDisplayFilter(lambda: iter(self.data)).filter(display_filter)))
+        iterable_display_filter = IterableDisplayFilter(item for item in self.data)
+        iterable_display_filter.planner = CostBasedPlanner()
+        self.assertEqual(expected, list(iterable_display_filter.filter(display_filter)))
+
+    def test_filter_evaluates_items_in_single_pass(self):
+        evaluated = []
+
+        def _generate():
+            for i in range(1000):
+                evaluated.append(i)
+                yield {'value': i}
+
+        result = IterableDisplayFilter(_generate).filter('value > 10')
+        self.assertEqual({'value': 11}, next(result))
+        # Items are evaluated lazily, so only the items up to the first match were read.
+        self.assertEqual(12, len(evaluated))
+        self.assertEqual(988, len(list(result)))
+        self.assertEqual(1000, len(evaluated))
+
+    def test_factory_is_invoked_on_every_filter(self):
+        display_filter = IterableDisplayFilter(lambda: (item for item in self.data))
+        self.assertEqual(1, len(list(display_filter.filter('name == Neo'))))
+        self.assertEqual(3, len(list(display_filter.filter('gender == male'))))
+
+    def test_consumed_iterator_raises_value_error(self):
+        display_filter = IterableDisplayFilter(item for item in self.data)
+        self.assertEqual(1, len(list(display_filter.filter('name == Neo'))))
+        with self.assertRaises(ValueError):
+            list(display_filter.filter('name == Neo'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+
+from parameterized import parameterized
+
+from pydfql.caches import PredicateCache, ResultCache
+from pydfql.display_filters import DictDisplayFilter, ListDisplayFilter
+from pydfql.planner import CostBasedPlanner
+
+
+class TestListDisplayFilter(unittest.TestCase):
+    field_names = ['name', 'actor', 'age', 'gender', 'killed']
+    data = [
+        ['Morpheus', 'Laurence Fishburne', 38, 'male', False],
+        ['Neo', 'Keanu Reeves', 35, 'male', False],
+        ('Cipher', 'Joe Pantoliano', 48, 'male', True),
+        ['Trinity', 'Carrie-Anne Moss', 32, 'female']
+    ]
+
+    @parameterized.expand([
+        ('',), ('name == Neo',), ('age > 33 and gender == male',), ('killed',), ('not killed',),
+        ('len(name) > 3',), ('actor contains "Moss"',), ('name[0] == N',)
+    ])
+    def test_filter_returns_same_items_as_dict_display_filter(self, display_filter):
+        dict_display_filter = DictDisplayFilter([dict(zip(self.field_names, item)) for item in self.data])
+        expected = [tuple(item.values()) for item in dict_display_filter.filter(display_filter)]
+        actual = [tuple(item) for item in ListDisplayFilter(self.data, self.field_names).filter(display_filter)]
+        self.assertEqual(expected, actual)
+
+    def test_filter_returns_original_items(self):
+        result = list(ListDisplayFilter(self.data, self.field_names).filter('age < 40'))
+        self.assertEqual(3, len(result))
+        self.assertIs(self.data[0], result[0])
+        self.assertIs(self.data[3], result[2])
+
+    def test_filter_with_caches_and_planner(self):
+        display_filter = ListDisplayFilter(self.data, self.field_names)
+        display_filter.result_cache = ResultCache()
+        display_filter.predicate_cache = PredicateCache()
+        display_filter.planner = CostBasedPlanner(display_filter.collect_statistics())
+        self.assertEqual([self.data[1]], list(display_filter.filter('name == Neo and age < 40')))
+        display_filter.append(['Tank', 'Marcus Chong', 28, 'male', False])
+        self.assertEqual(['Neo', 'Tank'], [item[0] for item in display_filter.filter('age < 36 and gender == male')])
+
+    def test_changing_field_names_updates_positions(self):
+        display_filter = ListDisplayFilter(self.data, self.field_names)
+        self.assertEqual(1, len(list(display_filter.filter('name == Neo'))))
+        display_filter.field_names = ['actor', 'name']
+        self.assertEqual(0, len(list(display_filter.filter('name == Neo'))))
+        self.assertEqual(1, len(list(display_filter.filter('name == "Keanu Reeves"'))))
+
+    @parameterized.expand([
+        ('result_cache', ResultCache()),
+        ('predicate_cache', PredicateCache()),
+    ])
+    def test_changing_field_names_invalidates_caches(self, cache_name, cache):
+        data = [['a', 'b'], ['b', 'a']]
+        display_filter = ListDisplayFilter(data, ['x', 'y'])
+        setattr(display_filter, cache_name, cache)
+        self.assertEqual([['a', 'b']], list(display_filter.filter('x == a')))
+        display_filter.field_names = ['y', 'x']
+        self.assertEqual([['b', 'a']], list(display_filter.filter('x == a')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -91,3 +91,13 @@ class TestObjectDisplayFilter(unittest.TestCase):
     ])
     def test_object_display_filter_returns_correct_number_of_items(self, display_filter, no_items):
         self.assertEqual(len(list(ObjectDisplayFilter(self.data).filter(display_filter))), no_items)
+
+    def test_modifications_are_visible_to_subsequent_filters(self):
+        data = list(self.data)
+        display_filter = ObjectDisplayFilter(data)
+        smith = Person(name="Smith", age=47, gender="male", killed=False)
+        display_filter.append(smith)
+        self.assertEqual([smith], list(display_filter.filter('name == Smith')))
+        display_filter.remove(smith)
+        self.assertEqual([], list(display_filter.filter('name == Smith')))
+        self.assertEqual(2, display_filter.data_version)
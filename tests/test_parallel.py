@@ -0,0 +1,174 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import threading
+import unittest
+from array import array
+from unittest import mock
+
+from parameterized import parameterized
+
+from pydfql import parallel
+from pydfql.caches import ResultCache
+from pydfql.display_filters import DictDisplayFilter, ObjectDisplayFilter
+from pydfql.evaluators.common import default_conversion_cache, default_date_parser
+from pydfql.exceptions import EvaluationError
+from pydfql.parsers import common as pc
+from pydfql.stores import DataStore
+
+
+class Item:
+
+    def __init__(self, value: int, name: str):
+        self.value = value
+        self.name = name
+
+
+@unittest.skipUnless(parallel.is_supported(), 'forking worker processes is not supported')
+class TestParallelDisplayFilter(unittest.TestCase):
+    data = [{'value': i, 'name': 'item{}'.format(i % 7)} for i in range(1000)]
+
+    def _create_display_filter(self, display_filter_class=DictDisplayFilter, data=None):
+        display_filter = display_filter_class(data if data is not None else self.data)
+        display_filter.parallel = 4
+        display_filter.parallel_threshold = 0
+        self.addCleanup(display_filter.close)
+        return display_filter
+
+    @parameterized.expand([
+        ('value > 500',), ('name ~ "item(1|3)" and value < 900',), ('value == 1',), ('value < 0',)
+    ])
+    def test_parallel_display_filter_returns_items_in_original_order(self, display_filter_string):
+        expected = list(DictDisplayFilter(self.data).filter(display_filter_string))
+        self.assertEqual(expected, list(self._create_display_filter().filter(display_filter_string)))
+
+    def test_parallel_object_display_filter(self):
+        data = [Item(i, 'item{}'.format(i)) for i in range(100)]
+        display_filter = self._create_display_filter(ObjectDisplayFilter, data)
+        self.assertEqual(data[90:], list(display_filter.filter('value >= 90')))
+
+    def test_parallel_display_filter_with_result_cache(self):
+        display_filter = self._create_display_filter()
+        display_filter.result_cache = ResultCache()
+        expected = list(DictDisplayFilter(self.data).filter('value > 500'))
+        for _ in range(2):
+            self.assertEqual(expected, list(display_filter.filter('value > 500')))
+        self.assertEqual(1, display_filter.result_cache.statistics.hits)
+
+    def test_parallel_display_filter_sees_modified_data(self):
+        display_filter = self._create_display_filter(data=list(self.data))
+        display_filter.append({'value': 5000, 'name': 'new'})
+        self.assertEqual([{'value': 5000, 'name': 'new'}], list(display_filter.filter('name == new')))
+
+    def test_parallel_display_filter_with_schema(self):
+        display_filter = self._create_display_filter()
+        display_filter.schema = {'value': 'number', 'name': 'string'}
+        expected = list(DictDisplayFilter(self.data).filter('value > 500 and name == item3'))
+        self.assertEqual(expected, list(display_filter.filter('value > 500 and name == item3')))
+
+    def test_worker_processes_are_reused_until_data_changes(self):
+        display_filter = self._create_display_filter(data=list(self.data))
+        list(display_filter.filter('value > 500'))
+        worker_pool = display_filter._worker_pool
+        list(display_filter.filter('value < 500'))
+        self.assertIs(worker_pool, display_filter._worker_pool)
+        display_filter.append({'value': 5000, 'name': 'new'})
+        self.assertEqual([{'value': 5000, 'name': 'new'}], list(display_filter.filter('value == 5000')))
+        self.assertIsNot(worker_pool, display_filter._worker_pool)
+
+    def test_worker_processes_are_shut_down_on_close(self):
+        with self._create_display_filter() as display_filter:
+            list(display_filter.filter('value > 500'))
+            self.assertIsNotNone(display_filter._worker_pool)
+        self.assertIsNone(display_filter._worker_pool)
+        # The display filter can still be used after it was closed.
+        self.assertEqual(499, len(list(display_filter.filter('value > 500'))))
+
+    def test_parallel_display_filter_raises_evaluation_error(self):
+        display_filter = self._create_display_filter(data=[{'value': 1}, {'name': 'a'}])
+        with self.assertRaises(EvaluationError):
+            list(display_filter.filter('lower(value) == 1'))
+
+    def test_parallel_display_filter_can_be_closed_early(self):
+        display_filter = self._create_display_filter()
+        result = display_filter.filter('value >= 0')
+        self.assertEqual(self.data[0], next(result))
+        result.close()
+
+    def test_large_data_is_evaluated_by_worker_processes(self):
+        display_filter = self._create_display_filter()
+        display_filter.functions = {'pid': lambda value: os.getpid()}
+        self.assertEqual([], list(display_filter.filter('pid(value) == {}'.format(os.getpid()))))
+
+    def test_small_data_is_evaluated_by_current_process(self):
+        display_filter = self._create_display_filter()
+        display_filter.parallel_threshold = len(self.data) + 1
+        display_filter.functions = {'pid': lambda value: os.getpid()}
+        self.assertEqual(self.data, list(display_filter.filter('pid(value) == {}'.format(os.getpid()))))
+
+
+@unittest.skipUnless(parallel.is_supported(), 'forking worker processes is not supported')
+class TestWorkerPool(unittest.TestCase):
+
+    def test_locks_held_by_other_threads_are_replaced_in_worker_processes(self):
+        locks = [
+            (pc, 'parse_lock'),
+            (default_conversion_cache, '_lock'),
+            (default_date_parser.cache, '_lock'),
+            (DataStore([]), '_lock'),
+        ]
+        acquired, release = threading.Event(), threading.Event()
+
+        def _hold_locks():
+            for owner, attribute in locks:
+                getattr(owner, attribute).acquire()
+            acquired.set()
+            release.wait()
+            for owner, attribute in locks:
+                getattr(owner, attribute).release()
+
+        def _match_range(task, start: int, stop: int) -> array:
+            return array('q', [
+                position for position in range(start, stop)
+                if getattr(*locks[position]).acquire(timeout=1)
+            ])
+
+        thread = threading.Thread(target=_hold_locks)
+        thread.start()
+        pool = parallel.WorkerPool(_match_range, 1)
+        try:
+            acquired.wait()
+            self.assertEqual(list(range(len(locks))), list(pool.iter_matching_positions(None, len(locks))))
+        finally:
+            pool.close()
+            release.set()
+            thread.join()
+
+
+class TestParallelNotSupported(unittest.TestCase):
+
+    def test_warning_is_issued_when_forking_is_not_supported(self):
+        display_filter = DictDisplayFilter([{'value': i} for i in range(10)])
+        with mock.patch.object(parallel, 'is_supported', return_value=False):
+            with self.assertWarns(RuntimeWarning):
+                display_filter.parallel = 4
+            display_filter.parallel_threshold = 0
+            self.assertEqual(5, len(list(display_filter.filter('value >= 5'))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import sqlite3
+import unittest
+
+from parameterized import parameterized
+
+from pydfql.caches import PredicateCache, ResultCache
+from pydfql.display_filters import DictDisplayFilter, SQLDisplayFilter
+from pydfql.exceptions import EvaluationError
+from pydfql.models import Expression
+from pydfql.planner import BITMAP, PUSHDOWN, SCAN, CostBasedPlanner
+from pydfql.statistics import StatisticsCollector
+
+
+class TestCostBasedPlanner(unittest.TestCase):
+    data = [{'id': i, 'port': 80 if i % 10 == 0 else 443, 'name': 'host{}'.format(i)} for i in range(1000)]
+
+    def setUp(self):
+        self.statistics = StatisticsCollector().collect(self.data)
+        self.planner = CostBasedPlanner(self.statistics)
+
+    @parameterized.expand([
+        ('id', None, None, 1.0),
+        ('id', '==', '5', 0.001),
+        ('id', '!=', '5', 0.999),
+        ('id', '<', '250', 0.25),
+        ('id', '>=', '250', 0.75),
+        ('port', '==', '80', 0.5),
+        ('unknown', '==', '80', 0.0),
+    ])
+    def test_estimate_selectivity(self, field, operator, value, expected_selectivity):
+        selectivity = self.planner.estimate_selectivity(Expression(field, operator, value))
+        self.assertAlmostEqual(expected_selectivity, selectivity, delta=0.02)
+
+    def test_selective_expressions_are_evaluated_first(self):
+        display_filter = DictDisplayFilter(self.data)
+        expressions = display_filter._parse('id > 10 and name == host5')
+        plan = self.planner.plan(expressions)
+        self.assertEqual(SCAN, plan.access_path)
+        self.assertEqual('name', plan.expressions[0][0].field)
+        self.assertEqual('id', plan.expressions[0][2].field)
+
+    def test_access_path(self):
+        display_filter = DictDisplayFilter(self.data)
+        expressions = display_filter._parse('port == 80 and id > 10')
+        self.assertEqual(BITMAP, self.planner.plan(expressions, is_cached=lambda expression: True).access_path)
+        self.assertEqual(SCAN, self.planner.plan(expressions, is_cached=lambda expression: False).access_path)
+        self.assertEqual(PUSHDOWN, self.planner.plan(expressions, can_push_down=True).access_path)
+
+    @parameterized.expand([
+        ('port == 80',), ('id > 10 and name == host5',), ('not id < 990 or port == 80',), ('port == 80 xor id < 5',),
+        ('(port == 80 or id == 3) and not name ~= 1',), ('id in { 1, 2, 30..40 } and port != 80',)
+    ])
+    def test_planned_display_filter_returns_same_items(self, display_filter_string):
+        display_filter = DictDisplayFilter(self.data)
+        expected = list(display_filter.filter(display_filter_string))
+        display_filter.planner = CostBasedPlanner(display_filter.collect_statistics())
+        self.assertEqual(expected, list(display_filter.filter(display_filter_string)))
+        display_filter.predicate_cache = PredicateCache()
+        display_filter.result_cache = ResultCache()
+        for _ in range(2):
+            self.assertEqual(expected, list(display_filter.filter(display_filter_string)))
+
+    def test_planned_display_filter_raises_evaluation_error(self):
+        display_filter = DictDisplayFilter([{'name': 'Neo'}, {'age': 35}])
+        display_filter.planner = CostBasedPlanner()
+        with self.assertRaises(EvaluationError):
+            list(display_filter.filter('name[0] == N'))
+
+
+class TestSQLPushDown(unittest.TestCase):
+    data = [
+        ('Morpheus', 38, 'male', 'captain', '10.0.0.1'),
+        ('Neo', 35, 'male', None, '10.0.0.2'),
+        ('Cipher', 48, 'male', '', 'fe80::1'),
+        ('Trinity', 32, 'female', 'first-mate', '42'),
+        ('Tank', 36, 'male', 'operator', 'inf'),
+    ]
+
+    def setUp(self):
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute('CREATE TABLE data (name text, age integer, gender text, role text, address text)')
+        self.connection.executemany('INSERT INTO data VALUES (?, ?, ?, ?, ?)', self.data)
+        self.queries = []
+        self.connection.set_trace_callback(self.queries.append)
+
+    @parameterized.expand([
+        ('name == Neo', 1, True),
+        ('name == Neo or name == Tank', 2, True),
+        ('role and gender == male', 2, True),
+        ('gender == male and age > 36', 2, True),
+        ('address == 10.0.0.2 or name == Tank', 2, False),
+        ('address == inf', 1, False),
+        ('not name == Neo', 4, False),
+        ('len(name) == 3', 1, False),
+    ])
+    def test_push_down(self, display_filter_string, no_items, pushed_down):
+        display_filter = SQLDisplayFilter(self.connection, 'data')
+        expected = list(display_filter.filter(display_filter_string))
+        self.assertEqual(no_items, len(expected))
+        display_filter.planner = CostBasedPlanner()
+        self.queries.clear()
+        self.assertEqual(expected, list(display_filter.filter(display_filter_string)))
+        self.assertEqual(pushed_down, any('WHERE' in query for query in self.queries))
+
+    def test_push_down_with_result_cache(self):
+        display_filter = SQLDisplayFilter(self.connection, 'data')
+        display_filter.result_cache = ResultCache()
+        self.assertEqual(4, len(list(display_filter.filter('gender == male'))))
+        display_filter.planner = CostBasedPlanner()
+        for _ in range(2):
+            self.assertEqual(4, len(list(display_filter.filter('gender == male'))))
+            self.assertEqual(1, len(list(display_filter.filter('gender == female'))))
+
+
+if __name__ == '__main__':
+    unittest.main()
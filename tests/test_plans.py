@@ -0,0 +1,160 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import pickle
+import sqlite3
+import unittest
+
+from parameterized import parameterized
+
+from pydfql import DictDisplayFilter, DisplayFilterPlan, IterableDisplayFilter, ListDisplayFilter, SQLDisplayFilter
+from pydfql.exceptions import EvaluationError, ParserError, UnknownFieldError
+from pydfql.models import Expression
+from pydfql.parsers.normalizer import CONSTANT_FALSE, CONSTANT_TRUE
+
+
+class TestDisplayFilterPlan(unittest.TestCase):
+    data = [
+        {'name': 'Neo', 'address': '192.168.0.1', 'port': '22', 'mac': '00:11:22:33:44:55'},
+        {'name': 'Trinity', 'address': '10.0.0.1', 'port': '80', 'mac': 'aa:bb:cc:dd:ee:ff'},
+        {'name': 'Morpheus', 'address': '192.168.0.2', 'port': '443', 'mac': '00:11:aa:bb:cc:dd'},
+    ]
+
+    display_filters = [
+        ['name'],
+        ['name == Neo'],
+        ['upper(name) == NEO'],
+        ['len(name) > 3 and not lower(name) == trinity'],
+        ['address == {192.168.0.1/24}'],
+        ['port in {22, 400-500}'],
+        ['port in {1..100}'],
+        ['name in {"Neo", "Morpheus"}'],
+        ['name == Neo or name == Trinity or port == 443'],
+        ['mac[0:2] == 00:11'],
+        ['name ~ "^T" ^^ port > 50'],
+        ['name and not name'],
+        ['name or not name'],
+        [''],
+    ]
+
+    def setUp(self):
+        self.display_filter = DictDisplayFilter(self.data)
+
+    @parameterized.expand(display_filters)
+    def test_filter_with_plan(self, display_filter):
+        expected_result = list(self.display_filter.filter(display_filter))
+        plan = self.display_filter.parse(display_filter)
+        self.assertEqual(expected_result, list(self.display_filter.filter(plan)))
+
+    @parameterized.expand(display_filters)
+    def test_pickle(self, display_filter):
+        expected_result = list(self.display_filter.filter(display_filter))
+        plan = pickle.loads(pickle.dumps(self.display_filter.parse(display_filter)))
+        # The default functions are lambdas which can not be pickled, hence they are looked up by name.
+        self.assertEqual(expected_result, list(DictDisplayFilter(self.data).filter(plan)))
+
+    def test_plan_of_expressions_bound_to_schema_can_be_pickled(self):
+        self.display_filter.schema = {'port': 'number', 'address': 'ipv4'}
+        expressions = self.display_filter._parse('port > 50 and address == 192.168.0.2')
+        plan = DisplayFilterPlan.from_expressions(expressions, self.display_filter.functions)
+        plan = pickle.loads(pickle.dumps(plan))
+        self.assertEqual([self.data[2]], list(self.display_filter.filter(plan)))
+
+    @parameterized.expand(display_filters)
+    def test_json(self, display_filter):
+        expected_result = list(self.display_filter.filter(display_filter))
+        plan = self.display_filter.parse(display_filter)
+        self.assertEqual(plan, DisplayFilterPlan.from_json(plan.to_json()))
+        self.assertEqual(expected_result, list(DictDisplayFilter(self.data).filter(
+            DisplayFilterPlan.from_json(plan.to_json())
+        )))
+
+    def test_constants(self):
+        self.assertIs(CONSTANT_FALSE, DisplayFilterPlan.from_json('{"version": 1, "expressions": [false]}').bind({}))
+        self.assertIs(CONSTANT_TRUE, DisplayFilterPlan.from_json('{"version": 1, "expressions": [true]}').bind({}))
+
+    def test_plan_refers_to_functions_by_name(self):
+        plan = self.display_filter.parse('upper(name) == NEO')
+        self.assertEqual('upper', plan.expressions[0].function)
+        display_filter = DictDisplayFilter(self.data, functions={'upper': lambda value: value.lower()})
+        self.assertEqual([], list(display_filter.filter(plan)))
+
+    def test_unknown_function_raises_parser_error(self):
+        plan = self.display_filter.parse('upper(name) == NEO')
+        display_filter = DictDisplayFilter(self.data, functions={})
+        self.assertRaises(ParserError, lambda: list(display_filter.filter(plan)))
+
+    def test_unknown_field_raises_unknown_field_error(self):
+        plan = self.display_filter.parse('nam == Neo')
+        display_filter = DictDisplayFilter(self.data, field_names=['name', 'port'])
+        self.assertRaises(UnknownFieldError, lambda: list(display_filter.filter(plan)))
+
+    def test_unregistered_function_raises_value_error(self):
+        expressions = self.display_filter._parse('upper(name) == NEO')
+        self.assertRaises(ValueError, DisplayFilterPlan.from_expressions, expressions, {'lower': str.lower})
+
+    @parameterized.expand([
+        ['{"version": 2, "expressions": []}'],
+        ['{"expressions": []}'],
+        ['{"version": 1, "expressions": [{"field": "name"}]}'],
+        ['[]'],
+        ['no json'],
+    ])
+    def test_malformed_json_raises_value_error(self, data):
+        self.assertRaises(ValueError, DisplayFilterPlan.from_json, data)
+
+    @parameterized.expand([
+        ['"and __import__(\'os\').getpid() == 0 and"'],
+        ['"True"'],
+        ['true'],
+        ['1'],
+        ['null'],
+        ['"and", "and"'],
+        ['"not"'],
+        ['{"field": "name", "operator": "is", "value": "Neo", "function": null, "slicer_specs": null}'],
+        ['{"field": 1, "operator": "==", "value": "Neo", "function": null, "slicer_specs": null}'],
+        ['{"field": "name", "operator": "==", "value": "Neo", "function": ["lower"], "slicer_specs": null}'],
+        ['{"field": "name", "operator": "==", "value": "Neo", "function": null, "slicer_specs": ["0"]}'],
+        ['{"field": "name", "operator": "==", "value": "Neo", "function": null, "slicer_specs": [[0, 1, 2]]}'],
+        ['{"field": "name", "operator": "==", "value": "Neo", "function": null, "slicer_specs": 0}'],
+    ])
+    def test_unknown_tokens_are_rejected(self, token):
+        expression = '{"field": "name", "operator": "==", "value": "Neo", "function": null, "slicer_specs": null}'
+        data = '{{"version": 1, "expressions": [{}, "and", {}]}}'.format(expression, token)
+        with self.assertRaisesRegex(ValueError, 'Malformed display filter plan!'):
+            DisplayFilterPlan.from_json(data)
+
+    def test_logical_operators_are_not_evaluated_as_python_code(self):
+        expression = Expression('name', '==', 'Neo')
+        plan = DisplayFilterPlan([expression, 'and __import__("os").getpid() > 0 and', expression])
+        with self.assertRaises(EvaluationError):
+            list(IterableDisplayFilter(self.data).filter(plan))
+
+    def test_list_display_filter(self):
+        data = [[item['name'], item['port']] for item in self.data]
+        display_filter = ListDisplayFilter(data, field_names=['name', 'port'])
+        plan = DisplayFilterPlan.from_json(display_filter.parse('port > 50 and len(name) > 3').to_json())
+        self.assertEqual([['Trinity', '80'], ['Morpheus', '443']], list(display_filter.filter(plan)))
+
+    def test_sql_display_filter(self):
+        connection = sqlite3.connect(':memory:')
+        connection.execute('CREATE TABLE users (name TEXT, port TEXT)')
+        connection.executemany('INSERT INTO users VALUES (?, ?)', [(item['name'], item['port']) for item in self.data])
+        display_filter = SQLDisplayFilter(connection, 'users')
+        plan = pickle.loads(pickle.dumps(display_filter.parse('name == Neo or name == Trinity')))
+        self.assertEqual(
+            [{'name': 'Neo', 'port': '22'}, {'name': 'Trinity', 'port': '80'}], list(display_filter.filter(plan))
+        )
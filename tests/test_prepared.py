@@ -0,0 +1,109 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import sqlite3
+import unittest
+
+from parameterized import parameterized
+
+from pydfql import DictDisplayFilter, PreparedDisplayFilter, SQLDisplayFilter
+from pydfql.exceptions import ParserError
+from pydfql.parsers import PYPARSING, RECURSIVE_DESCENT
+from pydfql.planner import CostBasedPlanner
+
+
+class TestPreparedDisplayFilter(unittest.TestCase):
+    data = [
+        {'name': 'Neo', 'host': '10.0.0.1', 'port': 22},
+        {'name': 'Trinity', 'host': '10.0.0.2', 'port': 80},
+        {'name': 'Morpheus', 'host': '10.0.0.1', 'port': 443},
+        {'name': 'Neo or name', 'host': '10.0.0.3', 'port': 8080},
+    ]
+
+    def setUp(self):
+        self.display_filter = DictDisplayFilter(self.data)
+
+    @parameterized.expand([
+        [PYPARSING, 'host == $host and port in $ports', {'host': '10.0.0.1', 'ports': [22, 80]},
+         'host == 10.0.0.1 and port in {22, 80}'],
+        [RECURSIVE_DESCENT, 'host == $host and port in $ports', {'host': '10.0.0.1', 'ports': [22, 80]},
+         'host == 10.0.0.1 and port in {22, 80}'],
+        [PYPARSING, 'port > $port', {'port': 80}, 'port > 80'],
+        [PYPARSING, 'upper(name) == $name', {'name': 'NEO'}, 'upper(name) == NEO'],
+        [PYPARSING, 'name == $a or name == $b', {'a': 'Neo', 'b': 'Trinity'}, 'name == Neo or name == Trinity'],
+        [PYPARSING, 'name in $names', {'names': ('Neo', 'Morpheus')}, 'name in {"Neo", "Morpheus"}'],
+        [PYPARSING, 'port == $port and not port == $port', {'port': 22}, 'port == 22 and not port == 22'],
+        [PYPARSING, 'name == "$name"', {'name': 'Neo'}, 'name == Neo'],
+    ])
+    def test_filter(self, backend, display_filter, values, expected_display_filter):
+        self.display_filter.parser_backend = backend
+        prepared_display_filter = self.display_filter.prepare(display_filter)
+        self.assertIsInstance(prepared_display_filter, PreparedDisplayFilter)
+        self.assertEqual(
+            list(self.display_filter.filter(expected_display_filter)), list(prepared_display_filter.filter(**values))
+        )
+
+    def test_values_do_not_change_the_display_filter(self):
+        prepared_display_filter = self.display_filter.prepare('name == $name')
+        self.assertEqual(['Neo or name'], [item['name'] for item in prepared_display_filter.filter(name='Neo or name')])
+        self.assertEqual([], list(prepared_display_filter.filter(name='"Neo" or name')))
+
+    def test_execute_many_times(self):
+        prepared_display_filter = self.display_filter.prepare('host == $host')
+        for host, expected_names in [('10.0.0.1', ['Neo', 'Morpheus']), ('10.0.0.2', ['Trinity'])]:
+            self.assertEqual(expected_names, [item['name'] for item in prepared_display_filter.filter(host=host)])
+
+    def test_parameters(self):
+        prepared_display_filter = self.display_filter.prepare('host == $host and port in $ports or host == $host')
+        self.assertEqual(['host', 'ports'], prepared_display_filter.parameters)
+        self.assertEqual([], self.display_filter.prepare('name').parameters)
+
+    @parameterized.expand([
+        [{}],
+        [{'host': '10.0.0.1', 'ports': [22], 'other': 1}],
+        [{'host': None, 'ports': [22]}],
+        [{'host': True, 'ports': [22]}],
+        [{'host': ['10.0.0.1'], 'ports': [22]}],
+        [{'host': '10.0.0.1', 'ports': 22}],
+        [{'host': '10.0.0.1', 'ports': [None]}],
+    ])
+    def test_invalid_values_raise_value_error(self, values):
+        prepared_display_filter = self.display_filter.prepare('host == $host and port in $ports')
+        with self.assertRaises(ValueError):
+            prepared_display_filter.filter(**values)
+
+    def test_schema(self):
+        self.display_filter.schema = {'port': 'number'}
+        with self.assertRaises(ParserError):
+            self.display_filter.prepare('port ~ $port')
+        prepared_display_filter = self.display_filter.prepare('port >= $port')
+        self.assertEqual(
+            ['Morpheus', 'Neo or name'], [item['name'] for item in prepared_display_filter.filter(port=443)]
+        )
+        with self.assertRaises(ParserError):
+            list(prepared_display_filter.filter(port='abc'))
+
+    def test_sql_display_filter_pushes_down_values_as_parameters(self):
+        connection = sqlite3.connect(':memory:')
+        connection.execute('CREATE TABLE t (name TEXT, host TEXT, port INTEGER)')
+        connection.executemany('INSERT INTO t VALUES (?, ?, ?)', [tuple(item.values()) for item in self.data])
+        display_filter = SQLDisplayFilter(connection, 't')
+        display_filter.planner = CostBasedPlanner()
+        prepared_display_filter = display_filter.prepare('name == $name')
+        expressions = display_filter._parse(prepared_display_filter.bind(name='Neo'))
+        self.assertEqual(('CAST("name" AS TEXT) IN (?)', ('Neo',)), display_filter._get_pushdown_condition(expressions))
+        self.assertEqual(['Neo'], [item['name'] for item in prepared_display_filter.filter(name='Neo')])
+        self.assertEqual(['Neo or name'], [item['name'] for item in prepared_display_filter.filter(name='Neo or name')])
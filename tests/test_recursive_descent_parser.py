@@ -0,0 +1,119 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import random
+import unittest
+
+from parameterized import parameterized
+
+from pydfql import DictDisplayFilter
+from pydfql.exceptions import ParserError
+from pydfql.models import Expression
+from pydfql.parsers import DisplayFilterParser, PYPARSING, RECURSIVE_DESCENT
+
+FUNCTIONS = {'len': len, 'lower': str.lower, 'l': str.upper}
+
+# Field names and functions used to compare the backends.
+CONFIGURATIONS = [
+    ([], FUNCTIONS),
+    (['port', 'po', 'address', 'a.b', 'not', 'in'], FUNCTIONS),
+    ([], {}),
+    (['port', 'name'], {}),
+]
+
+DISPLAY_FILTERS = [
+    '', ' ', 'port', ' port ', 'port == 22', 'port eq 22', 'port EQ 22', 'port==22', 'port  ==\n 22', 'port\t== 22',
+    'port != 22', 'port neq 22', 'port > 22', 'port gt 22', 'port >= 22', 'port ge 22', 'port < 22', 'port lt 22',
+    'port <= 22', 'port le 22', 'port ~= 2', 'port contains 2', 'port ~ 2', 'port matches "^2"', 'port in {22, 80}',
+    'port IN {22-80, 443..445}', 'port & 1', 'port equals 22', 'port gte 22',
+    'address == "a b"', "address == 'a b'", 'address == "a\\tb"', 'address == "a', 'address == "a"b', 'address == *a*',
+    'address in {"a", "b"}', "address in {'a'}", 'address in {10.0.0.1/24}', 'address in {10.0.0.1, 10.0.0.2}',
+    'address in {10.0.0.1-10}', 'address in {a}', 'address in {}', 'address == {1, "a"}', 'address == )',
+    'port[0] == 2', 'port [0] == 2', 'port[1:2] == 2', 'port[:3,4] == 2', 'port[-1] == 2', 'port[0-2] == 2',
+    'port[a] == 2', 'port[0]', 'len(port) > 2', 'len (port) > 2', 'len( port ) > 2', 'lower(address) == a',
+    'l(port) == 2', 'len(port[0]) == 2', 'len(port)', 'length == 2', 'len == 2', 'unknown(port) == 2',
+    'not port', 'NOT port', '!port', '! port', 'not(port)', 'not (port)', 'not not port', '!!port', 'not == 1',
+    'not not == 1', 'nothing == 1', 'not', '!',
+    'port and name', 'port AND name', 'port && name', 'port or name', 'port || name', 'port xor name', 'port ^^ name',
+    'port andy name', 'port and\nname', 'port\nand name', 'port and', 'and port',
+    'port == 22 and name == a or address == b', 'port == 22 and (name == a or address == b)',
+    '(port == 22)', '( port == 22 )', '((port == 22))', '(port == 22) and (name == a)', '(port)and(name)',
+    '!(port == 22 or not name)', 'not (port == 22) and name', '()', '(port', 'port)', 'in in {1}', 'in == 1',
+    'a.b == 1', 'foo-bar == 1', 'é == 1', 'port == é',
+]
+
+
+def _generate_display_filters(count: int):
+    """ Generates display filters (mostly invalid ones) from fragments of the display filter language. """
+    fragments = [
+        'port', 'po', 'address', 'a.b', 'name', 'not', 'NOT', '!', 'and', 'AND', '&&', 'or', '||', 'xor', '^^', '==',
+        'eq', '!=', 'neq', '>', '>=', 'ge', 'gt', '<', 'le', 'lt', '<=', '~', '~=', 'contains', 'matches', 'in', '&',
+        '(', ')', '[0]', '[1:2]', '[-1]', '{1,2}', '{1-3, 5..6}', '{"a","b"}', '{10.0.0.1/24}', "'x y'", '"q\\tz"',
+        '"unterminated', 'len(', 'lower(', 'l(', 'x', '22', '1.5', 'foo-bar', '}', '{', ']', '[', 'andy', 'nothing',
+    ]
+    separators = ['', ' ', ' ', ' ', '  ', '\t', '\n', ' \n ', '\r ']
+    generator = random.Random(0)
+    return [
+        ''.join(generator.choice(fragments) + generator.choice(separators) for _ in range(generator.randint(1, 8)))
+        for _ in range(count)
+    ]
+
+
+def _parse(parser: DisplayFilterParser, display_filter: str):
+    try:
+        return parser.parse(display_filter)
+    except ParserError:
+        return ParserError
+
+
+class TestRecursiveDescentParser(unittest.TestCase):
+
+    @parameterized.expand([(configuration,) for configuration in range(len(CONFIGURATIONS))])
+    def test_same_result_as_pyparsing(self, configuration):
+        field_names, functions = CONFIGURATIONS[configuration]
+        parser = DisplayFilterParser(field_names, functions, backend=PYPARSING)
+        recursive_descent_parser = DisplayFilterParser(field_names, functions, backend=RECURSIVE_DESCENT)
+        for display_filter in DISPLAY_FILTERS + _generate_display_filters(300):
+            with self.subTest(display_filter=display_filter):
+                self.assertEqual(_parse(parser, display_filter), _parse(recursive_descent_parser, display_filter))
+
+    def test_parse_deeply_nested_display_filter(self):
+        parser = DisplayFilterParser(['port'], backend=RECURSIVE_DESCENT)
+        self.assertEqual(
+            [Expression('port', '==', '22')], parser.parse('(' * 200 + 'port == 22' + ')' * 200)
+        )
+        expected = Expression('port')
+        for _ in range(100):
+            expected = ['not', expected]
+        self.assertEqual([expected], parser.parse('!(' * 100 + 'port' + ')' * 100))
+
+    def test_parse_long_display_filter(self):
+        parser = DisplayFilterParser(['port'], backend=RECURSIVE_DESCENT)
+        result = parser.parse(' or '.join('port == {}'.format(port) for port in range(1000)))
+        self.assertEqual(1999, len(result[0]))
+        self.assertEqual(Expression('port', '==', '999'), result[0][-1])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            DisplayFilterParser(backend='unknown')
+
+    def test_display_filter_with_recursive_descent_backend(self):
+        display_filter = DictDisplayFilter([{'port': 22, 'name': 'ssh'}, {'port': 80, 'name': 'http'}])
+        display_filter.parser_backend = RECURSIVE_DESCENT
+        self.assertEqual([{'port': 80, 'name': 'http'}], list(display_filter.filter('len(name) > 3 and port > 22')))
+        display_filter.field_names = ['port', 'name']
+        self.assertEqual(RECURSIVE_DESCENT, display_filter.parser_backend)
+        self.assertEqual([{'port': 22, 'name': 'ssh'}], list(display_filter.filter('not port in {80}')))
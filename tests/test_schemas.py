@@ -0,0 +1,147 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+
+from parameterized import parameterized
+
+from pydfql.caches import PredicateCache
+from pydfql.display_filters import DictDisplayFilter, IterableDisplayFilter
+from pydfql.exceptions import ParserError
+from pydfql.expressions import iter_expressions
+from pydfql.filter_sets import FilterSet
+from pydfql.models import Expression, TypedExpression
+from pydfql.parsers.normalizer import CONSTANT_FALSE
+from pydfql.schemas import Schema, DATE, IPV4, IPV6, MAC, NUMBER, STRING, VERSION
+
+
+class TestSchema(unittest.TestCase):
+    data = [
+        {'name': 'Neo', 'port': 80, 'ip': '10.0.0.1', 'ip6': 'fe80::1', 'mac': '00:11:22:33:44:55',
+         'date': '2020-01-02', 'version': '1.10'},
+        {'name': 'Trinity', 'port': '443', 'ip': '10.0.1.5', 'ip6': 'fe80::2', 'mac': '00-11-22-33-44-56',
+         'date': '2019-05-01', 'version': '1.9'},
+        {'name': 'Morpheus', 'port': [22, 8080], 'ip': None, 'ip6': 'invalid', 'mac': None,
+         'date': 'invalid', 'version': 'invalid'},
+        {'name': 'Cipher'},
+    ]
+
+    schema = {
+        'name': STRING, 'port': NUMBER, 'ip': IPV4, 'ip6': IPV6, 'mac': MAC, 'date': DATE, 'version': VERSION
+    }
+
+    def setUp(self):
+        self.display_filter = DictDisplayFilter(self.data, schema=self.schema)
+
+    @parameterized.expand([
+        ['name == Neo', ['Neo']],
+        ['name != Neo', ['Trinity', 'Morpheus', 'Cipher']],
+        ['name ~ "^T"', ['Trinity']],
+        ['name ~= eo', ['Neo']],
+        ['name in {"Neo", "Cipher"}', ['Neo', 'Cipher']],
+        ['port == 80', ['Neo']],
+        ['port == 0x50', ['Neo']],
+        ['port > 100', ['Trinity', 'Morpheus']],
+        ['port != 80', ['Trinity', 'Morpheus', 'Cipher']],
+        ['port in {22, 440..450}', ['Trinity', 'Morpheus']],
+        ['port & 0x10', ['Neo', 'Trinity', 'Morpheus']],
+        ['port == 80 or port == 443', ['Neo', 'Trinity']],
+        ['ip == 10.0.0.1', ['Neo']],
+        ['ip >= 10.0.0.2', ['Trinity']],
+        ['ip in {10.0.0.0/24}', ['Neo']],
+        ['ip in {10.0.1.1-10}', ['Trinity']],
+        ['ip6 == fe80::0:1', ['Neo']],
+        ['ip6 > fe80::1', ['Trinity']],
+        ['mac == 00:11:22:33:44:55', ['Neo']],
+        ['mac == 00-11-22-33-44-56', ['Trinity']],
+        ['mac > 00:11:22:33:44:55', ['Trinity']],
+        ['date > 2020-01-01', ['Neo']],
+        ['date == "2019-05-01 00:00:00"', ['Trinity']],
+        ['version > 1.9', ['Neo']],
+        ['version in {"1.9", "2.0"}', ['Trinity']],
+        ['len(name) > 3 and name', ['Trinity', 'Morpheus', 'Cipher']],
+    ])
+    def test_filter(self, display_filter, expected_names):
+        self.assertEqual(expected_names, [item['name'] for item in self.display_filter.filter(display_filter)])
+        # Items which are evaluated one by one match the same way as items which are evaluated in batches.
+        iterable_display_filter = IterableDisplayFilter(self.data, schema=self.schema)
+        self.assertEqual(
+            expected_names, [item['name'] for item in iterable_display_filter.filter(display_filter)]
+        )
+
+    @parameterized.expand([
+        ['port ~ 8'],
+        ['port == abc'],
+        ['port in {1, 2} and ip in {1, 2}'],
+        ['name > a'],
+        ['name & 1'],
+        ['name ~ "("'],
+        ['ip == 10.0.0.0/24'],
+        ['ip6 == 10.0.0.1'],
+        ['mac == zz'],
+        ['date == 1.5'],
+        ['version == "not a version"'],
+    ])
+    def test_impossible_comparisons_raise_parser_error(self, display_filter):
+        with self.assertRaises(ParserError):
+            list(self.display_filter.filter(display_filter))
+        with self.assertRaises(ParserError):
+            self.display_filter.parse(display_filter)
+
+    def test_expressions_are_bound_to_a_single_evaluator(self):
+        expressions = self.display_filter._parse('port > 100 and unknown == 1 and upper(name) == NEO')
+        typed = [expression for expression in iter_expressions(expressions) if isinstance(expression, TypedExpression)]
+        self.assertEqual(1, len(typed))
+        self.assertEqual(NUMBER, typed[0].field_type)
+        self.assertEqual(100.0, typed[0].converted_value)
+
+    def test_plans_do_not_contain_bound_expressions(self):
+        plan = self.display_filter.parse('port > 100')
+        self.assertEqual([Expression('port', '>', '100')], plan.expressions)
+        self.assertEqual(['Trinity', 'Morpheus'], [item['name'] for item in self.display_filter.filter(plan)])
+
+    def test_constants(self):
+        self.assertIs(CONSTANT_FALSE, self.display_filter._parse('port == 80 and not port == 80'))
+
+    def test_predicate_cache_distinguishes_bound_expressions(self):
+        self.display_filter.predicate_cache = PredicateCache()
+        display_filter = 'date == "2020-01-02 00:00:00"'
+        self.assertEqual(['Neo'], [item['name'] for item in self.display_filter.filter(display_filter)])
+        self.display_filter.schema = None
+        self.assertEqual([], [item['name'] for item in self.display_filter.filter(display_filter)])
+
+    def test_schema(self):
+        self.assertEqual(self.schema, self.display_filter.schema)
+        self.display_filter.schema = None
+        self.assertIsNone(self.display_filter.schema)
+        self.assertEqual({'port': NUMBER}, Schema({'port': NUMBER}).fields)
+        self.assertEqual(NUMBER, Schema({'port': NUMBER}).field_type('port'))
+        self.assertIsNone(Schema({'port': NUMBER}).field_type('name'))
+
+    def test_unknown_type_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            self.display_filter.schema = {'port': 'integer'}
+        with self.assertRaises(ValueError):
+            DictDisplayFilter(self.data, schema={'port': 'integer'})
+
+    def test_filter_set(self):
+        filter_set = FilterSet(schema=self.schema)
+        filter_set.add('web', 'port in {80, 443}')
+        filter_set.add('old', 'version < 1.10')
+        self.assertEqual(['web'], filter_set.match(self.data[0]))
+        self.assertEqual(['web', 'old'], filter_set.match(self.data[1]))
+        with self.assertRaises(ParserError):
+            filter_set.add('invalid', 'port == abc')
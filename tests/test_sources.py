@@ -0,0 +1,92 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import io
+import json
+import os
+import unittest
+
+from parameterized import parameterized
+
+from pydfql import sources
+from pydfql.display_filters import IterableDisplayFilter
+
+EXAMPLE_NMAP_DATA = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'nmap_example.xml'))
+
+
+class TestSources(unittest.TestCase):
+
+    @parameterized.expand([
+        ('export.csv', b'', sources.CSV),
+        ('export.JSON', b'', sources.JSON),
+        ('export.ndjson', b'', sources.JSON_LINES),
+        ('scan.xml', b'', sources.NMAP_XML),
+        (None, b'\xef\xbb\xbf <?xml version="1.0"?>', sources.NMAP_XML),
+        (None, b'\n[{"a": 1}]', sources.JSON),
+        (None, b'{"a": 1}\n{"a": 2}', sources.JSON_LINES),
+        (None, b'name,age', sources.CSV),
+        ('export.txt', b'[', sources.JSON),
+    ])
+    def test_detect_format(self, file_name, head, expected_format):
+        self.assertEqual(expected_format, sources.detect_format(file_name, head))
+
+    def test_iter_csv(self):
+        records = list(sources.iter_csv(io.StringIO('name,age\nNeo,35\n"Trinity, Carrie",32\n')))
+        self.assertEqual([{'name': 'Neo', 'age': '35'}, {'name': 'Trinity, Carrie', 'age': '32'}], records)
+        self.assertEqual([], list(sources.iter_csv(io.StringIO(''))))
+
+    @parameterized.expand([(1,), (3,), (7,), (65536,)])
+    def test_iter_json_decodes_array_incrementally(self, chunk_size):
+        values = [{'name': 'Neo', 'age': 35, 'tags': ['a', {'b': None}]}, 1.5e10, -12, 'x]', True, None, []]
+        for indent in (None, 2):
+            text = json.dumps(values, indent=indent)
+            self.assertEqual(values, list(sources.iter_json(io.StringIO(text), chunk_size=chunk_size)))
+
+    def test_iter_json_single_value(self):
+        self.assertEqual([{'a': 1}], list(sources.iter_json(io.StringIO('{"a": 1}'))))
+        self.assertEqual([], list(sources.iter_json(io.StringIO(' [ ] '))))
+        self.assertEqual([], list(sources.iter_json(io.StringIO(''))))
+
+    def test_iter_json_raises_on_truncated_array(self):
+        with self.assertRaises(ValueError):
+            list(sources.iter_json(io.StringIO('[{"a": 1}, {"a"'), chunk_size=4))
+
+    def test_iter_json_lines(self):
+        records = list(sources.iter_json_lines(io.StringIO('{"a": 1}\n\n{"a": 2}\n')))
+        self.assertEqual([{'a': 1}, {'a': 2}], records)
+
+    def test_iter_nmap_xml(self):
+        with open(EXAMPLE_NMAP_DATA, 'rb') as file:
+            records = list(sources.iter_nmap_xml(file))
+        self.assertEqual(43, len(records))
+        self.assertEqual({
+            'host': '66.35.250.168', 'port': '80', 'protocol': 'tcp', 'status': 'open',
+            'service': 'product: Apache httpd version: 1.3.39 extrainfo: (Unix) PHP/4.4.7'
+        }, records[0])
+        self.assertEqual({
+            'host': '66.35.250.168', 'port': '443', 'protocol': 'tcp', 'status': 'closed', 'service': 'https'
+        }, records[1])
+
+    def test_filter_nmap_xml_file_by_name(self):
+        display_filter = IterableDisplayFilter(lambda: sources.iter_nmap_xml(EXAMPLE_NMAP_DATA))
+        for _ in range(2):
+            self.assertEqual(['72.14.207.99', '72.14.253.83'], [
+                record['host'] for record in display_filter.filter('port == 179')
+            ])
+
+
+if __name__ == '__main__':
+    unittest.main()
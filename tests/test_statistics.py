@@ -0,0 +1,97 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+
+from parameterized import parameterized
+
+from pydfql.display_filters import DictDisplayFilter
+from pydfql.statistics import EquiDepthHistogram, HyperLogLog, StatisticsCollector, detect_type
+
+
+class TestHyperLogLog(unittest.TestCase):
+
+    @parameterized.expand([(10,), (1000,), (50000,)])
+    def test_count_is_close_to_number_of_distinct_values(self, distinct):
+        hyper_log_log = HyperLogLog()
+        for i in range(distinct * 2):
+            hyper_log_log.add(i % distinct)
+        self.assertAlmostEqual(distinct, hyper_log_log.count(), delta=distinct * 0.1)
+
+    def test_invalid_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(precision=3)
+
+
+class TestEquiDepthHistogram(unittest.TestCase):
+
+    def test_fraction_less_than(self):
+        histogram = EquiDepthHistogram.build(range(1000), buckets=10)
+        self.assertEqual(11, len(histogram.boundaries))
+        self.assertEqual(0.0, histogram.fraction_less_than(-1))
+        self.assertEqual(1.0, histogram.fraction_less_than(1000))
+        self.assertAlmostEqual(0.25, histogram.fraction_less_than(250), delta=0.01)
+
+    def test_empty_histogram(self):
+        self.assertEqual(0.0, EquiDepthHistogram.build([]).fraction_less_than(1))
+
+
+class TestStatisticsCollector(unittest.TestCase):
+
+    @parameterized.expand([
+        (None, None), ('', None), ([], None), (True, 'boolean'), (1, 'number'), ('1.5', 'number'),
+        ('10.0.0.1', 'ipv4'), ('fe80::1', 'ipv6'), ('00:83:00:20:20:83', 'mac'), ('2021-12-23', 'date'),
+        ('Neo', 'string'), ([1], 'list'), ({'a': 1}, 'dict')
+    ])
+    def test_detect_type(self, value, expected_type):
+        self.assertEqual(expected_type, detect_type(value))
+
+    def test_collect(self):
+        statistics = StatisticsCollector().collect([
+            {'name': 'Morpheus', 'age': 38, 'address': {'ip': '10.0.0.1'}},
+            {'name': 'Neo', 'age': 35, 'address': {'ip': '10.0.0.2'}},
+            {'name': 'Neo', 'age': None},
+            {'name': 'Trinity'}
+        ])
+        self.assertEqual(4, statistics.row_count)
+        self.assertEqual(['name', 'age', 'address.ip'], statistics.field_names)
+        self.assertEqual(0.0, statistics.null_rate('name'))
+        self.assertEqual(0.5, statistics.null_rate('age'))
+        self.assertEqual(1.0, statistics.null_rate('unknown'))
+        self.assertEqual('string', statistics.value_type('name'))
+        self.assertEqual('ipv4', statistics.value_type('address.ip'))
+        self.assertEqual(3, statistics.distinct_count('name'))
+        self.assertIsNone(statistics.histogram('name'))
+        boundaries = statistics.histogram('age').boundaries
+        self.assertEqual((35.0, 38.0), (boundaries[0], boundaries[-1]))
+
+    def test_statistics_are_refreshed_incrementally(self):
+        display_filter = DictDisplayFilter([{'age': i} for i in range(100)])
+        statistics = display_filter.collect_statistics()
+        self.assertEqual(100, statistics.row_count)
+        display_filter.extend([{'age': None}, {'age': 200}])
+        self.assertEqual(102, statistics.row_count)
+        self.assertEqual(200, statistics.histogram('age').boundaries[-1])
+        display_filter.update(-1, {'age': 150})
+        self.assertEqual(150, statistics.histogram('age').boundaries[-1])
+        display_filter.remove({'age': 150})
+        self.assertEqual(101, statistics.row_count)
+        self.assertEqual(99, statistics.histogram('age').boundaries[-1])
+        self.assertAlmostEqual(1 / 101, statistics.null_rate('age'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+
+from pydfql.stores import DataStore, DataStoreListener
+
+
+class RecordingListener(DataStoreListener):
+
+    def __init__(self):
+        self.events = []
+
+    def on_insert(self, position, item):
+        self.events.append(('insert', position, item))
+
+    def on_update(self, position, old_item, new_item):
+        self.events.append(('update', position, old_item, new_item))
+
+    def on_remove(self, position, item):
+        self.events.append(('remove', position, item))
+
+
+class TestDataStore(unittest.TestCase):
+
+    def test_version_is_incremented_on_every_modification(self):
+        data_store = DataStore([1, 2])
+        self.assertEqual(0, data_store.version)
+        data_store.append(3)
+        self.assertEqual(1, data_store.version)
+        data_store.extend([4, 5, 6])
+        self.assertEqual(2, data_store.version)
+        data_store.remove(4)
+        self.assertEqual(3, data_store.version)
+        data_store.update(0, 7)
+        self.assertEqual(4, data_store.version)
+        self.assertEqual([7, 2, 3, 5, 6], list(data_store))
+
+    def test_listener_is_notified_about_changed_rows_only(self):
+        data_store = DataStore(['a', 'b'])
+        listener = RecordingListener()
+        data_store.add_listener(listener)
+        data_store.extend(['c', 'd'])
+        data_store.remove('b')
+        data_store.update(-1, 'e')
+        self.assertEqual([
+            ('insert', 2, 'c'),
+            ('insert', 3, 'd'),
+            ('remove', 1, 'b'),
+            ('update', 2, 'd', 'e'),
+        ], listener.events)
+
+    def test_snapshot_is_not_copied_and_not_affected_by_modifications(self):
+        data_store = DataStore(['a', 'b'])
+        version, snapshot = data_store.snapshot()
+        self.assertIs(snapshot, data_store.snapshot()[1])
+        data_store.append('c')
+        data_store.update(0, 'd')
+        data_store.remove('b')
+        self.assertEqual((0, ['a', 'b']), (version, snapshot))
+        self.assertEqual((3, ['d', 'c']), (data_store.version, list(data_store)))
+        # The list is copied by the first modification after a snapshot was taken only.
+        _, snapshot = data_store.snapshot()
+        data_store.append('e')
+        data = data_store.snapshot()[1]
+        data_store.append('f')
+        self.assertEqual(['d', 'c'], snapshot)
+        self.assertEqual(['d', 'c', 'e'], data)
+
+    def test_remove_missing_item_raises_value_error(self):
+        data_store = DataStore(['a'])
+        self.assertRaises(ValueError, lambda: data_store.remove('b'))
+        self.assertEqual(0, data_store.version)
+
+    def test_update_invalid_position_raises_index_error(self):
+        data_store = DataStore(['a'])
+        self.assertRaises(IndexError, lambda: data_store.update(1, 'b'))
+        self.assertEqual(0, data_store.version)
@@ -0,0 +1,152 @@
+# vim: ts=8:sts=8:sw=8:noexpandtab
+#
+# This file is part of pydfql.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import csv
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from parameterized import parameterized
+
+from pydfql.caches import PredicateCache, ResultCache
+from pydfql.display_filters import CSVDisplayFilter, DictDisplayFilter
+from pydfql.parsers import DisplayFilterParser, PYPARSING, RECURSIVE_DESCENT, common as pc
+from pydfql.planner import CostBasedPlanner
+
+
+class TestThreadSafety(unittest.TestCase):
+    data = [
+        {'id': i, 'port': [22, 80, 443][i % 3], 'name': 'host{}'.format(i % 11), 'ip': '10.0.{}.{}'.format(i % 7, i % 5)}
+        for i in range(300)
+    ]
+    display_filters = [
+        'port == 80', 'port == 80 and name == host1', 'port in { 22, 443 } or id < 10', 'not name ~= 1 and id > 100',
+        'ip in { 10.0.1.0/24 }', 'len(name) == 5 xor port != 22', 'upper(name) == HOST3 or ip[0:2] == 10.0',
+        'port >= 80 and port <= 80', 'name == host1 or name == host2 or name == host3',
+    ]
+    threads = 8
+    iterations = 20
+
+    def _run_concurrently(self, function):
+        barrier = threading.Barrier(self.threads)
+
+        def _run(thread: int):
+            barrier.wait()
+            return [function(thread, iteration) for iteration in range(self.iterations)]
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            return list(executor.map(_run, range(self.threads)))
+
+    def test_parser_can_be_used_concurrently(self):
+        functions = {'len': len, 'upper': str.upper}
+        parser = DisplayFilterParser(functions=functions)
+        expected = {display_filter: parser.parse(display_filter) for display_filter in self.display_filters}
+        # Use a new parser which did not parse any display filter yet.
+        parser = DisplayFilterParser(functions=functions)
+        results = self._run_concurrently(lambda thread, iteration: (
+            lambda display_filter: (display_filter, parser.parse(display_filter))
+        )(self.display_filters[(thread + iteration) % len(self.display_filters)]))
+        for display_filter, expressions in (result for thread_results in results for result in thread_results):
+            self.assertEqual(expected[display_filter], expressions)
+
+    def test_parsers_with_new_grammars_can_be_used_concurrently(self):
+        # Each thread uses its own function names, so that every thread builds and uses a new grammar.
+        parsers = [DisplayFilterParser(functions={'len': len, 'upper{}'.format(thread): str.upper})
+                   for thread in range(self.threads)]
+        results = self._run_concurrently(lambda thread, iteration: parsers[thread].parse(
+            'upper{}(name) == HOST3 or len(name) == 5'.format(thread)
+        ))
+        for thread, thread_results in enumerate(results):
+            expected = parsers[thread].parse('upper{}(name) == HOST3 or len(name) == 5'.format(thread))
+            self.assertEqual([expected] * self.iterations, thread_results)
+
+    @parameterized.expand([(PYPARSING,), (RECURSIVE_DESCENT,)])
+    def test_parsing_is_not_serialized(self, backend):
+        parser = DisplayFilterParser(functions={'len': len, 'upper': str.upper}, backend=backend)
+        expected = [parser.parse(display_filter) for display_filter in self.display_filters]
+        with ThreadPoolExecutor(max_workers=1) as executor, pc.parse_lock:
+            future = executor.submit(lambda: [parser.parse(display_filter) for display_filter in self.display_filters])
+            self.assertEqual(expected, future.result(timeout=10))
+
+    @parameterized.expand([
+        ('default', False, False, False),
+        ('result_cache', True, False, False),
+        ('predicate_cache', False, True, False),
+        ('planner', True, True, True),
+    ])
+    def test_display_filter_can_be_used_concurrently(self, _, result_cache, predicate_cache, planner):
+        expected = {
+            display_filter: list(DictDisplayFilter(self.data).filter(display_filter))
+            for display_filter in self.display_filters
+        }
+        shared_display_filter = DictDisplayFilter(self.data)
+        if result_cache:
+            shared_display_filter.result_cache = ResultCache(max_entries=4)
+        if predicate_cache:
+            shared_display_filter.predicate_cache = PredicateCache(max_entries=4)
+        if planner:
+            shared_display_filter.planner = CostBasedPlanner(shared_display_filter.collect_statistics())
+
+        def _filter(thread: int, iteration: int):
+            display_filter = self.display_filters[(thread + iteration) % len(self.display_filters)]
+            return display_filter, list(shared_display_filter.filter(display_filter))
+
+        for display_filter, items in (result for results in self._run_concurrently(_filter) for result in results):
+            self.assertEqual(expected[display_filter], items)
+
+    def test_csv_display_filter_can_be_used_concurrently(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'data.csv')
+            with open(file_name, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=['id', 'port', 'name', 'ip'])
+                writer.writeheader()
+                writer.writerows(self.data * 10)
+            with CSVDisplayFilter(file_name) as shared_display_filter:
+                expected = {
+                    display_filter: list(shared_display_filter.filter(display_filter))
+                    for display_filter in self.display_filters
+                }
+
+                def _filter(thread: int, iteration: int):
+                    display_filter = self.display_filters[(thread + iteration) % len(self.display_filters)]
+                    return display_filter, list(shared_display_filter.filter(display_filter))
+
+                results = self._run_concurrently(_filter)
+            for display_filter, items in (result for thread_results in results for result in thread_results):
+                self.assertEqual(expected[display_filter], items)
+
+    def test_display_filter_can_be_modified_while_filtering(self):
+        display_filter = DictDisplayFilter(list(self.data))
+        display_filter.result_cache = ResultCache()
+        display_filter.predicate_cache = PredicateCache()
+        statistics = display_filter.collect_statistics()
+
+        def _run(thread: int, iteration: int):
+            if thread % 2:
+                display_filter.append({'id': 1000 + iteration, 'port': 8080, 'name': 'new', 'ip': '10.1.1.1'})
+                return None
+            return list(display_filter.filter('port == 8080'))
+
+        self._run_concurrently(_run)
+        additions = self.threads // 2 * self.iterations
+        self.assertEqual(additions, len(list(display_filter.filter('port == 8080'))))
+        self.assertEqual(len(self.data) + additions, statistics.row_count)
+
+
+if __name__ == '__main__':
+    unittest.main()